@@ -2,7 +2,10 @@ __all__ = []
 
 
 
-from redplanet.Craters.getter import get
+from redplanet.Craters.getter import get, get_nearest, get_within_radius, get_in_polygon
 __all__.extend([
     'get',
+    'get_nearest',
+    'get_within_radius',
+    'get_in_polygon',
 ])
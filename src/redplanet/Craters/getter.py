@@ -1,8 +1,16 @@
+import numpy as np
 import pandas as pd
 
-from redplanet.Craters.loader import _get_dataset
+from redplanet.Craters import loader
+from redplanet.Craters.loader import _get_dataset, _get_ages, _get_kdtree
 
-from redplanet.helper_functions.coordinates import _verify_coords
+from redplanet.helper_functions import spatial_index
+from redplanet.helper_functions.geodesy import _mean_radius_m
+from redplanet.helper_functions.coordinates import (
+    _verify_coords,
+    _plon2slon,
+    _lonlat2xyz,
+)
 from redplanet.helper_functions.docstrings.main import substitute_docstrings
 
 
@@ -37,7 +45,7 @@ def get(
     lon : None | tuple[float, float], optional
         Filter craters whose center falls within this range of longitudes.
 
-        The given range must be a subset of either [-180,180] or [0,360] -- e.g. `lon=[-170,350]` is not allowed (it doesn't make sense).
+        The given range must be a subset of either [-180,180] or [0,360] -- e.g. `lon=[-170,350]` is not allowed (it doesn't make sense). If the first value is greater than the second, the range wraps around (e.g. `lon=[170,-170]` or `lon=[350,10]` selects a 20 degree band across the antimeridian or prime meridian respectively).
     lat : None | tuple[float, float], optional
         Filter craters whose center falls within this range of latitudes.
     diameter : None | tuple[float, float], optional
@@ -45,7 +53,7 @@ def get(
     has_age : None | bool, optional
         If True, only return craters with both Hartmann/Neukum isochron ages available. Default is False.
     as_df : bool, optional
-        If True, return a pandas DataFrame. Default is False, which returns a list of dictionaries.
+        If True, return a pandas DataFrame with typed columns, where missing values are NaN and each age column is split into three float columns (see Returns). Default is False, which returns a list of dictionaries (where missing values are None).
 
     Returns
     -------
@@ -68,46 +76,335 @@ def get(
             - For more info, see Appendix A of {@Robbins2012_crater_db.n}.
         - `['N_H(10)', 'N_N(10)', 'N_H(25)', 'N_N(25)', 'N_H(50)', 'N_N(50)', 'Hartmann Isochron Age', 'Neukum Isochron Age', 'Hartmann Turn-Off Diameter', 'Neukum Turn-Off Diameter']` : None | list[float, float, float]
             - When available, the ages are given in a list where the first value is the estimated age and second/third are uncertainties (they will always be negative/positive respectively). All values are in billions of years (aka "giga-annums"/"Ga").
+            - If `as_df` is True, each age column (`N_*` and `* Isochron Age`) is instead split into float columns `<col>`, `<col>_minus`, and `<col>_plus` (e.g. `'Hartmann Isochron Age_minus'`), which are NaN when unavailable. Turn-off diameters are always single floats.
             - For more info, see Supplementary Table 3 of {@Robbins2013_crater_ages.n}.
     """
 
     df = _get_dataset()
 
+    ## filters are combined into a single mask over the full table, so rows are only copied once
+    mask = np.ones(len(df), dtype=bool)
+
     if crater_id:
         if isinstance(crater_id, str):
             crater_id = [crater_id]
-        df = df[ df['id'].isin(crater_id) ]
+        mask &= df['id'].isin(crater_id).to_numpy()
 
     if name:
         if isinstance(name, str):
             name = [name]
-        df = df[ df['name'].isin(name) ]
+        mask &= df['name'].isin(name).to_numpy()
         ## TODO: make names insensitive to case and special characters like apostrophes, e.g. "kovalsky" == "Koval'sky"
 
 
     if lon:
         _verify_coords(lon, 0)
         # lon = _plon2slon(lon)    ## this introduces unexpected/annoying behavior, TODO figure it out eventually lol (or add a plon col to df, and if any input lons are >180 then query that column instead lol)
-        if lon[0] > 180 or lon[1] > 180:
-            df = df[ df['plon'].between(lon[0], lon[1]) ]
+        if lon[0] > lon[1]:
+            values = df['lon'].to_numpy()
+            mask &= ((values - lon[0]) % 360) <= ((lon[1] - lon[0]) % 360)
+        elif lon[0] > 180 or lon[1] > 180:
+            mask &= _between(df['plon'], lon)
         else:
-            df = df[ df['lon'].between(lon[0], lon[1]) ]
+            mask &= _between(df['lon'], lon)
 
     if lat:
         _verify_coords(0, lat)
-        df = df[ df['lat'].between(lat[0], lat[1]) ]
+        mask &= _between(df['lat'], lat)
 
 
     if diameter:
-        df = df[ df['diam'].between(diameter[0], diameter[1]) ]
+        mask &= _between(df['diam'], diameter)
 
     if has_age:
-        df = df[
-            pd.notna(df['Hartmann Isochron Age']) &
-            pd.notna(df['Neukum Isochron Age'])
-        ]
+        ages = _get_ages()
+        mask &= ~np.isnan(ages['Hartmann Isochron Age'][:, 0])
+        mask &= ~np.isnan(ages['Neukum Isochron Age'][:, 0])
+
+    return _format_craters(df[mask], as_df)
+
+
+
+def get_nearest(
+    lon : float | np.ndarray,
+    lat : float | np.ndarray,
+    k   : int = 1,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get the `k` closest craters (by distance to their centers) to each of the given point(s).
+
+    This uses a spatial index (built once when the dataset is loaded), so it's fast for many points -- e.g. finding the craters closest to every dipole in `redplanet.Mag.depth.get_dataset()`.
+
+    Parameters
+    ----------
+    lon : float | np.ndarray
+        Longitude coordinate(s) in range [-180, 360].
+    lat : float | np.ndarray
+        Latitude coordinate(s) in range [-90, 90]. Coordinates are treated as paired points, so `lon` and `lat` must have the same shape (or one of them can be a scalar).
+    k : int, optional
+        Number of closest craters to return for each point, in range [1, 2072]. Default is 1.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        Tuple `(index, distance_km)` of arrays with shape `(*shape, k)`, where `shape` is the broadcast shape of `lon` and `lat`, and the last axis is sorted from closest to furthest:
+
+        - `index` : np.ndarray
+            - Row index of each crater in `redplanet.Craters.get(as_df=True)`, e.g. use `df.iloc[index[0]]` to get the rows for the first point.
+        - `distance_km` : np.ndarray
+            - Geodesic distance from the input coordinate to the crater center, in km.
+
+    Raises
+    ------
+    ValueError
+        - If `lon` and `lat` don't have the same shape (one of them can be a scalar).
+        - If `k` is not in range [1, 2072].
+
+    Notes
+    -----
+    Candidates are found with a KD-tree over the crater centers on the unit sphere, then sorted by their exact geodesic distance (see `redplanet.helper_functions.geodesy.get_distance`). More candidates are queried until the result is guaranteed to be the same as comparing every crater.
+    """
+
+    ## input validation
+    _verify_coords(lon, lat)
+    try:
+        lon, lat = np.broadcast_arrays(lon, lat)
+    except ValueError:
+        raise ValueError(f'`lon` and `lat` must have the same shape (or one must be a scalar). Got shapes {np.shape(lon)} and {np.shape(lat)}.')
+    shape = lon.shape
+
+    df = _get_dataset()
+    if not (1 <= k <= len(df)):
+        raise ValueError(f'`k` must be in range [1, {len(df)}]. Got {k}.')
+
+    idx, distances_km = spatial_index._query_nearest(
+        _get_kdtree(),
+        df[['lon', 'lat']].to_numpy(),
+        _plon2slon(lon.ravel().astype(np.float64)),
+        lat.ravel().astype(np.float64),
+        k,
+    )
+    return idx.reshape(shape + (k,)), distances_km.reshape(shape + (k,))
+
+
+
+def get_within_radius(
+    lon             : float | np.ndarray,
+    lat             : float | np.ndarray,
+    radius_km       : float | np.ndarray,
+    overlap         : bool = False,
+    return_distance : bool = False,
+) -> np.ndarray | list[np.ndarray] | tuple[np.ndarray, np.ndarray] | tuple[list[np.ndarray], list[np.ndarray]]:
+    """
+    Get all craters within a given distance of each of the given point(s).
+
+    This uses a spatial index (built once when the dataset is loaded), so it's fast for many points -- e.g. finding the craters around every dipole in `redplanet.Mag.depth.get_dataset()`.
+
+    Parameters
+    ----------
+    lon : float | np.ndarray
+        Longitude coordinate(s) in range [-180, 360].
+    lat : float | np.ndarray
+        Latitude coordinate(s) in range [-90, 90]. Coordinates are treated as paired points, so `lon` and `lat` must have the same shape (or one of them can be a scalar).
+    radius_km : float | np.ndarray
+        Search radius in km. Can be a scalar or have one value per point (i.e. broadcastable with `lon` and `lat`).
+    overlap : bool, optional
+        If True, return craters whose rim overlaps the search circle, i.e. the distance to the crater center is at most `radius_km` plus the crater radius (half of `diam`). Default is False, which only considers crater centers.
+    return_distance : bool, optional
+        If True, also return the distance to each crater center. Default is False.
+
+    Returns
+    -------
+    np.ndarray | list[np.ndarray] | tuple
+        If `lon`, `lat`, and `radius_km` are all scalars, an array with the row index of each matching crater in `redplanet.Craters.get(as_df=True)`, sorted from closest to furthest. Otherwise, a list with one such array per point (after flattening).
+
+        If `return_distance` is True, a tuple `(index, distance_km)` where both elements have the structure described above, and `distance_km` is the geodesic distance to each crater center in km.
+
+    Raises
+    ------
+    ValueError
+        - If `lon`, `lat`, and `radius_km` aren't broadcastable to the same shape.
+        - If any value of `radius_km` is negative.
+
+    Notes
+    -----
+    Candidates are found with a KD-tree over the crater centers on the unit sphere (using a search radius which is guaranteed to include every match), then filtered by their exact geodesic distance (see `redplanet.helper_functions.geodesy.get_distance`).
+    """
+
+    ## input validation
+    _verify_coords(lon, lat)
+    is_scalar = np.ndim(lon) == np.ndim(lat) == np.ndim(radius_km) == 0
+    try:
+        lon, lat, radius_km = np.broadcast_arrays(lon, lat, radius_km)
+    except ValueError:
+        raise ValueError(f'`lon`, `lat`, and `radius_km` must be broadcastable to the same shape. Got shapes {np.shape(lon)}, {np.shape(lat)}, and {np.shape(radius_km)}.')
+    radius_km = radius_km.ravel().astype(np.float64)
+    if np.any(radius_km < 0):
+        raise ValueError('`radius_km` must be non-negative.')
+
+    df = _get_dataset()
+    idx, distances_km = spatial_index._query_radius(
+        _get_kdtree(),
+        df[['lon', 'lat']].to_numpy(),
+        _plon2slon(lon.ravel().astype(np.float64)),
+        lat.ravel().astype(np.float64),
+        radius_km,
+        extra_km = (df['diam'].to_numpy() / 2) if overlap else None,
+    )
+
+    if is_scalar:
+        idx, distances_km = idx[0], distances_km[0]
+    if return_distance:
+        return idx, distances_km
+    return idx
+
 
-    if not as_df:
-        df = df.to_dict(orient='records')
 
-    return df
+def get_in_polygon(
+    lon     : np.ndarray,
+    lat     : np.ndarray,
+    overlap : bool = False,
+) -> np.ndarray:
+    """
+    Get all craters inside a polygon on the surface of Mars.
+
+    Parameters
+    ----------
+    lon : np.ndarray
+        Longitudes of the polygon vertices in range [-180, 360].
+    lat : np.ndarray
+        Latitudes of the polygon vertices in range [-90, 90]. Must have the same shape as `lon`.
+
+        Vertices are connected by great-circle arcs (i.e. shortest paths), and the polygon is closed automatically (repeating the first vertex at the end is optional). Polygons which cross the antimeridian are supported, but the polygon must fit within a hemisphere.
+    overlap : bool, optional
+        If True, return craters which overlap the polygon, i.e. the crater center is inside or the crater rim (a circle with radius half of `diam`) crosses an edge. Default is False, which only considers crater centers.
+
+    Returns
+    -------
+    np.ndarray
+        Sorted row indices of matching craters in `redplanet.Craters.get(as_df=True)`.
+
+    Raises
+    ------
+    ValueError
+        - If `lon` and `lat` don't have the same shape or there are fewer than 3 distinct vertices.
+        - If the polygon doesn't fit within a hemisphere.
+
+    Notes
+    -----
+    Points are tested with a gnomonic projection centered on the polygon, which maps great-circle edges to straight lines, so the test is exact for crater centers. When `overlap` is True, the distance from crater centers to edges is computed on a sphere with the mean radius of Mars, which differs from the geodesic distance by less than 1%.
+    """
+
+    ## input validation
+    _verify_coords(lon, lat)
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    if lon.shape != lat.shape:
+        raise ValueError(f'`lon` and `lat` must have the same shape. Got shapes {lon.shape} and {lat.shape}.')
+
+    vertices = _lonlat2xyz(lon.ravel(), lat.ravel())
+    ## drop repeated consecutive vertices (including a closing vertex)
+    is_distinct = np.linalg.norm(vertices - np.roll(vertices, 1, axis=0), axis=1) > 1e-12
+    vertices = vertices[is_distinct]
+    if vertices.shape[0] < 3:
+        raise ValueError('The polygon must have at least 3 distinct vertices.')
+
+    center = vertices.sum(axis=0)
+    norm = np.linalg.norm(center)
+    if (norm < 1e-12) or np.any(vertices @ (center / norm) <= 1e-9):
+        raise ValueError('The polygon must fit within a hemisphere.')
+    center /= norm
+
+
+    ## candidates are within the largest angle between the center and a vertex (plus the largest crater radius)
+    df = _get_dataset()
+    radius_angle = (df['diam'].to_numpy() / 2) / (_mean_radius_m / 1e3)
+    max_angle = np.arccos(np.clip(vertices @ center, -1, 1)).max()
+    if overlap:
+        max_angle += np.nanmax(radius_angle)
+    candidates = np.array(
+        _get_kdtree().query_ball_point(center, r=spatial_index._angle2chord(max_angle)),
+        dtype = int,
+    )
+    p = _lonlat2xyz(df['lon'].to_numpy()[candidates], df['lat'].to_numpy()[candidates])
+
+
+    ## gnomonic projection, then even-odd rule
+    e1 = np.cross([0, 0, 1], center) if abs(center[2]) < 0.9 else np.cross([1, 0, 0], center)
+    e1 /= np.linalg.norm(e1)
+    e2 = np.cross(center, e1)
+
+    def project(xyz):
+        xyz = xyz / (xyz @ center)[:, None]
+        return xyz @ e1, xyz @ e2
+
+    is_front = (p @ center) > 0
+    x, y = project(p[is_front])
+    x0, y0 = project(vertices)
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+
+    crosses = (y0 > y[:, None]) != (y1 > y[:, None])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x0 + (y[:, None] - y0) * (x1 - x0) / (y1 - y0)
+    is_inside = np.zeros(candidates.size, dtype=bool)
+    is_inside[is_front] = np.count_nonzero(crosses & (x[:, None] < x_cross), axis=1) % 2 == 1
+
+
+    ## crater rims which cross an edge
+    if overlap:
+        a = vertices
+        b = np.roll(vertices, -1, axis=0)
+        normal = np.cross(a, b)
+        normal /= np.linalg.norm(normal, axis=1, keepdims=True)
+        angle = spatial_index._get_angle_to_arcs(
+            p         = p[:, None, :],
+            a         = a,
+            b         = b,
+            normal    = normal,
+            tangent_a = np.cross(normal, a),
+            tangent_b = np.cross(normal, b),
+        ).min(axis=1)
+        is_inside |= angle <= radius_angle[candidates]
+
+    return np.sort(candidates[is_inside])
+
+
+
+def _between(
+    col    : pd.Series,
+    bounds : tuple[float, float],
+) -> np.ndarray:
+    """
+    Boolean mask for values within the given bounds (inclusive), equivalent to `pd.Series.between`.
+    """
+    values = col.to_numpy()
+    return (values >= bounds[0]) & (values <= bounds[1])
+
+
+
+
+def _format_craters(
+    df    : pd.DataFrame,
+    as_df : bool,
+) -> list[dict] | pd.DataFrame:
+    """
+    Convert (filtered) rows of the typed crater table to the output of `redplanet.Craters.get`, i.e. add age columns (as lists, or as three float columns for DataFrames) and restore the column order. This is only done for the rows being returned, since lists/dicts are much slower to work with.
+    """
+    ages = _get_ages()
+    rows = df.index.to_numpy()
+
+    columns = {}
+    for col in loader._columns:
+        if col in ages and as_df:
+            for i, suffix in enumerate(('', '_minus', '_plus')):
+                columns[col + suffix] = ages[col][rows, i]
+        elif col in ages:
+            columns[col] = [(age if age[0] == age[0] else None) for age in ages[col][rows].tolist()]  ## `x != x` only for NaN
+        elif as_df:
+            columns[col] = df[col]
+        else:
+            columns[col] = [(value if value == value else None) for value in df[col].tolist()]
+
+    if as_df:
+        return pd.DataFrame(columns, index=df.index)
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
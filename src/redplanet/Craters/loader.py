@@ -1,14 +1,19 @@
 import numpy as np
 import pandas as pd
+from scipy.spatial import cKDTree
 
 from redplanet.DatasetManager.main import _get_fpath_dataset
 
+from redplanet.helper_functions import spatial_index
 from redplanet.helper_functions.coordinates import _slon2plon
 from redplanet.helper_functions.docstrings.main import substitute_docstrings
 
 
 
-_df_craters: pd.DataFrame | None = None
+_df_craters: pd.DataFrame | None = None  ## typed columns (float64 with NaN for missing values), excluding ages
+_dat_ages: dict[str, np.ndarray] | None = None  ## age columns as float arrays with shape (num_craters, 3) ordered `[age, -err, +err]`, where rows are NaN when unavailable
+_columns: list[str] | None = None  ## order of columns in the output of `redplanet.Craters.get`
+_dat_kdtree: cKDTree | None = None  ## spatial index over crater centers (unit vectors), see `redplanet.Craters.get_nearest`
 
 
 def _get_dataset() -> pd.DataFrame:
@@ -18,13 +23,31 @@ def _get_dataset() -> pd.DataFrame:
     Returns
     -------
     pd.DataFrame
-        For description of columns, see `help(redplanet.Craters.get)`.
+        For description of columns, see `help(redplanet.Craters.get)`. Age columns are omitted, see `_get_ages`.
     """
     if _df_craters is None:
         _load()
     return _df_craters
 
 
+def _get_ages() -> dict[str, np.ndarray]:
+    """
+    Returns the age columns of the crater dataset as float arrays with shape (num_craters, 3), ordered `[age, -err, +err]` and aligned with the rows of `_get_dataset()`. Rows are NaN when the age is unavailable.
+    """
+    if _dat_ages is None:
+        _load()
+    return _dat_ages
+
+
+def _get_kdtree() -> cKDTree:
+    """
+    Returns the spatial index over crater centers (aligned with the rows of `_get_dataset()`). If the dataset has not been loaded yet, it will be loaded.
+    """
+    if _dat_kdtree is None:
+        _load()
+    return _dat_kdtree
+
+
 @substitute_docstrings
 def _load() -> None:
     """
@@ -35,24 +58,30 @@ def _load() -> None:
     {note._load}
     """
     fpath_df = _get_fpath_dataset('crater_db')
-    global _df_craters
-    _df_craters = pd.read_csv(fpath_df)
-
-    _df_craters['plon'] = _slon2plon(_df_craters['lon'])
-    _df_craters = _df_craters.replace(np.nan, None)
-
-    ## convert ages (e.g. '4.00;-0.08;0.05') to a list of floats
-    columns_to_convert = [col for col in _df_craters.columns if col.startswith('N_') or col.endswith('Age')]
-    def convert(val):
-        if isinstance(val, str):
-            parts = val.split(';')
-            if len(parts) == 3:
-                try:
-                    return [float(part) for part in parts]
-                except ValueError:
-                    return None
-        return None
+    df = pd.read_csv(fpath_df)
+    df['plon'] = _slon2plon(df['lon'])
+
+    global _columns
+    _columns = df.columns.tolist()
+
+    ## convert ages (e.g. '4.00;-0.08;0.05') to arrays of floats, where anything that isn't exactly three numbers is NaN
+    global _dat_ages
+    _dat_ages = {}
+    columns_to_convert = [col for col in df.columns if col.startswith('N_') or col.endswith('Age')]
     for col in columns_to_convert:
-        _df_craters[col] = _df_craters[col].apply(convert)
+        parts = df[col].astype('string').str.split(';', expand=True)
+        ages = np.full((len(df), 3), np.nan)
+        if parts.shape[1] >= 3:
+            values = parts.iloc[:, :3].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+            valid = ~np.isnan(values).any(axis=1) & parts.iloc[:, 3:].isna().all(axis=1).to_numpy()
+            ages[valid] = values[valid]
+        _dat_ages[col] = ages
+
+    global _df_craters
+    _df_craters = df.drop(columns=columns_to_convert)
+
+    ## build spatial index over crater centers
+    global _dat_kdtree
+    _dat_kdtree = spatial_index._build_tree(df['lon'].to_numpy(), df['lat'].to_numpy())
 
     return
@@ -11,7 +11,9 @@ from redplanet.helper_functions.docstrings.main import substitute_docstrings
 def get(
     lon       : float | np.ndarray,
     lat       : float | np.ndarray,
-    as_xarray : bool = False
+    as_xarray : bool = False,
+    pointwise : bool = False,
+    interp    : str  = 'nearest',
 ) -> float | np.ndarray | xr.DataArray:
     """
     Get Bouguer anomaly values at the specified coordinates. Dataset must be loaded first, see `redplanet.Crust.boug.load(...)`.
@@ -21,6 +23,8 @@ def get(
     {param.lon}
     {param.lat}
     {param.as_xarray}
+    {param.pointwise}
+    {param.interp}
 
     Returns
     -------
@@ -36,4 +40,6 @@ def get(
         lat = lat,
         var = 'boug',
         as_xarray = as_xarray,
+        pointwise = pointwise,
+        interp    = interp,
     )
@@ -87,6 +87,7 @@ def load(model: str = None) -> None:
 
         metadata = info[model]['metadata']
         metadata['fpath'] = fpath
+        metadata['short_name'] = model
 
         global _dat_boug
         _dat_boug = GriddedData(
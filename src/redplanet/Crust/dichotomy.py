@@ -5,16 +5,27 @@ from redplanet.DatasetManager.main import _get_fpath_dataset
 from redplanet.helper_functions.coordinates import (
     _verify_coords,
     _slon2plon,
+    _lonlat2xyz,
 )
+from redplanet.helper_functions import spatial_index
+from redplanet.helper_functions.geodesy import _mean_radius_m
 from redplanet.helper_functions.docstrings.main import substitute_docstrings
 
 
 
+_dat_dichotomy_coords: np.ndarray | None = None  ## parsed boundary coordinates (read-only), see `get_coords`
+_lookup: dict[str, np.ndarray] | None = None  ## precomputed segment lookup table, see `_get_lookup`
+_lookup_step: float = 0.01  ## longitude spacing of the lookup table (degrees)
+_distance_index: dict | None = None  ## spatial index over the boundary, see `_get_distance_index`
+
+
+
 @substitute_docstrings
 def is_above(
     lon       : float | np.ndarray,
     lat       : float | np.ndarray,
     as_xarray : bool = False,
+    pointwise : bool = False,
 ) -> bool | np.ndarray | xr.DataArray:
     """
     Determine if the given point(s) are above the dichotomy boundary.
@@ -26,30 +37,50 @@ def is_above(
     {param.lon}
     {param.lat}
     {param.as_xarray}
+    {param.pointwise}
 
     Returns
     -------
     bool | np.ndarray | xr.DataArray
-        Boolean array indicating whether the input coordinates are above the dichotomy boundary. If both inputs are 1D numpy arrays then it returns a 2D numpy array with shape `(len(lat), len(lon))`.
+        Boolean array indicating whether the input coordinates are above the dichotomy boundary. If both inputs are 1D numpy arrays then it returns a 2D numpy array with shape `(len(lat), len(lon))`, unless `pointwise` is True in which case there is one value per (`lon`, `lat`) pair, with the broadcast shape of the inputs (a bool if both are scalars).
+
+    Raises
+    ------
+    ValueError
+        If `pointwise` is True and the shapes of `lon` and `lat` are not compatible.
+
+    Notes
+    -----
+    The threshold latitude at each longitude is found by linear interpolation between the two neighboring boundary coordinates. The boundary is parsed once and indexed by a lookup table at 0.01 degree longitude spacing, so classifying N points is a handful of vectorized gathers rather than a search.
     """
 
     ## input validation
     _verify_coords(lon, lat)
     lon = _slon2plon(lon)
+    is_scalar = (np.ndim(lon) == 0) and (np.ndim(lat) == 0)
 
     lon = np.atleast_1d(lon)
     lat = np.atleast_1d(lat)
 
-    ## load dataset
-    dat_dichotomy_coords = get_coords()
+    if pointwise:
+        try:
+            lon, lat = np.broadcast_arrays(lon, lat)
+        except ValueError:
+            raise ValueError(f'When `pointwise=True`, `lon` and `lat` must have the same shape (or one must be a scalar). Got shapes {lon.shape} and {lat.shape}.')
 
-    ## for each input longitude, find nearest dichotomy coordinates
-    i_lons = np.searchsorted(dat_dichotomy_coords[:,0], lon, side='right') - 1
-    llons, llats = dat_dichotomy_coords[i_lons].T
-    rlons, rlats = dat_dichotomy_coords[i_lons+1].T
+    ## threshold latitude at each input longitude
+    tlats = _get_threshold_lats(lon)
 
-    ## linear interpolate between two nearest dichotomy coordinates to find threshold latitude
-    tlats = llats + (rlats - llats) * ( (lon - llons) / (rlons - llons) )
+    if pointwise:
+        result = lat >= tlats
+        if as_xarray:
+            return xr.DataArray(
+                result.ravel(),
+                dims   = ("point",),
+                coords = {"lon": ("point", lon.ravel()), "lat": ("point", lat.ravel())},
+            )
+        ## keep the broadcast shape of the inputs
+        return result.item() if is_scalar else result
 
     ## compare shape(y,1) with shape(x), which broadcasts to shape(y,x) with element-wise comparison
     result = lat[:, None] >= tlats
@@ -70,6 +101,102 @@ def is_above(
 
 
 
+@substitute_docstrings
+def get_distance(
+    lon        : float | np.ndarray,
+    lat        : float | np.ndarray,
+    as_xarray  : bool = False,
+    pointwise  : bool = False,
+    chunk_size : int  = 2**18,
+) -> float | np.ndarray | xr.DataArray:
+    """
+    Get the signed distance from the given point(s) to the dichotomy boundary.
+
+    See `help(redplanet.Crust.dichotomy.get_coords)` for the source of the dichotomy boundary coordinates data.
+
+    Parameters
+    ----------
+    {param.lon}
+    {param.lat}
+    {param.as_xarray}
+    {param.pointwise}
+    chunk_size : int, optional
+        Number of points processed at a time, which bounds memory usage for very large inputs. Default is 2^18.
+
+    Returns
+    -------
+    float | np.ndarray | xr.DataArray
+        Distance to the closest point on the dichotomy boundary in km, which is positive for points above the boundary (see `redplanet.Crust.dichotomy.is_above`) and negative for points below. Output shapes follow `redplanet.Crust.dichotomy.is_above`.
+
+    Raises
+    ------
+    ValueError
+        If `pointwise` is True and the shapes of `lon` and `lat` are not compatible.
+
+    Notes
+    -----
+    The boundary is treated as a closed polyline of great-circle arcs on a sphere with the mean radius of Mars (3389.5 km), which differs from distances on the reference ellipsoid by less than ~1%.
+
+    Distances are computed with a spatial index rather than comparing every point to every boundary arc: the sphere is divided into small longitude/latitude cells, and each cell lists the few boundary arcs (usually three or four) that can be closest to some point in the cell. Only those arcs are checked for each point, and the lists are built so that the true closest arc is never left out, so this is exact (not an approximation). The index is built on the first call (about a second), after which each point takes about a microsecond on a single core, regardless of its distance to the boundary.
+    """
+
+    ## input validation
+    _verify_coords(lon, lat)
+    lon = _slon2plon(lon)
+    is_scalar = (np.ndim(lon) == 0) and (np.ndim(lat) == 0)
+
+    lon = np.atleast_1d(lon)
+    lat = np.atleast_1d(lat)
+
+    if pointwise:
+        try:
+            lon, lat = np.broadcast_arrays(lon, lat)
+        except ValueError:
+            raise ValueError(f'When `pointwise=True`, `lon` and `lat` must have the same shape (or one must be a scalar). Got shapes {lon.shape} and {lat.shape}.')
+        lon_pts, lat_pts = lon, lat
+    else:
+        lon_pts, lat_pts = np.meshgrid(lon, lat)
+
+    shape = lon_pts.shape
+    lon_pts = lon_pts.ravel()
+    lat_pts = lat_pts.ravel()
+
+    ## unsigned distance (radians), in chunks
+    angle = np.empty(lon_pts.size)
+    for i0 in range(0, lon_pts.size, chunk_size):
+        i1 = min(lon_pts.size, i0 + chunk_size)
+        angle[i0:i1] = _get_angle_to_boundary(lon_pts[i0:i1], lat_pts[i0:i1])
+
+    ## sign
+    result = angle * (_mean_radius_m / 1e3)
+    result[~(lat_pts >= _get_threshold_lats(lon_pts))] *= -1
+    result = result.reshape(shape)
+
+    if pointwise:
+        if as_xarray:
+            return xr.DataArray(
+                result.ravel(),
+                dims   = ("point",),
+                coords = {"lon": ("point", lon.ravel()), "lat": ("point", lat.ravel())},
+            )
+        ## keep the broadcast shape of the inputs
+        return result.item() if is_scalar else result
+
+    ## remove singleton arrays/dimensions (i.e. one or both inputs were scalars)
+    result = np.squeeze(result)
+    if result.size == 1:
+        return result.item()
+
+    elif as_xarray:
+        result = xr.DataArray(
+            result,
+            dims   = ("lat", "lon"),
+            coords = {"lat": lat, "lon": lon},
+        )
+    return result
+
+
+
 @substitute_docstrings
 def get_coords() -> np.ndarray:
     """
@@ -80,8 +207,266 @@ def get_coords() -> np.ndarray:
     Returns
     -------
     np.ndarray
-        A numpy array of shape `(n, 2)` where `n` is the number of coordinates, and the two columns are longitude (0->360) and latitude respectively.
+        A read-only numpy array of shape `(n, 2)` where `n` is the number of coordinates, and the two columns are longitude (0->360) and latitude respectively. The file is only parsed the first time this is called (use `.copy()` if you need to modify the array).
+    """
+    global _dat_dichotomy_coords
+    if _dat_dichotomy_coords is None:
+        fpath = _get_fpath_dataset('dichotomy_coords')
+        dat_dichotomy_coords = np.loadtxt(fpath)
+        dat_dichotomy_coords.flags.writeable = False
+        _dat_dichotomy_coords = dat_dichotomy_coords
+    return _dat_dichotomy_coords
+
+
+
+def _get_lookup() -> dict[str, np.ndarray]:
+    """
+    Build (once) a lookup table which maps each bin of `_lookup_step` degrees longitude to the first boundary segment overlapping it.
+
+    The boundary is extended by one vertex on either side (shifted by 360 degrees) so segments cover the full range [0, 360] and wrap around the prime meridian.
+    """
+    global _lookup
+    if _lookup is None:
+        coords = get_coords()
+        lons = np.concatenate([[coords[-1, 0] - 360], coords[:, 0], [coords[0, 0] + 360]])
+        lats = np.concatenate([[coords[-1, 1]      ], coords[:, 1], [coords[0, 1]      ]])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slopes = np.diff(lats) / np.diff(lons)
+        slopes[~np.isfinite(slopes)] = 0  ## zero-width segments are never selected (see `_get_threshold_lats`)
+
+        num_bins = int(round(360 / _lookup_step)) + 1
+        first_segment = np.searchsorted(lons, np.arange(num_bins) * _lookup_step, side='right') - 1
+        first_segment = np.clip(first_segment, 0, slopes.size - 1)
+
+        _lookup = {
+            'lons'         : lons,
+            'lats'         : lats,
+            'slopes'       : slopes,
+            'first_segment': first_segment.astype(np.intp),
+        }
+        for array in _lookup.values():
+            array.flags.writeable = False
+    return _lookup
+
+
+
+def _get_threshold_lats(lon: np.ndarray) -> np.ndarray:
+    """
+    Get the latitude of the dichotomy boundary at each longitude (in range [0, 360]).
+    """
+    lookup = _get_lookup()
+    lons = lookup['lons']
+    num_segments = lookup['slopes'].size
+
+    ## start at the first segment overlapping each point's bin, then advance past any other vertices inside the bin (vertices are ~0.25 degrees apart, so this is rarely more than one extra step)
+    i_bin = np.clip((lon / _lookup_step).astype(np.intp), 0, lookup['first_segment'].size - 1)
+    i_seg = lookup['first_segment'][i_bin]
+    while True:
+        advance = (i_seg < num_segments - 1) & (lon >= lons[i_seg + 1])
+        if not advance.any():
+            break
+        i_seg += advance
+
+    return lookup['lats'][i_seg] + lookup['slopes'][i_seg] * (lon - lons[i_seg])
+
+
+
+def _get_distance_index(
+    max_arc_length : float = 0.25,
+    cell_size      : float = 0.75,
+    num_levels     : int   = 4,
+) -> dict:
+    """
+    Build (once) the spatial index over the boundary vertices on the unit sphere, where arcs longer than `max_arc_length` degrees are first split into shorter arcs (so every arc has a vertex close to any of its points). Arc `i` goes from vertex `i` to vertex `i+1`, and the last arc closes the loop. Also precompute the unit normal of each arc and the tangent directions at its endpoints.
+
+    The index is a raster of `cell_size`-degree longitude/latitude cells, where each cell lists the only vertices that can be an endpoint of the closest arc for some point in the cell (see `_filter_candidates`) -- this is usually one or two vertices. Lists are built from coarse to fine: every vertex is checked against cells that are `2^num_levels` times larger, then each level only checks the vertices kept by the parent cell. Finally, each cell stores the arcs on either side of its vertices.
+    """
+    global _distance_index
+    if _distance_index is None:
+        coords = get_coords()
+        start = _lonlat2xyz(coords[:, 0], coords[:, 1])
+        end = np.roll(start, -1, axis=0)
+
+        ## drop zero-length arcs (duplicated vertices)
+        arc_angle = np.arctan2(np.linalg.norm(np.cross(start, end), axis=1), np.einsum('ij,ij->i', start, end))
+        keep = arc_angle > 0
+        start, end, arc_angle = start[keep], end[keep], arc_angle[keep]
+        normal = np.cross(start, end)
+        normal /= np.linalg.norm(normal, axis=1, keepdims=True)
+
+        ## split long arcs by rotating their start point about the normal
+        num_pieces = np.ceil(np.degrees(arc_angle) / max_arc_length).astype(int)
+        arc = np.repeat(np.arange(arc_angle.size), num_pieces)
+        theta = ((np.arange(arc.size) - np.repeat(np.cumsum(num_pieces) - num_pieces, num_pieces)) / num_pieces[arc] * arc_angle[arc])[:, None]
+        vertices = start[arc] * np.cos(theta) + np.cross(normal[arc], start[arc]) * np.sin(theta)
+        normal = normal[arc]
+        vertices_next = np.roll(vertices, -1, axis=0)
+        max_half_arc = (arc_angle / num_pieces).max() / 2
+
+        ## candidate raster, from coarse to fine
+        cell, vertex = None, None
+        for level in range(num_levels, -1, -1):
+            center, radius = _get_cells(cell_size * 2**level)
+            num_cells = center.shape[0]
+            if cell is None:
+                cell = np.repeat(np.arange(num_cells), vertices.shape[0])
+                vertex = np.tile(np.arange(vertices.shape[0]), num_cells)
+            else:
+                ## each cell starts from the list of its parent (the cell twice as large containing it)
+                num_lon = 2 * int(round(180 / (cell_size * 2**level)))
+                i_cell = np.arange(num_cells)
+                parent = (i_cell // num_lon // 2) * (num_lon // 2) + (i_cell % num_lon) // 2
+                counts = np.diff(offsets)[parent]
+                cell = np.repeat(i_cell, counts)
+                vertex = vertex[np.repeat(offsets[parent] - (np.cumsum(counts) - counts), counts) + np.arange(cell.size)]
+
+            keep = _filter_candidates(center, radius, cell, vertex, vertices, max_half_arc)
+            cell, vertex = cell[keep], vertex[keep]
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(cell, minlength=num_cells))])
+
+        ## list the arcs on either side of each candidate vertex (once per cell, since neighboring vertices share an arc)
+        num_vertices = vertices.shape[0]
+        key = np.unique(np.concatenate([cell * num_vertices + vertex, cell * num_vertices + (vertex - 1) % num_vertices]))
+        cell, arc = np.divmod(key, num_vertices)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(cell, minlength=num_cells))])
+
+        _distance_index = {
+            'vertices'      : vertices,
+            'normal'        : normal,
+            'tangent_start' : np.cross(normal, vertices),
+            'tangent_end'   : np.cross(normal, vertices_next),
+            'max_half_arc'  : max_half_arc,
+            'cell_size'     : cell_size,
+            'cell_offsets'  : offsets,
+            'cell_arcs'     : arc,
+        }
+    return _distance_index
+
+
+
+def _get_cells(cell_size: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get the unit vector at the center of each `cell_size`-degree longitude/latitude cell (ordered by latitude from the south pole, then by longitude from 0), and the angle (radians) from the center to the farthest point of the cell.
+    """
+    num_lat = int(round(180 / cell_size))
+    lon, lat = np.meshgrid(
+        (np.arange(2 * num_lat) + 0.5) * cell_size,
+        (np.arange(num_lat) + 0.5) * cell_size - 90,
+    )
+    lon, lat = lon.ravel(), lat.ravel()
+    center = _lonlat2xyz(lon, lat)
+
+    ## the farthest point is the corner closer to the equator (a small margin covers rounding errors)
+    corner = _lonlat2xyz(lon + cell_size / 2, lat - np.sign(lat) * cell_size / 2)
+    radius = spatial_index._chord2angle(np.linalg.norm(center - corner, axis=1)) + 1e-9
+    return center, radius
+
+
+
+def _filter_candidates(
+    center       : np.ndarray,
+    radius       : np.ndarray,
+    cell         : np.ndarray,
+    vertex       : np.ndarray,
+    vertices     : np.ndarray,
+    max_half_arc : float,
+) -> np.ndarray:
+    """
+    Given pairs of cell and vertex indices (grouped by cell, with at least one vertex per cell), get a mask of the pairs to keep.
+
+    Let `w` be the listed vertex closest to the center `c` of a cell with radius `r`. For any point `p` in the cell, the closest arc has an endpoint within `R(angle(p, w))` (see `_get_candidate_radius`), so a vertex `v` can be dropped if it is farther than that from every point in the cell. With `a = angle(c, v)` and `b = angle(c, w)`, this holds if either:
+        - `a - r > R(b + r)`, by the triangle inequality; or
+        - `(a - b) - r * G > R(max(b - r, 0)) - max(b - r, 0)`, where `G` bounds the gradient of `angle(p, v) - angle(p, w)` within the cell, since `R(x) - x` never increases with `x`.
+    The first test handles cells that contain `w` or `v` (where `G` is unbounded), and the second handles cells far from the boundary. Vertex `w` is always kept.
+    """
+    angle = spatial_index._chord2angle(np.linalg.norm(center[cell] - vertices[vertex], axis=1))
+    counts = np.bincount(cell, minlength=center.shape[0])
+    starts = np.cumsum(counts) - counts
+    b = np.minimum.reduceat(angle, starts)
+
+    ## closest vertex to each cell center (the first one, if tied)
+    i_closest = np.flatnonzero(angle == b[cell])
+    w = vertex[i_closest[np.searchsorted(cell[i_closest], np.arange(center.shape[0]))]]
+
+    def min_sin(x, r):
+        ## lower bound of sin over [x - r, x + r]
+        return np.minimum(np.sin(np.maximum(x - r, 0)), np.sin(np.minimum(x + r, np.pi)))
+
+    r = radius[cell]
+    near = np.maximum(b - radius, 0)
+    far = b + radius
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gradient = np.linalg.norm(vertices[vertex] - vertices[w[cell]], axis=1) / np.sqrt(min_sin(angle, r) * min_sin(b[cell], r))
+        drop = (
+            ((angle - b[cell]) - r * gradient > (_get_candidate_radius(near, max_half_arc) - near)[cell])
+            | (angle - r > _get_candidate_radius(far, max_half_arc)[cell])
+        )
+    return ~drop  ## NaN comparisons are false, so undetermined pairs are kept
+
+
+
+def _get_candidate_radius(
+    angle        : np.ndarray,
+    max_half_arc : float,
+) -> np.ndarray:
+    """
+    Get the angle (radians) within which every arc closer than `angle` has an endpoint, given that no arc is longer than `2 * max_half_arc`. A small margin covers rounding errors.
+
+    If the closest point of an arc is at angle `d`, it is at most `max_half_arc` away from the nearer endpoint along the arc, so by the spherical Pythagorean theorem that endpoint is within `arccos(cos(d) * cos(max_half_arc))`.
+    """
+    cos_angle = np.cos(angle)
+    radius = np.where(
+        cos_angle > 0,
+        np.arccos(np.minimum(cos_angle * np.cos(max_half_arc), 1)),
+        angle,  ## beyond 90 degrees, the endpoint is never farther than the closest point of the arc
+    )
+    return np.minimum(radius + 1e-9, np.pi)
+
+
+
+def _get_angle_to_boundary(
+    lon : np.ndarray,
+    lat : np.ndarray,
+) -> np.ndarray:
+    """
+    Get the exact angular distance (radians) from points given by 1D arrays `lon` (in range [0, 360]) and `lat` to the closest boundary arc, by checking the arcs listed for the cell containing the point (see `_get_distance_index`).
+    """
+    index = _get_distance_index()
+    cell_size = index['cell_size']
+    offsets = index['cell_offsets']
+    num_lat = int(round(180 / cell_size))
+    num_lon = 2 * num_lat
+
+    ## cells are closed (up to rounding errors), so points on an edge can use either cell
+    i_lat = np.clip(((lat + 90) / cell_size).astype(np.intp), 0, num_lat - 1)
+    i_lon = np.clip((lon / cell_size).astype(np.intp), 0, num_lon - 1)
+    cell = i_lat * num_lon + i_lon
+
+    counts = offsets[cell + 1] - offsets[cell]
+    starts = np.cumsum(counts) - counts
+    point = np.repeat(np.arange(lon.size), counts)
+    arcs = index['cell_arcs'][np.repeat(offsets[cell] - starts, counts) + np.arange(point.size)]
+
+    angle = _get_angle_to_arcs(_lonlat2xyz(lon, lat)[point], arcs[:, None], index)[:, 0]
+    return np.minimum.reduceat(angle, starts)
+
+
+
+def _get_angle_to_arcs(
+    xyz   : np.ndarray,
+    arcs  : np.ndarray,
+    index : dict,
+) -> np.ndarray:
+    """
+    Get the angular distance (radians) from each point in `xyz` (shape (n, 3)) to each of its candidate arcs `arcs` (shape (n, k)).
     """
-    fpath = _get_fpath_dataset('dichotomy_coords')
-    dat_dichotomy_coords = np.loadtxt(fpath)
-    return dat_dichotomy_coords
+    vertices = index['vertices']
+    return spatial_index._get_angle_to_arcs(
+        p         = xyz[:, None, :],
+        a         = vertices[arcs],
+        b         = vertices[(arcs + 1) % vertices.shape[0]],
+        normal    = index['normal'][arcs],
+        tangent_a = index['tangent_start'][arcs],
+        tangent_b = index['tangent_end'][arcs],
+    )
@@ -1,6 +1,7 @@
-from redplanet.Crust.moho.loader import load, get_dataset, get_metadata
+from redplanet.Crust.moho.loader import load, get_dataset, get_metadata, clear_cache
 from redplanet.Crust.moho.getter import get
 from redplanet.Crust.moho.consts import get_registry
+from redplanet.Crust.moho.ensemble import get_ensemble
 
 __all__ = [
     'load',
@@ -8,4 +9,6 @@ __all__ = [
     'get_metadata',
     'get',
     'get_registry',
+    'clear_cache',
+    'get_ensemble',
 ]
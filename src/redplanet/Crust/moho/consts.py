@@ -1,9 +1,12 @@
 import pandas as pd
 
 from redplanet.DatasetManager.main import _get_fpath_dataset
+from redplanet.DatasetManager.dataset_info import _get_moho_registry
 
 
 
+_registry: dict = {}  ## `get_registry` output, cached along with the raw registry it was built from
+
 def get_registry() -> pd.DataFrame:
     """
     Get a list of all available Moho models.
@@ -13,14 +16,15 @@ def get_registry() -> pd.DataFrame:
     pd.DataFrame
         DataFrame with the following columns: ['interior_model', 'insight_thickness', 'rho_south', 'rho_north']. For an explanation of these columns, see parameters of `redplanet.Crust.moho.load()`.
     """
-    registry = pd.read_csv(
-        _get_fpath_dataset('moho_registry'),
-        usecols = ['model_name'],
-    )
-    registry = registry['model_name'].str.split('-', expand=True)
-    registry.columns = ['interior_model', 'insight_thickness', 'rho_south', 'rho_north']
-    registry.iloc[:,1:] = registry.iloc[:,1:].astype(int)
-    return registry
+    df_raw = _get_moho_registry(_get_fpath_dataset('moho_registry'))[0]
+
+    if _registry.get('source') is not df_raw:
+        registry = df_raw['model_name'].str.split('-', expand=True)
+        registry.columns = ['interior_model', 'insight_thickness', 'rho_south', 'rho_north']
+        registry[registry.columns[1:]] = registry[registry.columns[1:]].astype(int)
+        _registry.update(source=df_raw, registry=registry)
+
+    return _registry['registry'].copy()
 
 
 
@@ -0,0 +1,211 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from redplanet.DatasetManager.main import _get_fpath_dataset
+from redplanet.DatasetManager.dataset_info import _get_download_info_moho
+from redplanet.helper_functions.GriddedData import GriddedData
+from redplanet.helper_functions.coordinates import _verify_coords
+from redplanet.helper_functions.parallel import _get_user_config, _init_worker
+from redplanet.helper_functions.misc import _parse_percentile
+from redplanet.Crust.moho.loader import _load_grids, _get_model_name
+
+from redplanet.helper_functions.docstrings.main import substitute_docstrings
+
+
+
+
+
+_registry_columns: list[str] = ['interior_model', 'insight_thickness', 'rho_south', 'rho_north']
+
+
+
+@substitute_docstrings
+def get_ensemble(
+    registry    : pd.DataFrame,
+    lon         : float | np.ndarray,
+    lat         : float | np.ndarray,
+    crthick     : bool = False,
+    interp      : str  = 'nearest',
+    stats       : list[str] | None = None,
+    max_workers : int | None = None,
+) -> xr.DataArray:
+    """
+    Evaluate many Moho models (or derived crustal thickness) at the same set of points, e.g. to quantify the spread across interior models and crustal densities at a few sites.
+
+    This is equivalent to (but much faster than) calling `redplanet.Crust.moho.load(...)` and `redplanet.Crust.moho.get(..., pointwise=True)` for each row of `registry`. Models are loaded in parallel across a pool of worker processes, and it doesn't affect the currently loaded Moho model.
+
+    Parameters
+    ----------
+    registry : pd.DataFrame
+        Models to evaluate, i.e. a subset of the rows of `redplanet.Crust.moho.get_registry()`. Must have columns ['interior_model', 'insight_thickness', 'rho_south', 'rho_north'].
+    {param.lon}
+    {param.lat}
+    crthick : bool, optional
+        If True, return crustal thickness values rather than the depth of the Moho. Default is False.
+    {param.interp}
+    stats : list[str] | None, optional
+        If None (default), return the values of every model at every point. Otherwise, return summary statistics across models for each point, where options are 'mean', 'std', 'min', 'max', 'median', and percentiles given as 'p' followed by a number in [0, 100] (e.g. 'p5', 'p97.5').
+    max_workers : int | None, optional
+        Number of worker processes. Default is None, which uses the number of CPUs. If 1, models are evaluated in the current process.
+
+    Returns
+    -------
+    xr.DataArray
+        - If `stats` is None: array with dims `('model', 'point')`, where the 'model' dim has coordinates for the model name and each registry column.
+        - Otherwise: array with dims `('stat', 'point')`.
+
+        In both cases, the 'point' dim has 'lon' and 'lat' coordinates. Units are meters [m].
+
+    Raises
+    ------
+    ValueError
+        - If `registry` is missing required columns or is empty.
+        - If `lon` and `lat` don't have the same shape (one of them can be a scalar).
+        - If a requested statistic is not recognized.
+    MohoDatasetNotFoundError
+        If a row of `registry` doesn't correspond to an available model.
+
+    Notes
+    -----
+    Points are treated as paired coordinates (like `pointwise=True` in `redplanet.Crust.moho.get`), and multi-dimensional inputs are flattened.
+
+    Each worker only returns the values at the requested points, so the number of full grids in memory at any time is bounded by the number of workers regardless of how many models are evaluated. Expanded grids are cached on disk after the first time a model is used (see `redplanet.Crust.moho.load`), so repeated sweeps mostly consist of memory-mapping files.
+    """
+
+    ## input validation
+    missing = [col for col in _registry_columns if col not in registry.columns]
+    if missing:
+        raise ValueError(f'`registry` is missing columns: {missing}. Use a subset of the rows from `redplanet.Crust.moho.get_registry()`.')
+    if len(registry) == 0:
+        raise ValueError('`registry` is empty.')
+
+    _verify_coords(lon, lat)
+    try:
+        lon, lat = np.broadcast_arrays(np.atleast_1d(lon), np.atleast_1d(lat))
+    except ValueError:
+        raise ValueError(f'`lon` and `lat` must have the same shape (or one must be a scalar). Got shapes {np.shape(lon)} and {np.shape(lat)}.')
+    lon = lon.ravel()
+    lat = lat.ravel()
+
+    if stats is not None:
+        stats = list(stats)
+        for stat in stats:
+            _compute_stat(np.zeros((1, 1)), stat)  ## raises ValueError if unknown
+
+
+    ## evaluate models
+    model_names = [
+        _get_model_name(*row)
+        for row in registry[_registry_columns].itertuples(index=False, name=None)
+    ]
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(model_names))
+
+    ## shared datasets are fetched up front so workers don't race to download them
+    _get_fpath_dataset('moho_registry')
+    _get_fpath_dataset('MOLA_shape_719')
+
+    args = [(model_name, lon, lat, crthick, interp) for model_name in model_names]
+
+    if max_workers == 1:
+        values = [_evaluate_model(arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(
+            max_workers = max_workers,
+            initializer = _init_worker,
+            initargs    = (_get_user_config(),),
+        ) as executor:
+            values = list(executor.map(
+                _evaluate_model,
+                args,
+                chunksize = max(1, len(args) // (4 * max_workers)),
+            ))
+
+    values = np.stack(values)  ## shape (model, point)
+
+
+    ## output
+    coords_point = {
+        'lon': ('point', lon),
+        'lat': ('point', lat),
+    }
+    attrs = {
+        'units': 'm',
+        'quantity': 'crthick' if crthick else 'moho',
+    }
+
+    if stats is None:
+        coords_model = {'model': model_names}
+        for col in _registry_columns:
+            coords_model[col] = ('model', registry[col].to_numpy())
+        return xr.DataArray(
+            data   = values,
+            dims   = ['model', 'point'],
+            coords = {**coords_model, **coords_point},
+            attrs  = attrs,
+        )
+
+    return xr.DataArray(
+        data   = np.stack([_compute_stat(values, stat) for stat in stats]),
+        dims   = ['stat', 'point'],
+        coords = {'stat': stats, **coords_point},
+        attrs  = {**attrs, 'num_models': len(model_names)},
+    )
+
+
+
+
+
+def _evaluate_model(
+    args: tuple[str, np.ndarray, np.ndarray, bool, str],
+) -> np.ndarray:
+    """
+    Load a single Moho model and evaluate it at paired coordinates (runs in a worker process).
+    """
+    model_name, lon, lat, crthick, interp = args
+
+    info_moho = _get_download_info_moho(
+        model_name          = model_name,
+        fpath_moho_registry = _get_fpath_dataset('moho_registry'),
+    )
+    grids = _load_grids(model_name, info_moho)
+
+    dat = GriddedData(
+        lon       = grids['lon'],
+        lat       = grids['lat'],
+        is_slon   = False,
+        data_dict = {'dat': grids['crthick'] if crthick else grids['moho']},
+        metadata  = {},
+    )
+    return np.asarray(dat.get_values(lon, lat, 'dat', pointwise=True, interp=interp), dtype=np.float64).reshape(lon.shape)
+
+
+
+def _compute_stat(
+    values : np.ndarray,
+    stat   : str,
+) -> np.ndarray:
+    """
+    Compute a summary statistic across models (axis 0).
+    """
+    match stat:
+        case 'mean':
+            return values.mean(axis=0)
+        case 'std':
+            return values.std(axis=0)
+        case 'min':
+            return values.min(axis=0)
+        case 'max':
+            return values.max(axis=0)
+
+    q = _parse_percentile(stat)
+    if q is not None:
+        return np.percentile(values, q, axis=0)
+
+    raise ValueError(f'Unknown statistic: "{stat}". Options are "mean", "std", "min", "max", "median", or a percentile like "p5" or "p97.5".')
@@ -1,7 +1,8 @@
 import numpy as np
 import xarray as xr
 
-from redplanet.Crust.moho.loader import get_dataset
+from redplanet.Crust.moho.loader import get_dataset, _get_coeffs
+from redplanet.helper_functions.spherical_harmonics import expand_points, _get_values_exact
 
 from redplanet.helper_functions.docstrings.main import substitute_docstrings
 
@@ -12,7 +13,9 @@ def get(
     lon       : float | np.ndarray,
     lat       : float | np.ndarray,
     crthick   : bool = False,
-    as_xarray : bool = False
+    as_xarray : bool = False,
+    pointwise : bool = False,
+    interp    : str  = 'nearest',
 ) -> float | np.ndarray | xr.DataArray:
     """
     Get Mohorovičić discontinuity depth (or derived crustal thickness) values at the specified coordinates. Dataset must be loaded first, see `redplanet.Crust.moho.load(...)`.
@@ -24,6 +27,8 @@ def get(
     crthick : bool, optional
         If True, return crustal thickness values, which is just the difference between the moho and a spherical harmonic model of topography evaluated to the same degree (same method as {@Wieczorek2022_icta.n}). Default is False.
     {param.as_xarray}
+    {param.pointwise}
+    {param.interp_sh}
 
     Returns
     -------
@@ -34,9 +39,22 @@ def get(
 
     dat_moho = get_dataset()
 
+    if interp == 'sh_exact':
+        coeffs = _get_coeffs(crthick)
+        return _get_values_exact(
+            evaluate  = lambda lon, lat: expand_points(coeffs.coeffs, lon, lat, coeffs.normalization, coeffs.csphase),
+            lon       = lon,
+            lat       = lat,
+            as_xarray = as_xarray,
+            pointwise = pointwise,
+            attrs     = dict(dat_moho.metadata),
+        )
+
     return dat_moho.get_values(
         lon = lon,
         lat = lat,
         var = 'crthick' if crthick else 'moho',
         as_xarray = as_xarray,
+        pointwise = pointwise,
+        interp    = interp,
     )
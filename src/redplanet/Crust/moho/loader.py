@@ -1,12 +1,22 @@
 import numpy as np
 import pyshtools as pysh
 
+from redplanet.user_config import get_dirpath_datacache
 from redplanet.DatasetManager.main import _get_fpath_dataset
+from redplanet.DatasetManager.derived import (
+    _get_dirpath_derived,
+    _load_derived,
+    _save_derived,
+)
 from redplanet.helper_functions.GriddedData import GriddedData
 
 from redplanet.helper_functions.docstrings.main import substitute_docstrings
 
-from redplanet.DatasetManager.dataset_info import MohoDatasetNotFoundError
+from redplanet.DatasetManager.dataset_info import (
+    _get_download_info,
+    _get_download_info_moho,
+    MohoDatasetNotFoundError,
+)
 from redplanet.Crust.moho.consts import _interior_models
 
 
@@ -15,6 +25,10 @@ from redplanet.Crust.moho.consts import _interior_models
 
 _dat_moho: GriddedData | None = None
 
+_shape_grids: dict[int, np.ndarray] = {}  ## expanded MOLA shape model, keyed by `lmax` -- see `_get_shape_grid`
+_shape_coeffs: dict[int, pysh.SHCoeffs] = {}  ## MOLA shape model coefficients, keyed by `lmax` -- see `_get_shape_coeffs`
+_coeffs: dict[str, pysh.SHCoeffs] = {}  ## coefficients of the currently loaded model (keys 'moho' and 'crthick'), only read when needed -- see `_get_coeffs`
+
 @substitute_docstrings
 def get_dataset() -> GriddedData:
     """
@@ -31,6 +45,16 @@ def get_metadata() -> dict:
     """
     return dict(get_dataset().metadata)
 
+def clear_cache() -> None:
+    """
+    Clear the in-memory cache of the MOLA shape model (expanded grid and coefficients).
+
+    When loading a Moho model for the first time, crustal thickness is computed by subtracting the Moho from the shape of Mars, which is expanded from spherical harmonic coefficients. The shape is identical for every Moho model, so it's only expanded once per process and then kept in memory (~0.5 MB) to speed up loading many models. Call this function to free that memory.
+    """
+    _shape_grids.clear()
+    _shape_coeffs.clear()
+    return
+
 
 
 
@@ -94,17 +118,18 @@ def load(
         - [interior model files](https://github.com/MarkWieczorek/ctplanet/tree/74e8550080d4adc68ae291a500e8d198a40d437c/examples/Data/Mars-reference-interior-models){target="_blank"}
     """
 
-    ## load moho
-
     if interior_model not in _interior_models:
         raise ValueError(
             f'Unknown interior model: "{interior_model}".\n'
             f'Options are: {", ".join(_interior_models)}.'
         )
 
+    model_name = _get_model_name(interior_model, insight_thickness, rho_south, rho_north)
+
     try:
-        fpath_moho = _get_fpath_dataset(
-            f'Moho-Mars-{interior_model}-{insight_thickness}-{rho_south}-{rho_north}'
+        info_moho = _get_download_info_moho(
+            model_name          = model_name,
+            fpath_moho_registry = _get_fpath_dataset('moho_registry'),
         )
     except MohoDatasetNotFoundError as e:
         if fail_silently:
@@ -112,29 +137,7 @@ def load(
         else:
             raise
 
-    ds_moho = (
-        pysh.SHCoeffs.from_file(fpath_moho)
-        .expand()
-        .to_xarray()
-        .isel(lat=slice(None, None, -1))  ## in pysh, lats are always decreasing at first
-    )
-
-
-
-    ## load shape
-
-    fpath_shape = _get_fpath_dataset('MOLA_shape_719')
-
-    ds_shape = (
-        pysh.SHCoeffs.from_file(
-            fpath_shape,
-            lmax   = 90,
-            format = 'bshc'
-        )
-        .expand()
-        .to_xarray()
-        .isel(lat=slice(None, None, -1))
-    )
+    grids = _load_grids(model_name, info_moho, lmax=90)
 
 
 
@@ -142,16 +145,17 @@ def load(
 
     global _dat_moho
 
+    _coeffs.clear()
     _dat_moho = GriddedData(
-        lon       = ds_moho.lon.values,
-        lat       = ds_moho.lat.values,
+        lon       = grids['lon'],
+        lat       = grids['lat'],
         is_slon   = False,
         data_dict = {
-            'moho'   : ds_moho.values,
-            'crthick': (ds_shape - ds_moho).values,
+            'moho'   : grids['moho'],
+            'crthick': grids['crthick'],
         },
         metadata  = {
-            'title': f'{interior_model}-{insight_thickness}-{rho_south}-{rho_north}',
+            'title': model_name,
             'units': 'm',
             'model_params': {
                 'interior_model'      : interior_model,
@@ -161,7 +165,7 @@ def load(
             },
             'lmax': 90,
             'source' : 'https://doi.org/10.5281/zenodo.6477509',
-            'fpath': fpath_moho,
+            'fpath': get_dirpath_datacache() / info_moho['dirpath'] / info_moho['fname'],
         },
     )
 
@@ -170,3 +174,149 @@ def load(
     if fail_silently:
         return True
     return
+
+
+
+
+
+def _get_model_name(
+    interior_model    : str,
+    insight_thickness : int | float | str,
+    rho_south         : int | float | str,
+    rho_north         : int | float | str,
+) -> str:
+    """
+    Get the name of a Moho model as it appears in the registry, e.g. 'Khan2022-38-2900-2900'. Whole numbers are formatted as integers, so parameters read as floats (e.g. from a registry DataFrame with missing values or after arithmetic) still match.
+    """
+    def format_param(value: int | float | str) -> str:
+        if isinstance(value, str):
+            return value
+        if float(value).is_integer():
+            return str(int(value))
+        return str(value)
+
+    return '-'.join([interior_model] + [format_param(value) for value in (insight_thickness, rho_south, rho_north)])
+
+
+
+def _load_grids(
+    model_name : str,
+    info_moho  : dict,
+    lmax       : int = 90,
+) -> dict[str, np.ndarray]:
+    """
+    Get the expanded Moho and crustal thickness grids for a model, along with their coordinates (keys: 'lon', 'lat', 'moho', 'crthick'). The MOLA shape is truncated to degree `lmax`, which should match the degree of the Moho models.
+
+    Expanding the spherical harmonic coefficients dominates the time it takes to load a model, so the grids are cached as `.npy` files in the data cache and opened as read-only memory-mapped arrays on subsequent loads. The cache is keyed by the model name, `lmax`, and the hashes of the source datasets (Moho coefficients and MOLA shape), so it's invalidated automatically if a source dataset changes.
+    """
+    names = ['lon', 'lat', 'moho', 'crthick']
+
+    key = '-'.join([
+        model_name,
+        f'lmax{lmax}',
+        info_moho['hash']['sha1'][:16],
+        _get_download_info('MOLA_shape_719')['hash']['md5'][:16],
+    ])
+    dirpath_grids = _get_dirpath_derived('Crust/moho/expanded/', key)
+
+    grids = _load_derived(dirpath_grids, names)
+    if grids is not None:
+        return grids
+
+    grids = _expand_grids(model_name, lmax)
+    _save_derived(dirpath_grids, grids)
+    return grids
+
+
+
+def _expand_grids(
+    model_name : str,
+    lmax       : int = 90,
+) -> dict[str, np.ndarray]:
+    """
+    Expand the spherical harmonic coefficients of a Moho model into grids (no disk caching, see `_load_grids`).
+    """
+
+    fpath_moho = _get_fpath_dataset(f'Moho-Mars-{model_name}')
+
+    ds_moho = (
+        pysh.SHCoeffs.from_file(fpath_moho)
+        .expand()
+        .to_xarray()
+        .isel(lat=slice(None, None, -1))  ## in pysh, lats are always decreasing at first
+    )
+
+    return {
+        'lon'    : ds_moho.lon.values,
+        'lat'    : ds_moho.lat.values,
+        'moho'   : ds_moho.values,
+        'crthick': _get_shape_grid(lmax) - ds_moho.values,
+    }
+
+
+
+def _get_shape_grid(lmax: int = 90) -> np.ndarray:
+    """
+    Get the MOLA shape model expanded to degree `lmax` (indexed `[lat, lon]` with increasing latitudes, same grid as the Moho models), which is used to compute crustal thickness.
+
+    Parsing and expanding the coefficients is the same for every Moho model, so the result is cached in memory for the lifetime of the process (see `clear_cache`).
+    """
+    grid = _shape_grids.get(lmax)
+    if grid is None:
+        fpath_shape = _get_fpath_dataset('MOLA_shape_719')
+        grid = (
+            pysh.SHCoeffs.from_file(
+                fpath_shape,
+                lmax   = lmax,
+                format = 'bshc'
+            )
+            .expand()
+            .to_array()[::-1]  ## in pysh, lats are always decreasing at first
+        )
+        grid.flags.writeable = False
+        _shape_grids[lmax] = grid
+    return grid
+
+
+
+def _get_shape_coeffs(lmax: int = 90) -> pysh.SHCoeffs:
+    """
+    Get the MOLA shape model coefficients truncated to degree `lmax`, cached in memory for the lifetime of the process (see `clear_cache`).
+    """
+    coeffs = _shape_coeffs.get(lmax)
+    if coeffs is None:
+        coeffs = pysh.SHCoeffs.from_file(
+            _get_fpath_dataset('MOLA_shape_719'),
+            lmax   = lmax,
+            format = 'bshc'
+        )
+        _shape_coeffs[lmax] = coeffs
+    return coeffs
+
+
+
+def _get_coeffs(crthick: bool = False) -> pysh.SHCoeffs:
+    """
+    Get the spherical harmonic coefficients of the currently loaded Moho model (or crustal thickness, i.e. MOLA shape minus Moho, truncated to the same degree). These aren't needed to access the pre-expanded grids, so they're only read on first use (e.g. `redplanet.Crust.moho.get(..., interp='sh_exact')`).
+    """
+    key = 'crthick' if crthick else 'moho'
+
+    if key not in _coeffs:
+        metadata = get_dataset().metadata
+
+        if 'moho' not in _coeffs:
+            _coeffs['moho'] = pysh.SHCoeffs.from_file(_get_fpath_dataset(f'Moho-Mars-{metadata["title"]}'))
+        coeffs_moho = _coeffs['moho']
+
+        if crthick:
+            coeffs_shape = _get_shape_coeffs(metadata['lmax'])
+            if (coeffs_shape.normalization, coeffs_shape.csphase) != (coeffs_moho.normalization, coeffs_moho.csphase):
+                coeffs_shape = coeffs_shape.convert(normalization=coeffs_moho.normalization, csphase=coeffs_moho.csphase)
+            lmax = min(coeffs_shape.lmax, coeffs_moho.lmax)
+            _coeffs['crthick'] = pysh.SHCoeffs.from_array(
+                coeffs_shape.coeffs[:, :lmax+1, :lmax+1] - coeffs_moho.coeffs[:, :lmax+1, :lmax+1],
+                normalization = coeffs_moho.normalization,
+                csphase       = coeffs_moho.csphase,
+            )
+
+    return _coeffs[key]
@@ -9,9 +9,12 @@ from redplanet.helper_functions.docstrings.main import substitute_docstrings
 
 @substitute_docstrings
 def get(
-    lon       : float | np.ndarray,
-    lat       : float | np.ndarray,
-    as_xarray : bool = False
+    lon           : float | np.ndarray,
+    lat           : float | np.ndarray,
+    as_xarray     : bool = False,
+    pointwise     : bool = False,
+    interp        : str  = 'nearest',
+    use_overviews : bool = True,
 ) -> float | np.ndarray | xr.DataArray:
     """
     Get topography values at the specified coordinates. Dataset must be loaded first, see `redplanet.Crust.topo.load(...)`.
@@ -21,6 +24,10 @@ def get(
     {param.lon}
     {param.lat}
     {param.as_xarray}
+    {param.pointwise}
+    {param.interp}
+    use_overviews : bool, optional
+        If True (default), grids (i.e. `pointwise=False`) are read from the coarsest pre-computed overview of the 'DEM_' models whose resolution is still at least as fine as the spacing of the requested grid, which makes coarse/global grids much cheaper. Set to False to always read the full resolution data. See `redplanet.Crust.topo.load(...)` for more details.
 
     Returns
     -------
@@ -32,8 +39,11 @@ def get(
     dat_topo = get_dataset()
 
     return dat_topo.get_values(
-        lon = lon,
-        lat = lat,
-        var = 'topo',
-        as_xarray = as_xarray,
+        lon           = lon,
+        lat           = lat,
+        var           = 'topo',
+        as_xarray     = as_xarray,
+        pointwise     = pointwise,
+        interp        = interp,
+        use_overviews = use_overviews,
     )
@@ -1,7 +1,9 @@
 import numpy as np
 
 from redplanet.DatasetManager.main import _get_fpath_dataset
+from redplanet.DatasetManager.dataset_info import _get_download_info
 from redplanet.helper_functions.GriddedData import GriddedData
+from redplanet.helper_functions.overviews import get_overviews
 
 from redplanet.helper_functions.docstrings.main import substitute_docstrings
 
@@ -32,7 +34,10 @@ def get_metadata() -> dict:
 
 
 @substitute_docstrings
-def load(model: str = None) -> None:
+def load(
+    model     : str  = None,
+    overviews : bool = True,
+) -> None:
     """
     Load a topography model.
 
@@ -50,6 +55,9 @@ def load(model: str = None) -> None:
 
         For description of our modifications to the original data, see notes section.
 
+    overviews : bool, optional
+        Only applies to 'DEM_' models. If True (default), attach a pyramid of coarser block-averaged copies of the DEM ("overviews", each level halving the resolution down to ~1000 columns), which `redplanet.Crust.topo.get` uses to serve coarse grids (e.g. global maps) without reading the full resolution data. The overviews are built the first time a DEM is loaded (this streams through the DEM once, in bounded memory) and cached next to the DEM, adding roughly one third of its size to the data cache. Set to False to skip building/attaching them.
+
     Raises
     ------
     ValueError
@@ -145,6 +153,8 @@ def load(model: str = None) -> None:
         is_slon   = is_slon,
         data_dict = {'topo': dat},
         metadata  = metadata,
+        nan_value = info[model].get('nan_value'),
+        overviews = _get_overviews(model, info[model], metadata) if (overviews and model.startswith('DEM_')) else (),
     )
 
 
@@ -152,3 +162,26 @@ def load(model: str = None) -> None:
     #     raise ValueError(f"THE DEVELOPER MESSED UP. THIS SHOULD NOT HAPPEN.")
 
     return
+
+
+
+def _get_overviews(
+    model    : str,
+    info     : dict,
+    metadata : dict,
+) -> tuple[GriddedData]:
+    """
+    Get the overview pyramid for a DEM, building it first if necessary. Levels are keyed by the hash of the DEM file so they're rebuilt if the DEM ever changes.
+    """
+    return get_overviews(
+        fpath_dataset = metadata['fpath'],
+        key           = _get_download_info(model)['hash']['xxh3_64'],
+        shape         = info['shape'],
+        dtype         = info['dtype'],
+        lon           = info['lon'],
+        lat           = info['lat'],
+        is_slon       = info['lon'][0] < 0,
+        var           = 'topo',
+        metadata      = metadata,
+        nan_value     = info.get('nan_value'),
+    )
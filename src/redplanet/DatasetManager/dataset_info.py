@@ -181,17 +181,16 @@ def _get_download_info_moho(
             - Path to the CSV file containing the registry of Moho models.
     """
 
-    df = pd.read_csv(fpath_moho_registry)
-    result = df[ df['model_name'] == model_name ]
+    result = _get_moho_registry(fpath_moho_registry)[1].get(model_name)
 
-    if result.empty:
+    if result is None:
         interior_model, insight_thickness, rho_south, rho_north = model_name.split('-')
         raise MohoDatasetNotFoundError(
             f'Moho model not found for the given parameters: {interior_model=}, {insight_thickness=}, {rho_south=}, {rho_north=}\n'
             f'To see available models: `redplanet.Crust.moho.get_registry()`'
         )
 
-    box_download_code, sha1 = result.values.tolist()[0][1:]
+    box_download_code, sha1 = result
     result = {
         'url'    : f'https://rutgers.box.com/shared/static/{box_download_code}',
         'fname'  : f'Moho-Mars-{model_name}.sh',
@@ -204,6 +203,35 @@ def _get_download_info_moho(
 
 
 
+_moho_registry: dict = {}  ## parsed Moho registry, see `_get_moho_registry`
+
+def _get_moho_registry(
+    fpath_moho_registry: Path,
+) -> tuple[pd.DataFrame, dict[str, tuple[str, str]]]:
+    """
+    Parse the registry of Moho models, which is cached for the lifetime of the process (and re-parsed only if the file at `fpath_moho_registry` changes).
+
+    Returns:
+        - `pd.DataFrame`
+            - The full registry with columns ['model_name', 'box_download_code', 'sha1'].
+        - `dict[str, tuple[str, str]]`
+            - Index mapping each model name to `(box_download_code, sha1)` for O(1) lookups.
+    """
+    stat = fpath_moho_registry.stat()
+    key = (fpath_moho_registry, stat.st_size, stat.st_mtime_ns)
+
+    if _moho_registry.get('key') != key:
+        df = pd.read_csv(fpath_moho_registry)
+        index = {
+            model_name: (box_download_code, sha1)
+            for model_name, box_download_code, sha1 in df.itertuples(index=False, name=None)
+        }
+        _moho_registry.update(key=key, df=df, index=index)
+
+    return _moho_registry['df'], _moho_registry['index']
+
+
+
 class DatasetNotFoundError(Exception):
     pass
 
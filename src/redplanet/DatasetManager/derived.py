@@ -0,0 +1,66 @@
+from pathlib import Path
+import shutil
+import uuid
+
+import numpy as np
+
+from redplanet.user_config import get_dirpath_datacache
+
+
+
+
+
+def _get_dirpath_derived(
+    dirpath : str,
+    key     : str,
+) -> Path:
+    """
+    Get the directory for a derived product (i.e. something we compute from downloaded datasets, such as an expanded spherical harmonic model) in the data cache.
+
+    Parameters:
+        - `dirpath`: str
+            - Parent directory relative to the data cache directory, e.g. 'Crust/moho/expanded/'.
+        - `key`: str
+            - Unique identifier for the product. This should include the hashes of all source datasets (and any parameters), so that the product is automatically invalidated (i.e. recomputed under a new key) when a source dataset changes.
+    """
+    return get_dirpath_datacache() / dirpath / key
+
+
+def _load_derived(
+    dirpath_derived : Path,
+    names           : list[str],
+) -> dict[str, np.ndarray] | None:
+    """
+    Load the arrays of a derived product as read-only memory-mapped arrays, or return None if the product hasn't been saved yet.
+    """
+    if not dirpath_derived.is_dir():
+        return None
+    return {
+        name: np.load(dirpath_derived / f'{name}.npy', mmap_mode='r')
+        for name in names
+    }
+
+
+def _save_derived(
+    dirpath_derived : Path,
+    arrays          : dict[str, np.ndarray],
+) -> None:
+    """
+    Save the arrays of a derived product as `.npy` files.
+
+    Files are written to a temporary sibling directory which is then renamed, so other processes (or an interrupted save) never see a partially written product. If another process saved the same product in the meantime, we keep theirs.
+    """
+    dirpath_derived.parent.mkdir(parents=True, exist_ok=True)
+    dirpath_tmp = dirpath_derived.with_name(f'.{dirpath_derived.name}.{uuid.uuid4().hex}.tmp')
+    dirpath_tmp.mkdir()
+    try:
+        for name, array in arrays.items():
+            np.save(dirpath_tmp / f'{name}.npy', array)
+        try:
+            dirpath_tmp.rename(dirpath_derived)
+        except OSError:
+            if not dirpath_derived.is_dir():
+                raise
+    finally:
+        shutil.rmtree(dirpath_tmp, ignore_errors=True)
+    return
@@ -18,6 +18,10 @@ from redplanet.DatasetManager.hash import (
 
 
 
+_verified_files: dict[Path, tuple[int, int, str]] = {}  ## files whose hash was verified during this process -> `(size, modification time, known hash)` at that time
+
+
+
 def _get_fpath_dataset(dataset_name: str) -> Path:
     """
     Get the file path of a dataset...
@@ -25,6 +29,7 @@ def _get_fpath_dataset(dataset_name: str) -> Path:
             i. Before downloading, we verify the integrity of the file at the URL by calculating its hash "on the fly" (i.e. streaming it as opposed to fully downloading it) -- this ensures we don't download malicious/altered files, assuming you trust my intended file/hash.
             ii. After downloading, we again verify integrity of file on disk by calculating its hash, immediately deleting if it doesn't match. I can't think of any realistic case this would occur, but why not.
         2. Subsequent times, we see if a file with the correct name/hash already exists in the cache folder.
+        3. Once a file has been verified, later calls in the same process skip recalculating the hash as long as the file's size and modification time haven't changed (e.g. `Crust.moho.load` needs the Moho registry every time).
 
     Parameters:
     -----------
@@ -65,6 +70,11 @@ def _get_fpath_dataset(dataset_name: str) -> Path:
         raise ValueError(f"[Internal/unexpected error] Hash value not found for dataset '{dataset_name}'. Pester the developer.")
 
 
+    ## Case 0: File was already verified during this process and hasn't changed since.
+    if _verified_files.get(fpath_dataset) == (*_get_file_signature(fpath_dataset), known_hash_value):
+        return fpath_dataset
+
+
     ## Case 1: File not found in cache, download it.
     if (not fpath_dataset.is_file()):
 
@@ -137,4 +147,17 @@ def _get_fpath_dataset(dataset_name: str) -> Path:
 
 
 
+    _verified_files[fpath_dataset] = (*_get_file_signature(fpath_dataset), known_hash_value)
     return fpath_dataset
+
+
+
+def _get_file_signature(fpath: Path) -> tuple[int, int] | tuple[None, None]:
+    """
+    Get the size and modification time of a file, used to detect whether a verified file has changed.
+    """
+    try:
+        stat = fpath.stat()
+    except FileNotFoundError:
+        return (None, None)
+    return (stat.st_size, stat.st_mtime_ns)
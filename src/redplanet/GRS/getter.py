@@ -14,7 +14,9 @@ def get(
     lat       : float | np.ndarray,
     quantity  : str  = 'concentration',
     normalize : bool = False,
-    as_xarray : bool = False
+    as_xarray : bool = False,
+    pointwise : bool = False,
+    interp    : str  = 'nearest',
 ) -> float | np.ndarray | xr.DataArray:
     """
     Get GRS element concentration/sigma values at the specified coordinates.
@@ -35,6 +37,8 @@ def get(
 
         > "The GRS instrument measures elemental abundances in the top-most tens of centimeters of the Martian surface, and thus is strongly influenced by near-surface soils, ice and dust deposits. These sediments broadly represent the bulk chemistry of the Martian upper crust when renormalized to a volatile-free basis [Taylor and McLennan, 2009] and as such, K and Th values must be renormalized to a H2O-, S-, and Cl-free basis to better reflect bulk crustal values." ({@Hahn2011.p})
     {param.as_xarray}
+    {param.pointwise}
+    {param.interp}
 
 
     Returns
@@ -75,6 +79,8 @@ def get(
         lat = lat,
         var = f'{element}_{quantity}',
         as_xarray = as_xarray,
+        pointwise = pointwise,
+        interp    = interp,
     )
 
     if normalize:
@@ -83,6 +89,8 @@ def get(
             lat = lat,
             var = f'cl+h2o+s_{quantity}',
             as_xarray = as_xarray,
+            pointwise = pointwise,
+            interp    = interp,
         )
         dat = dat / (1 - volatiles)
 
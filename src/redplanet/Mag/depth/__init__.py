@@ -1,8 +1,10 @@
 from redplanet.Mag.depth.loader import get_dataset
-from redplanet.Mag.depth.getter import get_nearest, get_grid
+from redplanet.Mag.depth.getter import get_nearest, get_nearest_k, get_grid, build_nearest_raster
 
 __all__ = [
     'get_dataset',
     'get_nearest',
+    'get_nearest_k',
     'get_grid',
+    'build_nearest_raster',
 ]
@@ -1,10 +1,28 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import os
+from pathlib import Path
+
 import numpy as np
 import pandas as pd
 
-from redplanet.Mag.depth.loader import get_dataset
+from redplanet.Mag.depth import loader
+from redplanet.Mag.depth.loader import get_dataset, _get_kdtree, _get_column, _get_nearest_dipole
 
-from redplanet.helper_functions import geodesy
-from redplanet.helper_functions.coordinates import _plon2slon
+from redplanet.DatasetManager.dataset_info import _get_download_info
+from redplanet.DatasetManager.hash import _calculate_hash_from_file
+from redplanet.DatasetManager.derived import (
+    _get_dirpath_derived,
+    _load_derived,
+    _save_derived,
+)
+from redplanet.helper_functions import spatial_index
+from redplanet.helper_functions.GriddedData import GriddedData, _prepare_coords
+from redplanet.helper_functions.parallel import _get_user_config, _init_worker
+from redplanet.helper_functions.coordinates import (
+    _verify_coords,
+    _plon2slon,
+)
 from redplanet.helper_functions.docstrings.main import substitute_docstrings
 
 
@@ -41,15 +59,11 @@ def get_nearest(
 
     lon = _plon2slon(lon)
 
-    df_depths = get_dataset().copy()
+    df_depths = get_dataset()
 
-    distances_km = geodesy.get_distance(
-        start = np.array([lon, lat]),
-        end   = df_depths[['lon', 'lat']].to_numpy(),
-    )[:,0] / 1.e3
+    idx, distances_km = _query_nearest(np.array([lon]), np.array([lat]), k=len(df_depths))
 
-    df_depths['distance_km'] = distances_km
-    df_depths.sort_values('distance_km', inplace=True)
+    df_depths = df_depths.iloc[idx[0]].assign(distance_km=distances_km[0])
 
     if as_dict:
         df_depths = df_depths.to_dict(orient='records')
@@ -58,14 +72,94 @@ def get_nearest(
 
 
 
+def get_nearest_k(
+    lon          : float | np.ndarray,
+    lat          : float | np.ndarray,
+    k            : int  = 1,
+    as_dataframe : bool = False,
+) -> tuple[np.ndarray, np.ndarray] | pd.DataFrame:
+    """
+    Get the `k` closest dipoles to each of the given point(s).
+
+    This is much faster than `get_nearest` for many points, since it uses a spatial index (built once when the dataset is loaded) and only computes geodesic distances to a few candidate dipoles per point.
+
+    Parameters
+    ----------
+    lon : float | np.ndarray
+        Longitude coordinate(s) in range [-180, 360].
+    lat : float | np.ndarray
+        Latitude coordinate(s) in range [-90, 90]. Coordinates are treated as paired points, so `lon` and `lat` must have the same shape (or one of them can be a scalar).
+    k : int, optional
+        Number of closest dipoles to return for each point, in range [1, 412]. Default is 1.
+    as_dataframe : bool, optional
+        If True, return a DataFrame rather than arrays. Default is False.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray] | pd.DataFrame
+        If `as_dataframe` is False, a tuple `(index, distance_km)` of arrays with shape `(*shape, k)`, where `shape` is the broadcast shape of `lon` and `lat`, and the last axis is sorted from closest to furthest:
+
+        - `index` : np.ndarray
+            - Row index of each dipole in `redplanet.Mag.depth.get_dataset`.
+        - `distance_km` : np.ndarray
+            - Distance from the input coordinate to the dipole, in km.
+
+        If `as_dataframe` is True, a DataFrame with one row per (point, neighbor) pair, indexed by the dipole's row index in `redplanet.Mag.depth.get_dataset`. Columns are identical to those of `get_nearest`, with the addition of:
+
+        - `point` : int
+            - Index of the input coordinate (after flattening).
+        - `rank` : int
+            - Rank of the dipole for that point, where 0 is the closest.
+
+    Raises
+    ------
+    ValueError
+        - If `lon` and `lat` don't have the same shape (one of them can be a scalar).
+        - If `k` is not in range [1, 412].
+
+    Notes
+    -----
+    Candidates are found with a KD-tree over the dipole locations on the unit sphere, then sorted by their exact geodesic distance (see `redplanet.helper_functions.geodesy.get_distance`). Distances on the unit sphere can rank dipoles slightly differently than geodesics on the reference ellipsoid, so more candidates are queried until the result is guaranteed to be the same as comparing every dipole.
+    """
+
+    ## input validation
+    _verify_coords(lon, lat)
+    try:
+        lon, lat = np.broadcast_arrays(lon, lat)
+    except ValueError:
+        raise ValueError(f'`lon` and `lat` must have the same shape (or one must be a scalar). Got shapes {np.shape(lon)} and {np.shape(lat)}.')
+    shape = lon.shape
+
+    df_depths = get_dataset()
+    if not (1 <= k <= len(df_depths)):
+        raise ValueError(f'`k` must be in range [1, {len(df_depths)}]. Got {k}.')
+
+    idx, distances_km = _query_nearest(
+        _plon2slon(lon.ravel().astype(np.float64)),
+        lat.ravel().astype(np.float64),
+        k,
+    )
+
+    if not as_dataframe:
+        return idx.reshape(shape + (k,)), distances_km.reshape(shape + (k,))
+
+    df = df_depths.iloc[idx.ravel()].assign(distance_km=distances_km.ravel())
+    df.insert(0, 'rank', np.tile(np.arange(k), idx.shape[0]))
+    df.insert(0, 'point', np.repeat(np.arange(idx.shape[0]), k))
+    return df
+
+
+
 @substitute_docstrings
 def get_grid(
-    lon : float | np.ndarray,
-    lat : float | np.ndarray,
-    col : str,
+    lon        : float | np.ndarray,
+    lat        : float | np.ndarray,
+    col        : str,
+    method     : str   = 'raster',
+    resolution : float = 0.5,
 ) -> np.ndarray:
     """
-    Similar to `get_nearest`, but significantly more optimized for accessing data over large areas by using a pre-computed grid of nearest dipole locations.
+    Similar to `get_nearest`, but significantly more optimized for accessing data over large areas, by finding only the nearest dipole to each point of a grid.
 
     Parameters
     ----------
@@ -73,6 +167,13 @@ def get_grid(
     {param.lat}
     col : str
         Name of dataset column to return. See `redplanet.Mag.depth.get_dataset` for options/explanations.
+    method : str, optional
+        Options are:
+
+        - `'raster'` (default): snap the input coordinates to a pre-computed lookup raster of nearest dipoles (see `resolution`). This is the fastest option, but the nearest dipole may be wrong within ~half a raster cell of the boundaries between dipoles.
+        - `'exact'`: find the nearest dipole to each input coordinate with a spatial index, so results are exact for any grid spacing.
+    resolution : float, optional
+        Spacing (in degrees) of the lookup raster when `method='raster'`, where 180 must be a multiple of the resolution. The default raster (0.5 degrees) is downloaded the first time it's requested. Rasters at any other resolution are computed the first time they're requested and saved in the data cache (without downloading the default raster). Default is 0.5.
 
     Returns
     -------
@@ -82,16 +183,25 @@ def get_grid(
     Raises
     ------
     ValueError
-        If the specified column is not found in the dataset.
+        - If the specified column is not found in the dataset.
+        - If `method` is not recognized.
+        - If 180 is not a multiple of `resolution`.
     """
 
-    df_depths, dat_nearest_dipole = get_dataset(_extras=True)
+    col_values = _get_column(col)
 
-    if col not in df_depths.columns:
-        raise ValueError(f"Column '{col}' not found in dataset. Available columns are: {df_depths.columns.tolist()}")
-
-    col_values = np.stack(df_depths[col])
-    dat_idx = dat_nearest_dipole.get_values(lon, lat, 'dat')
+    match method:
+        case 'raster':
+            dat_idx = _get_nearest_raster(resolution).get_values(lon, lat, 'dat')
+        case 'exact':
+            _verify_coords(lon, lat)
+            lon, lat = _prepare_coords(lon, lat, is_slon=True, pointwise=False)
+            lon_2d, lat_2d = np.meshgrid(lon, lat)
+            dat_idx = _query_nearest_index(lon_2d.ravel(), lat_2d.ravel()).reshape(lon_2d.shape)
+            dat_idx = np.squeeze(dat_idx)  ## remove singleton dimensions, same as `GriddedData.get_values`
+            if dat_idx.ndim == 0: dat_idx = dat_idx.item()
+        case _:
+            raise ValueError(f'Unknown method: "{method}". Options are: raster, exact.')
 
     dat_return = col_values[dat_idx]
 
@@ -99,3 +209,160 @@ def get_grid(
         dat_return = np.moveaxis(dat_return, 2, 0)
 
     return dat_return
+
+
+
+def build_nearest_raster(
+    resolution  : float = 0.5,
+    fpath_out   : str | Path | None = None,
+    max_workers : int | None = None,
+) -> np.ndarray | tuple[np.ndarray, dict]:
+    """
+    Compute a global lookup raster of the nearest dipole, as used by `get_grid(method='raster')`.
+
+    This is how the default (0.5 degree) raster is generated for the dataset registry. Nearest dipoles are found with a KD-tree query for all points at once, ambiguous points are refined with exact geodesic distances (see `get_grid(method='exact')`), and rows are split across a pool of worker processes.
+
+    Parameters
+    ----------
+    resolution : float, optional
+        Spacing of the raster in degrees, where 180 must be a multiple of the resolution. Default is 0.5.
+    fpath_out : str | Path | None, optional
+        If provided, save the raster to this path as a `.npy` file, and compute its hash for the dataset registry. Default is None.
+    max_workers : int | None, optional
+        Number of worker processes. Default is None, which uses the number of CPUs. If 1, the raster is computed in the current process.
+
+    Returns
+    -------
+    raster : np.ndarray
+        Row index (in `redplanet.Mag.depth.get_dataset`) of the nearest dipole, as an int16 array with shape `(num_lats, num_lons)`. Longitudes are in range [-180, 180] and latitudes are in range [-90, 90] (both inclusive and increasing).
+
+    hash : dict
+        Only returned if `fpath_out` is provided. Hash of the saved file in the same format as the dataset registry, i.e. `{'xxh3_64': '...'}`.
+
+    Raises
+    ------
+    ValueError
+        If 180 is not a multiple of `resolution`.
+    """
+    lon, lat = _get_raster_coords(resolution)
+
+    get_dataset()  ## load (and download if necessary) up front, so workers don't race to download it
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, lat.size))
+
+    if max_workers == 1:
+        raster = _build_nearest_raster(lon, lat)
+    else:
+        bounds = np.linspace(0, lat.size, 4 * max_workers + 1).astype(int)
+        with ProcessPoolExecutor(
+            max_workers = max_workers,
+            initializer = _init_worker,
+            initargs    = (_get_user_config(),),
+        ) as executor:
+            raster = np.concatenate(list(executor.map(
+                _build_nearest_raster,
+                repeat(lon),
+                [lat[i0:i1] for i0, i1 in zip(bounds[:-1], bounds[1:])],
+            )))
+
+    if fpath_out is None:
+        return raster
+
+    fpath_out = Path(fpath_out)
+    fpath_out.parent.mkdir(parents=True, exist_ok=True)
+    with open(fpath_out, 'wb') as f:
+        np.save(f, raster)  ## writing to a file object, so numpy doesn't append a suffix
+
+    return raster, {'xxh3_64': _calculate_hash_from_file(fpath_out, 'xxh3_64')}
+
+
+
+def _get_raster_coords(resolution: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get the longitudes and latitudes of a global lookup raster at the given resolution (degrees).
+    """
+    num_lats = 180 / resolution if resolution > 0 else np.nan
+    if not (abs(num_lats - np.round(num_lats)) <= 1e-6):
+        raise ValueError(f'180 must be a multiple of `resolution`. Got {resolution}.')
+    num_lats = round(num_lats) + 1
+
+    lon = np.linspace(-180, 180, 2*num_lats - 1)
+    lat = np.linspace(-90, 90, num_lats)
+    return lon, lat
+
+
+
+def _get_nearest_raster(resolution: float) -> GriddedData:
+    """
+    Get a lookup raster of the nearest dipole at the given resolution (degrees). The default 0.5 degree raster is downloaded (only when it's first requested), and other resolutions are loaded from (or computed and saved to) the data cache. The cache is keyed by the resolution and the hash of the dipole dataset.
+    """
+    lon, lat = _get_raster_coords(resolution)
+
+    if resolution == 0.5:
+        return _get_nearest_dipole()
+
+    if resolution not in loader._dat_nearest_rasters:
+        key = '-'.join([
+            f'{resolution:g}deg',
+            _get_download_info('Gong & Weiczorek, 2021')['hash']['md5'][:16],
+        ])
+        dirpath_raster = _get_dirpath_derived('Mag/depth/nearest_dipoles/', key)
+
+        raster = _load_derived(dirpath_raster, ['dat'])
+        if raster is None:
+            raster = {'dat': build_nearest_raster(resolution)}
+            _save_derived(dirpath_raster, raster)
+
+        loader._dat_nearest_rasters[resolution] = GriddedData(
+            lon       = lon,
+            lat       = lat,
+            is_slon   = True,
+            data_dict = raster,
+            metadata  = {'resolution': resolution},
+        )
+
+    return loader._dat_nearest_rasters[resolution]
+
+
+
+def _build_nearest_raster(
+    lon : np.ndarray,
+    lat : np.ndarray,
+) -> np.ndarray:
+    """
+    Compute the index of the nearest dipole for each node of a grid, as an int16 array with shape `(len(lat), len(lon))`.
+    """
+    raster = np.empty((lat.size, lon.size), dtype=np.int16)
+    rows_per_chunk = max(1, 2**18 // lon.size)
+    for i0 in range(0, lat.size, rows_per_chunk):
+        i1 = min(lat.size, i0 + rows_per_chunk)
+        lon_2d, lat_2d = np.meshgrid(lon, lat[i0:i1])
+        raster[i0:i1] = _query_nearest_index(lon_2d.ravel(), lat_2d.ravel()).reshape(lon_2d.shape)
+    return raster
+
+
+
+def _query_nearest(
+    lon : np.ndarray,
+    lat : np.ndarray,
+    k   : int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Find the `k` closest dipoles (by geodesic distance) to each of the points given by 1D arrays `lon` and `lat`, returning arrays `(index, distance_km)` with shape `(num_points, k)` sorted by distance. See `spatial_index._query_nearest`.
+    """
+    dipoles = get_dataset()[['lon', 'lat']].to_numpy()
+    return spatial_index._query_nearest(_get_kdtree(), dipoles, lon, lat, k)
+
+
+
+def _query_nearest_index(
+    lon : np.ndarray,
+    lat : np.ndarray,
+) -> np.ndarray:
+    """
+    Find the index of the closest dipole (by geodesic distance) to each of the points given by 1D arrays `lon` and `lat`. See `spatial_index._query_nearest_index`.
+    """
+    dipoles = get_dataset()[['lon', 'lat']].to_numpy()
+    return spatial_index._query_nearest_index(_get_kdtree(), dipoles, lon, lat)
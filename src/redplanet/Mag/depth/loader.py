@@ -3,9 +3,11 @@ import zipfile
 
 import numpy as np
 import pandas as pd
+from scipy.spatial import cKDTree
 
 from redplanet.DatasetManager.main import _get_fpath_dataset
 from redplanet.helper_functions.GriddedData import GriddedData
+from redplanet.helper_functions import spatial_index
 from redplanet.helper_functions.coordinates import _plon2slon
 from redplanet.helper_functions.docstrings.main import substitute_docstrings
 
@@ -14,7 +16,10 @@ from redplanet.helper_functions.docstrings.main import substitute_docstrings
 
 
 _dat_depths: pd.DataFrame | None = None
-_dat_nearest_dipole: np.ndarray | None = None
+_dat_nearest_dipole: GriddedData | None = None  ## pre-computed 0.5 degree lookup raster of the nearest dipole, only loaded when needed (see `_get_nearest_dipole`)
+_dat_kdtree: cKDTree | None = None  ## spatial index over dipole locations (unit vectors), see `redplanet.Mag.depth.get_nearest_k`
+_dat_columns: dict[str, np.ndarray] | None = None  ## each column stacked into an array with shape (412,) or (412, 3), see `redplanet.Mag.depth.get_grid`
+_dat_nearest_rasters: dict[float, GriddedData] = {}  ## lookup rasters of the nearest dipole at other resolutions (keyed by resolution in degrees), see `redplanet.Mag.depth.get_grid`
 
 @substitute_docstrings
 def get_dataset(
@@ -60,11 +65,43 @@ def get_dataset(
     if as_dict:
         return _dat_depths.to_dict(orient='records')
     if _extras:
-        return (_dat_depths, _dat_nearest_dipole)
+        return (_dat_depths, _get_nearest_dipole())
     return _dat_depths
 
 
 
+def _get_nearest_dipole() -> GriddedData:
+    """
+    Get the pre-computed (0.5 degree) lookup raster of the nearest dipole, loading (and downloading) it if necessary.
+    """
+    if _dat_nearest_dipole is None:
+        _load_nearest_dipole()
+    return _dat_nearest_dipole
+
+
+
+def _get_kdtree() -> cKDTree:
+    """
+    Get the spatial index over dipole locations, loading the dataset if necessary.
+    """
+    if _dat_kdtree is None:
+        _load()
+    return _dat_kdtree
+
+
+
+def _get_column(col: str) -> np.ndarray:
+    """
+    Get the values of a dataset column stacked into an array (cached), loading the dataset if necessary.
+    """
+    if _dat_columns is None:
+        _load()
+    if col not in _dat_columns:
+        raise ValueError(f"Column '{col}' not found in dataset. Available columns are: {_dat_depths.columns.tolist()}")
+    return _dat_columns[col]
+
+
+
 
 
 @substitute_docstrings
@@ -125,7 +162,25 @@ def _load() -> None:
         # _dat_depths[col] = np.column_stack(list_arrays).tolist()
         _dat_depths[col] = list( np.column_stack(list_arrays) )
 
-    ## load pre-computed nearest dipole values
+    ## stack columns once, so lookups are just fancy indexing
+    global _dat_columns
+    _dat_columns = {
+        col: np.stack(_dat_depths[col])
+        for col in _dat_depths.columns
+    }
+
+    ## build spatial index over dipole locations
+    global _dat_kdtree
+    _dat_kdtree = spatial_index._build_tree(_dat_depths['lon'].to_numpy(), _dat_depths['lat'].to_numpy())
+
+    return
+
+
+
+def _load_nearest_dipole() -> None:
+    """
+    Load the pre-computed (0.5 degree) lookup raster of the nearest dipole, which is downloaded separately from the dipole dataset. This is only needed for `redplanet.Mag.depth.get_grid(method='raster', resolution=0.5)`, so it isn't loaded by `_load`.
+    """
     global _dat_nearest_dipole
     _dat_nearest_dipole = GriddedData(
         lon = np.arange(-180, 180.1, 0.5),
@@ -138,5 +193,4 @@ def _load() -> None:
         },
         metadata = {},
     )
-
     return
@@ -1,7 +1,8 @@
 import numpy as np
 import xarray as xr
 
-from redplanet.Mag.sh.loader import get_dataset
+from redplanet.Mag.sh.loader import get_dataset, _get_coeffs
+from redplanet.helper_functions.spherical_harmonics import expand_points_mag, _get_values_exact
 
 from redplanet.helper_functions.docstrings.main import substitute_docstrings
 
@@ -11,8 +12,11 @@ from redplanet.helper_functions.docstrings.main import substitute_docstrings
 def get(
     lon       : float | np.ndarray,
     lat       : float | np.ndarray,
-    quantity  : str  = 'total',
-    as_xarray : bool = False
+    quantity  : str   = 'total',
+    as_xarray : bool  = False,
+    pointwise : bool  = False,
+    interp    : str   = 'nearest',
+    altitude  : float = 0,
 ) -> float | np.ndarray | xr.DataArray:
     """
     Get magnetic field values at the specified coordinates. Dataset must be loaded first, see `redplanet.Mag.sh.load(...)`.
@@ -24,6 +28,10 @@ def get(
     quantity : str, optional
         Options are: ['radial', 'theta', 'phi', 'total', 'potential'], by default 'total'.
     {param.as_xarray}
+    {param.pointwise}
+    {param.interp_sh}
+    altitude : float, optional
+        Altitude in km above the reference radius of the model (3393.5 km for 'Langlais2019') at which to evaluate the field. Only supported with `interp='sh_exact'`. Default is 0.
 
     Returns
     -------
@@ -34,7 +42,8 @@ def get(
     Raises
     ------
     ValueError
-        If `quantity` is not one of ['radial', 'theta', 'phi', 'total', 'potential.
+        - If `quantity` is not one of ['radial', 'theta', 'phi', 'total', 'potential'].
+        - If `altitude` is nonzero and `interp` is not 'sh_exact'.
     """
 
     q = ['radial', 'theta', 'phi', 'total', 'potential']
@@ -43,9 +52,30 @@ def get(
 
     dat_mag = get_dataset()
 
+    if interp == 'sh_exact':
+        coeffs = _get_coeffs()
+        return _get_values_exact(
+            evaluate  = lambda lon, lat: expand_points_mag(
+                coeffs.coeffs, coeffs.r0, lon, lat,
+                altitude      = altitude * 1e3,
+                normalization = coeffs.normalization,
+                csphase       = coeffs.csphase,
+            )[quantity],
+            lon       = lon,
+            lat       = lat,
+            as_xarray = as_xarray,
+            pointwise = pointwise,
+            attrs     = dict(dat_mag.metadata),
+        )
+
+    if altitude != 0:
+        raise ValueError(f"Evaluating the field at a nonzero altitude requires `interp='sh_exact'`, got `interp='{interp}'`.")
+
     return dat_mag.get_values(
         lon = lon,
         lat = lat,
         var = quantity,
         as_xarray = as_xarray,
+        pointwise = pointwise,
+        interp    = interp,
     )
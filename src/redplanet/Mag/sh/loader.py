@@ -11,6 +11,7 @@ from redplanet.helper_functions.docstrings.main import substitute_docstrings
 
 
 _dat_mag: GriddedData | None = None
+_coeffs_mag: pysh.SHMagCoeffs | None = None  ## coefficients of the loaded model, used to evaluate the field exactly at points (see `redplanet.Mag.sh.get(..., interp='sh_exact')`)
 
 @substitute_docstrings
 def get_dataset() -> GriddedData:
@@ -28,6 +29,13 @@ def get_metadata() -> dict:
     """
     return dict(get_dataset().metadata)
 
+def _get_coeffs() -> pysh.SHMagCoeffs:
+    """
+    Get the spherical harmonic coefficients of the currently loaded model.
+    """
+    get_dataset()  ## raises if not loaded
+    return _coeffs_mag
+
 
 
 
@@ -85,17 +93,18 @@ def load(
         - Arguments for `from_file` are taken directly from the `pyshtools` source code (`pyshools.datasets.Mars.Langlais2019()`).
             - I rewrite it so the dataset is downloaded to `redplanet` cache rather than `pyshtools` cache, ensuring `redplanet` can fully manage/clear its own dataset cache.
         '''
+        coeffs = pysh.shclasses.SHMagCoeffs.from_file(
+            fpath,
+            lmax       = lmax,
+            skip       = 4,
+            r0         = 3393.5e3,
+            header     = False,
+            file_units = 'nT',
+            units      = 'nT',
+            encoding   = 'utf-8',
+        )
         ds = (
-            pysh.shclasses.SHMagCoeffs.from_file(
-                fpath,
-                lmax       = lmax,
-                skip       = 4,
-                r0         = 3393.5e3,
-                header     = False,
-                file_units = 'nT',
-                units      = 'nT',
-                encoding   = 'utf-8',
-            )
+            coeffs
             .expand()
             .to_xarray()
             .isel(lat=slice(None, None, -1))  ## in pysh, lats are always decreasing at first
@@ -108,9 +117,11 @@ def load(
 
         metadata = info[model]['metadata']
         metadata['fpath'] = fpath
+        metadata['short_name'] = model
 
 
-        global _dat_mag
+        global _dat_mag, _coeffs_mag
+        _coeffs_mag = coeffs
         _dat_mag = GriddedData(
             lon       = ds.lon.values,
             lat       = ds.lat.values,
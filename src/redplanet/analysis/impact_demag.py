@@ -1,5 +1,16 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+
 import numpy as np
 
+
+
+
+
+_mars_gravity_m_s2: float = 3.72076
+
+
+
 def compute_pressure(
     diameter_km            : float,
     x_vals_km              : float | np.ndarray,
@@ -12,6 +23,9 @@ def compute_pressure(
     bulk_sound_speed_km_s  : float = 3.5,
     pressure_decay_const   : float = 1.87,
     return_params          : bool  = False,
+    out                    : np.ndarray | None = None,
+    dtype                  : np.dtype | str    = np.float64,
+    max_block_bytes        : int   = 2**26,
 ) -> np.ndarray | tuple[np.ndarray, dict]:
     """
     Compute the maximum subsurface shock pressures from an impact using the Rankine-Hugoniot relations.
@@ -41,12 +55,18 @@ def compute_pressure(
         Exponential decay constant for the pressure (or particle velocity) outside the isobaric core. Default is 1.87.
     return_params : bool, optional
         If True, the function will also return a dictionary of intermediate parameters. Default is False.
+    out : np.ndarray | None, optional
+        Preallocated array to write the pressures into, with shape `(len(y_vals_km), len(x_vals_km))` (or the squeezed equivalent, e.g. when one of the inputs is a scalar). If provided, `dtype` is ignored and `out` itself is returned. Default is None (allocate a new array).
+    dtype : np.dtype | str, optional
+        Data type of the output array when `out` is None, e.g. `np.float32` to halve the memory of large sections. Intermediate calculations always use float64. Default is `np.float64`.
+    max_block_bytes : int, optional
+        Approximate maximum memory (in bytes) used for scratch buffers at a time, by default 64 MiB. The section is evaluated in blocks of rows (i.e. `y_vals_km`), so peak memory is the output array plus this amount, regardless of the size of the section.
 
 
     Returns
     -------
     P_eff : np.ndarray
-        Shock pressures in GPa at the specified point(s), with shape `(len(y_vals_km), len(x_vals_km))`.
+        Shock pressures in GPa at the specified point(s), with shape `(len(y_vals_km), len(x_vals_km))` (squeezed, so scalar inputs drop the corresponding dimension).
 
     params : dict
         Only returned if `return_params` is True.
@@ -68,66 +88,54 @@ def compute_pressure(
         - `rise_time` — Shock pressure rise time (s).
 
 
+    Raises
+    ------
+    ValueError
+        If `out` doesn't have the required shape.
+
+
     Notes
     -----
     For a full explanation/derivation of methods and equations, see "Supplemental > Impact Demagnetization" in the RedPlanet documentation website.
     """
 
     ## Convert inputs to SI and shorthands
-    D_o       = diameter_km * 1e3
-    x_1d      = x_vals_km * 1e3
-    y_1d      = y_vals_km * 1e3
-    v_proj    = v_proj_km_s * 1e3
-    rho_proj  = rho_proj_kg_m3
+    x_1d      = np.ravel(x_vals_km).astype(np.float64) * 1e3
+    y_1d      = np.ravel(y_vals_km).astype(np.float64) * 1e3
     rho_crust = rho_crust_kg_m3
-    D_star    = transition_diameter_km * 1e3
     C         = bulk_sound_speed_km_s * 1e3
     S         = compressibility
     n         = pressure_decay_const
-    g         = 3.72076
     ## EVERYTHING FROM HERE FORWARD IS SI
 
-    D_tr = 0.7576 * D_o**0.921 * D_star**0.079
-
-    E_proj = ((1/0.2212) * D_tr * v_proj**0.09 * g**0.22)**(1/0.26)
-    r_proj = ((3 * E_proj) / (2 * np.pi * rho_proj * v_proj**2))**(1/3)
-
-    R_ic = r_proj * 0.7
-    u_ic = 0.5 * v_proj
-    tau_rise = r_proj / v_proj
-
-    x_2d, y_2d = np.meshgrid(x_1d, y_1d)  ## X and Y are each 2D arrays, now calculations can be better broadcasted/vectorized
+    D_tr, E_proj, r_proj, R_ic, u_ic, tau_rise = _get_scaling(diameter_km, v_proj_km_s, rho_proj_kg_m3, transition_diameter_km)
 
-    R_dir = np.sqrt(x_2d**2 + (y_2d - R_ic)**2)
-    R_ref = np.sqrt(x_2d**2 + (y_2d + R_ic)**2)
-    delta_t = (R_ref - R_dir) / C
+    ## Allocate the output, shape (num_y, num_x)
+    shape_2d = (y_1d.size, x_1d.size)
 
-    def calc_u_p(r):
-        return np.where(
-            r <= R_ic,
-            u_ic,
-            u_ic*(r/R_ic)**(-n)
-        )
-
-    def calc_P_direct(r):
-        u_p = calc_u_p(r)
-        return rho_crust * u_p * (C + S*u_p)
-
-    P_direct    = calc_P_direct(R_dir)
-    P_reflected = calc_P_direct(R_ref)
-
-    P_eff = np.where(
-        delta_t >= tau_rise,
-        P_direct,
-        P_direct - P_reflected*(1 - delta_t/tau_rise)
-    )
+    if out is None:
+        P_eff = np.empty(shape_2d, dtype=dtype)
+        result = np.squeeze(P_eff)
+    else:
+        if out.shape not in (shape_2d, tuple(size for size in shape_2d if size != 1)):
+            raise ValueError(f'`out` must have shape {shape_2d} (or the squeezed equivalent). Got {out.shape}.')
+        try:
+            P_eff = out.view()
+            P_eff.shape = shape_2d  ## raises if this isn't possible without a copy
+        except AttributeError:
+            raise ValueError('`out` must be contiguous.')
+        result = out
 
-    P_eff = P_eff * 1e-9
-    P_eff = np.squeeze(P_eff)
+    for _, _, i0, i1, P_block in _iter_pressure_blocks(
+        x_1d, y_1d,
+        *np.atleast_1d(R_ic, u_ic, tau_rise, C, S, n, rho_crust),
+        max_block_bytes = max_block_bytes,
+    ):
+        np.copyto(P_eff[i0:i1], P_block[0], casting='unsafe')
 
     if return_params:
         return (
-            P_eff,
+            result,
             {
                 'v_proj_km_s'            : v_proj_km_s,
                 'rho_proj_kg_m3'         : rho_proj_kg_m3,
@@ -144,4 +152,391 @@ def compute_pressure(
                 'rise_time'              : tau_rise,
             }
         )
+    return result
+
+
+
+def compute_pressure_batch(
+    diameter_km            : float | np.ndarray,
+    x_vals_km              : float | np.ndarray,
+    y_vals_km              : float | np.ndarray,
+    v_proj_km_s            : float | np.ndarray = 10,
+    rho_proj_kg_m3         : float | np.ndarray = 2900,
+    rho_crust_kg_m3        : float | np.ndarray = 2900,
+    transition_diameter_km : float | np.ndarray = 7,
+    compressibility        : float | np.ndarray = 1.5,
+    bulk_sound_speed_km_s  : float | np.ndarray = 3.5,
+    pressure_decay_const   : float | np.ndarray = 1.87,
+    return_params          : bool  = False,
+    dtype                  : np.dtype | str = np.float64,
+    max_block_bytes        : int   = 2**26,
+    max_workers            : int | None = 1,
+) -> np.ndarray | tuple[np.ndarray, dict]:
+    """
+    Compute the maximum subsurface shock pressures for many impacts at once, e.g. every crater in a database and/or Monte Carlo draws of the impact parameters.
+
+    This is equivalent to (but much faster than) calling `compute_pressure` for each combination of parameters. The crater diameter and every impact parameter can be arrays, which are broadcast against each other to define the set of cases (e.g. pass diameters with shape `(N, 1)` and velocities with shape `(1, M)` to evaluate every combination). All cases are evaluated on the same section of points.
+
+
+    Parameters
+    ----------
+    diameter_km : float | np.ndarray
+        Observed crater diameter(s) in kilometers.
+    x_vals_km : float | np.ndarray
+        Horizontal (parallel to surface) point(s) in kilometers where the pressure is to be computed, shared by all cases.
+    y_vals_km : float | np.ndarray
+        Vertical (perpendicular to surface) point(s) in kilometers where the pressure is to be computed, shared by all cases.
+    v_proj_km_s, rho_proj_kg_m3, rho_crust_kg_m3, transition_diameter_km, compressibility, bulk_sound_speed_km_s, pressure_decay_const : float | np.ndarray, optional
+        Impact parameters, see `compute_pressure` for descriptions and default values.
+    return_params : bool, optional
+        If True, the function will also return a dictionary of intermediate parameters. Default is False.
+    dtype : np.dtype | str, optional
+        Data type of the output array, e.g. `np.float32` to halve the memory of large batches. Intermediate calculations always use float64. Default is `np.float64`.
+    max_block_bytes : int, optional
+        Approximate maximum memory (in bytes) used for scratch buffers at a time (per worker), by default 64 MiB. Small sections are evaluated for many cases at once, and large sections are evaluated in blocks of rows.
+    max_workers : int | None, optional
+        Number of worker processes to split the cases across. If None, use the number of CPUs. Default is 1 (evaluate in the current process).
+
+
+    Returns
+    -------
+    P_eff : np.ndarray
+        Shock pressures in GPa with shape `case_shape + (len(y_vals_km), len(x_vals_km))`, where `case_shape` is the broadcast shape of the diameters and impact parameters.
+
+    params : dict
+        Only returned if `return_params` is True.
+
+        A dictionary with the same keys as in `compute_pressure`, where each value is an array with shape `case_shape`.
+
+
+    Raises
+    ------
+    ValueError
+        If the diameters and impact parameters can't be broadcast against each other.
+    """
+    cases = _get_cases(
+        diameter_km, v_proj_km_s, rho_proj_kg_m3, rho_crust_kg_m3, transition_diameter_km,
+        compressibility, bulk_sound_speed_km_s, pressure_decay_const,
+    )
+    x_1d = np.ravel(x_vals_km).astype(np.float64)
+    y_1d = np.ravel(y_vals_km).astype(np.float64)
+
+    P_eff = _run_cases(cases, 'pressure', (x_1d, y_1d, np.dtype(dtype), max_block_bytes), max_workers)
+    P_eff = P_eff.reshape(cases['shape'] + (y_1d.size, x_1d.size))
+
+    if return_params:
+        return P_eff, _get_params(cases)
     return P_eff
+
+
+
+def compute_demag_radius(
+    diameter_km            : float | np.ndarray,
+    x_vals_km              : np.ndarray,
+    y_vals_km              : float | np.ndarray,
+    pressure_threshold_GPa : float | np.ndarray = 2,
+    v_proj_km_s            : float | np.ndarray = 10,
+    rho_proj_kg_m3         : float | np.ndarray = 2900,
+    rho_crust_kg_m3        : float | np.ndarray = 2900,
+    transition_diameter_km : float | np.ndarray = 7,
+    compressibility        : float | np.ndarray = 1.5,
+    bulk_sound_speed_km_s  : float | np.ndarray = 3.5,
+    pressure_decay_const   : float | np.ndarray = 1.87,
+    return_params          : bool  = False,
+    max_block_bytes        : int   = 2**26,
+    max_workers            : int | None = 1,
+) -> np.ndarray | tuple[np.ndarray, dict]:
+    """
+    Compute the demagnetization radius for many impacts at once, i.e. the furthest horizontal distance from the impact point where the shock pressure reaches a threshold at any of the given depths.
+
+    Pressure fields are computed in the same way as `compute_pressure_batch`, but only the radii are kept, so memory doesn't scale with the number of cases.
+
+
+    Parameters
+    ----------
+    diameter_km : float | np.ndarray
+        Observed crater diameter(s) in kilometers.
+    x_vals_km : np.ndarray
+        Horizontal distances in kilometers to test, shared by all cases. The resolution of the returned radii is the spacing of these values.
+    y_vals_km : float | np.ndarray
+        Depth(s) in kilometers to test, shared by all cases (e.g. a single depth, or a range of depths spanning the magnetized layer).
+    pressure_threshold_GPa : float | np.ndarray, optional
+        Shock pressure (in GPa) above which the crust is considered demagnetized. Can be an array (broadcast against the other parameters). Default is 2 GPa.
+    v_proj_km_s, rho_proj_kg_m3, rho_crust_kg_m3, transition_diameter_km, compressibility, bulk_sound_speed_km_s, pressure_decay_const : float | np.ndarray, optional
+        Impact parameters, see `compute_pressure` for descriptions and default values.
+    return_params : bool, optional
+        If True, the function will also return a dictionary of intermediate parameters, see `compute_pressure_batch`. Default is False.
+    max_block_bytes : int, optional
+        Approximate maximum memory (in bytes) used for scratch buffers at a time (per worker), by default 64 MiB.
+    max_workers : int | None, optional
+        Number of worker processes to split the cases across. If None, use the number of CPUs. Default is 1 (evaluate in the current process).
+
+
+    Returns
+    -------
+    radius_km : np.ndarray
+        Demagnetization radius in kilometers (i.e. the largest value of `abs(x_vals_km)` where the threshold is reached), with shape `case_shape` (the broadcast shape of the diameters, threshold, and impact parameters). Zero if the threshold isn't reached anywhere. If this equals the largest value of `abs(x_vals_km)`, the true radius may be larger.
+
+    params : dict
+        Only returned if `return_params` is True, see `compute_pressure_batch`.
+
+
+    Raises
+    ------
+    ValueError
+        If the diameters, threshold, and impact parameters can't be broadcast against each other.
+    """
+    cases = _get_cases(
+        diameter_km, v_proj_km_s, rho_proj_kg_m3, rho_crust_kg_m3, transition_diameter_km,
+        compressibility, bulk_sound_speed_km_s, pressure_decay_const,
+        pressure_threshold_GPa = pressure_threshold_GPa,
+    )
+    x_1d = np.ravel(x_vals_km).astype(np.float64)
+    y_1d = np.ravel(y_vals_km).astype(np.float64)
+
+    radius_km = _run_cases(cases, 'radius', (x_1d, y_1d, max_block_bytes), max_workers)
+    radius_km = radius_km.reshape(cases['shape'])
+
+    if return_params:
+        return radius_km, _get_params(cases)
+    return radius_km
+
+
+
+
+
+_case_params: list[str] = [
+    'diameter_km',
+    'v_proj_km_s',
+    'rho_proj_kg_m3',
+    'rho_crust_kg_m3',
+    'transition_diameter_km',
+    'compressibility',
+    'bulk_sound_speed_km_s',
+    'pressure_decay_const',
+]
+
+
+
+def _get_scaling(
+    diameter_km            : float | np.ndarray,
+    v_proj_km_s            : float | np.ndarray,
+    rho_proj_kg_m3         : float | np.ndarray,
+    transition_diameter_km : float | np.ndarray,
+) -> tuple:
+    """
+    Compute the crater scaling quantities (elementwise for arrays), all in SI units: transient crater diameter, projectile kinetic energy, projectile radius, isobaric core radius, particle velocity in the isobaric core, and rise time.
+    """
+    D_o      = diameter_km * 1e3
+    v_proj   = v_proj_km_s * 1e3
+    rho_proj = rho_proj_kg_m3
+    D_star   = transition_diameter_km * 1e3
+    g        = _mars_gravity_m_s2
+
+    D_tr = 0.7576 * D_o**0.921 * D_star**0.079
+
+    E_proj = ((1/0.2212) * D_tr * v_proj**0.09 * g**0.22)**(1/0.26)
+    r_proj = ((3 * E_proj) / (2 * np.pi * rho_proj * v_proj**2))**(1/3)
+
+    R_ic = r_proj * 0.7
+    u_ic = 0.5 * v_proj
+    tau_rise = r_proj / v_proj
+
+    return D_tr, E_proj, r_proj, R_ic, u_ic, tau_rise
+
+
+
+def _get_cases(
+    *params,
+    pressure_threshold_GPa : float | np.ndarray | None = None,
+) -> dict:
+    """
+    Broadcast the crater diameters and impact parameters (in the order of `_case_params`) against each other, then compute the scaling quantities for each case (flattened, SI units).
+    """
+    arrays = list(params)
+    if pressure_threshold_GPa is not None:
+        arrays.append(pressure_threshold_GPa)
+    try:
+        arrays = np.broadcast_arrays(*[np.asarray(array, dtype=np.float64) for array in arrays])
+    except ValueError:
+        raise ValueError(f'Crater diameters and impact parameters must be broadcastable against each other. Got shapes {[np.shape(array) for array in arrays]}.')
+
+    cases = {'shape': arrays[0].shape}
+    for name, array in zip(_case_params, arrays):
+        cases[name] = array.ravel()
+    if pressure_threshold_GPa is not None:
+        cases['pressure_threshold_GPa'] = arrays[-1].ravel()
+
+    (
+        cases['D_tr'], cases['E_proj'], cases['r_proj'], cases['R_ic'], cases['u_ic'], cases['tau_rise']
+    ) = _get_scaling(cases['diameter_km'], cases['v_proj_km_s'], cases['rho_proj_kg_m3'], cases['transition_diameter_km'])
+
+    return cases
+
+
+
+def _get_params(
+    cases : dict,
+) -> dict[str, np.ndarray]:
+    """
+    Format the parameters of each case like the `params` output of `compute_pressure`.
+    """
+    shape = cases['shape']
+    params = {name: cases[name].reshape(shape) for name in _case_params[1:]}
+    params.update({
+        'transient_diameter_km' : (cases['D_tr'] * 1e-3).reshape(shape),
+        'E_proj_J'              : cases['E_proj'].reshape(shape),
+        'proj_radius_km'        : (cases['r_proj'] * 1e-3).reshape(shape),
+        'isobaric_radius_km'    : (cases['R_ic'] * 1e-3).reshape(shape),
+        'u_ic_km_s'             : (cases['u_ic'] * 1e-3).reshape(shape),
+        'rise_time'             : cases['tau_rise'].reshape(shape),
+    })
+    return params
+
+
+
+def _run_cases(
+    cases       : dict,
+    mode        : str,
+    args        : tuple,
+    max_workers : int | None,
+) -> np.ndarray:
+    """
+    Evaluate all cases with `_evaluate_cases`, optionally split across a pool of worker processes. Returns an array with the flattened cases along the first axis.
+    """
+    num_cases = cases['diameter_km'].size
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, num_cases))
+
+    if max_workers == 1:
+        return _evaluate_cases((cases, mode, args))
+
+    ## a few chunks per worker to balance the load
+    bounds = np.linspace(0, num_cases, 4 * max_workers + 1).astype(int)
+    chunks = [
+        ({key: (value if key == 'shape' else value[c0:c1]) for key, value in cases.items()}, mode, args)
+        for c0, c1 in zip(bounds[:-1], bounds[1:])
+        if c1 > c0
+    ]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return np.concatenate(list(executor.map(_evaluate_cases, chunks)))
+
+
+
+def _evaluate_cases(
+    args : tuple[dict, str, tuple],
+) -> np.ndarray:
+    """
+    Compute either the pressure fields (`mode='pressure'`) or demagnetization radii (`mode='radius'`) for a set of cases (runs in a worker process).
+    """
+    cases, mode, args = args
+    num_cases = cases['diameter_km'].size
+
+    if mode == 'pressure':
+        x_1d, y_1d, dtype, max_block_bytes = args
+        result = np.empty((num_cases, y_1d.size, x_1d.size), dtype=dtype)
+    else:
+        x_1d, y_1d, max_block_bytes = args
+        reached = np.zeros((num_cases, x_1d.size), dtype=bool)
+        threshold = cases['pressure_threshold_GPa'][:, None, None]
+
+    for c0, c1, i0, i1, P_block in _iter_pressure_blocks(
+        x_1d * 1e3, y_1d * 1e3,
+        cases['R_ic'], cases['u_ic'], cases['tau_rise'],
+        cases['bulk_sound_speed_km_s'] * 1e3, cases['compressibility'], cases['pressure_decay_const'], cases['rho_crust_kg_m3'],
+        max_block_bytes = max_block_bytes,
+    ):
+        if mode == 'pressure':
+            np.copyto(result[c0:c1, i0:i1], P_block, casting='unsafe')
+        else:
+            reached[c0:c1] |= (P_block >= threshold[c0:c1]).any(axis=1)
+
+    if mode == 'radius':
+        result = np.where(reached, np.abs(x_1d), 0).max(axis=1, initial=0)
+    return result
+
+
+
+def _iter_pressure_blocks(
+    x_1d            : np.ndarray,
+    y_1d            : np.ndarray,
+    R_ic            : np.ndarray,
+    u_ic            : np.ndarray,
+    tau_rise        : np.ndarray,
+    C               : np.ndarray,
+    S               : np.ndarray,
+    n               : np.ndarray,
+    rho_crust       : np.ndarray,
+    max_block_bytes : int,
+):
+    """
+    Evaluate effective shock pressures (in GPa) for a set of cases on the section `x_1d` by `y_1d` (all inputs in SI, and parameters as arrays with one value per case).
+
+    Yields `(c0, c1, i0, i1, P_block)`, where `P_block` holds the pressures for cases `c0:c1` and rows `i0:i1` with shape `(c1-c0, i1-i0, len(x_1d))`. `P_block` is a reused scratch buffer, so it's only valid until the next iteration.
+
+    Small sections are evaluated for many cases per block, and large sections in blocks of rows, such that the four float64 scratch buffers take about `max_block_bytes` in total. The piecewise definitions are rewritten without `np.where` so everything can be computed in place:
+        - u_p = u_ic * max(r/R_ic, 1)^(-n)
+        - P_eff = P_direct - P_reflected * max(1 - delta_t/tau_rise, 0)
+    """
+    num_cases = R_ic.size
+    num_rows = y_1d.size
+    num_cols = x_1d.size
+
+    max_cells = max(1, max_block_bytes // (4 * 8))
+    if num_rows * num_cols <= max_cells:
+        cases_per_block = max(1, max_cells // max(1, num_rows * num_cols))
+        rows_per_block = max(1, num_rows)
+    else:
+        cases_per_block = 1
+        rows_per_block = max(1, max_cells // max(1, num_cols))
+
+    buffers = np.empty((4, min(cases_per_block, num_cases), min(rows_per_block, num_rows), num_cols))
+    x2 = x_1d**2
+
+    for c0 in range(0, num_cases, cases_per_block):
+        c1 = min(num_cases, c0 + cases_per_block)
+
+        ## per-case parameters, shape (num_cases_in_block, 1, 1)
+        R_ic_b, u_ic_b, C_b, S_b, n_b, rho_b = (
+            param[c0:c1, None, None]
+            for param in (R_ic, u_ic, C, S, n, rho_crust)
+        )
+        factor_scale = -1 / (C_b * tau_rise[c0:c1, None, None])
+
+        def calc_P_direct(r, tmp):  ## overwrites `r` with the pressure
+            np.divide(r, R_ic_b, out=r)
+            np.maximum(r, 1, out=r)
+            np.power(r, -n_b, out=r)
+            r *= u_ic_b
+            np.multiply(r, S_b, out=tmp)
+            tmp += C_b
+            r *= tmp
+            r *= rho_b
+            return r
+
+        for i0 in range(0, num_rows, rows_per_block):
+            i1 = min(num_rows, i0 + rows_per_block)
+            y = y_1d[None, i0:i1, None]
+            R_dir, R_ref, factor, tmp = buffers[:, :c1-c0, :i1-i0]
+
+            np.add(x2, (y - R_ic_b)**2, out=R_dir)
+            np.sqrt(R_dir, out=R_dir)
+            np.add(x2, (y + R_ic_b)**2, out=R_ref)
+            np.sqrt(R_ref, out=R_ref)
+
+            ## max(1 - delta_t/tau_rise, 0), where delta_t = (R_ref - R_dir) / C
+            np.subtract(R_ref, R_dir, out=factor)
+            factor *= factor_scale
+            factor += 1
+            np.maximum(factor, 0, out=factor)
+
+            P_direct    = calc_P_direct(R_dir, tmp)
+            P_reflected = calc_P_direct(R_ref, tmp)
+
+            P_reflected *= factor
+            P_direct -= P_reflected
+            P_direct *= 1e-9
+
+            yield c0, c1, i0, i1, P_direct
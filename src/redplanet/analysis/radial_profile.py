@@ -1,8 +1,15 @@
 from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import inspect
+import os
 
 import numpy as np
+import pandas as pd
+import xarray as xr
 
 from redplanet.helper_functions import geodesy
+from redplanet.helper_functions.misc import _parse_percentile
+from redplanet.helper_functions.parallel import _get_user_config, _get_loaded_datasets, _init_worker
 
 
 
@@ -46,20 +53,120 @@ def get_concentric_ring_coords(
     Raises
     ------
     ValueError
-        If either both or neither of `dist_btwn_rings_km` and `num_rings` are specified.
+        If both `dist_btwn_rings_km` and `num_rings` are specified.
 
     Notes
     -----
     For examples, see ["Tutorials & Guides"](/redplanet/tutorials/){target="_blank"} on the RedPlanet documentation website.
     """
 
+    ring_radius_km__per_ring, ring_offsets, ring_coords = get_concentric_ring_coords_flat(
+        lon                 = lon,
+        lat                 = lat,
+        radius_km           = radius_km,
+        dist_btwn_rings_km  = dist_btwn_rings_km,
+        num_rings           = num_rings,
+        dist_btwn_points_km = dist_btwn_points_km,
+    )
+    return (
+        ring_radius_km__per_ring,
+        tuple(ring_coords[i0:i1] for (i0, i1) in zip(ring_offsets[:-1], ring_offsets[1:])),
+    )
+
+
+
+def get_concentric_ring_coords_flat(
+    lon                 : float | np.ndarray,
+    lat                 : float | np.ndarray,
+    radius_km           : float,
+    dist_btwn_rings_km  : float = ...,
+    num_rings           : int   = None,
+    dist_btwn_points_km : float = 5,
+) -> tuple[ np.ndarray, np.ndarray, np.ndarray ]:
+    """
+    Generate concentric ring coordinates around one or more central points, as a single flat array.
+
+    This is equivalent to `get_concentric_ring_coords`, but the points of all rings are stored in one array with an index of where each ring starts (i.e. "compressed sparse row" layout), and all points are computed with a single vectorized call rather than one call per ring. This is much faster when there are many rings, and it lets you generate rings for many centers (e.g. every crater in a database) at once.
+
+    Parameters
+    ----------
+    lon : float | np.ndarray
+        Longitude coordinate(s) of the center(s) of the rings, in range [-180, 360].
+    lat : float | np.ndarray
+        Latitude coordinate(s) of the center(s) of the rings, in range [-90, 90]. Must have the same shape as `lon`.
+    radius_km : float
+        Radius (in kilometers) of the largest/outermost ring.
+    dist_btwn_rings_km : float, optional
+        Distance (in kilometers) between consecutive rings. You can't provide both this and `num_rings`. Default is 5 km.
+    num_rings : int, optional
+        Total number of rings to generate. You can't provide both this and `dist_btwn_rings_km`. Default is None.
+    dist_btwn_points_km : float, optional
+        Desired spacing (in kilometers) between adjacent points on each ring. Default is 5.
+
+    Returns
+    -------
+    ring_radius_km__per_ring : np.ndarray
+        Ring radii (in kilometers) for each ring, with shape `(num_rings,)`.
+    ring_offsets : np.ndarray
+        Index of the first point of each ring, with shape `(num_rings+1,)`, such that the points of ring `i` are `ring_coords[..., ring_offsets[i]:ring_offsets[i+1], :]`. The last element is the total number of points.
+    ring_coords : np.ndarray
+        The (longitude, latitude) coordinates of the points on all rings, with shape `(num_points, 2)` if `lon` and `lat` are scalars, or `(num_centers, num_points, 2)` otherwise. The layout of rings/points is identical for every center.
+
+    Raises
+    ------
+    ValueError
+        - If both `dist_btwn_rings_km` and `num_rings` are specified.
+        - If `lon` and `lat` don't have the same shape.
+    """
+
+    ring_radius_km__per_ring, num_points__per_ring = _get_ring_layout(radius_km, dist_btwn_rings_km, num_rings, dist_btwn_points_km)
+
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    if lon.shape != lat.shape:
+        raise ValueError(f'`lon` and `lat` must have the same shape. Got shapes {lon.shape} and {lat.shape}.')
+    centers = np.column_stack([lon.ravel(), lat.ravel()])
+
+    ## Flat azimuth/radius pairs for every point of every ring.
+    ring_offsets = np.concatenate([[0], np.cumsum(num_points__per_ring)])
+    azimuths, distances_m = _get_ring_points(ring_radius_km__per_ring, ring_offsets, 0, ring_offsets[-1])
+
+    ## Solve the direct geodesic problem for all centers and points at once.
+    num_centers, num_points = centers.shape[0], azimuths.size
+    ring_coords = geodesy.move_forward(
+        start    = np.repeat(centers, num_points, axis=0),
+        azimuth  = np.tile(azimuths, num_centers),
+        distance = np.tile(distances_m, num_centers),
+    ).reshape(num_centers, num_points, 2)
+
+    if lon.ndim == 0:
+        ring_coords = ring_coords[0]
+
+    return (
+        ring_radius_km__per_ring,
+        ring_offsets,
+        ring_coords,
+    )
+
+
+
+def _get_ring_layout(
+    radius_km           : float,
+    dist_btwn_rings_km  : float,
+    num_rings           : int,
+    dist_btwn_points_km : float,
+) -> tuple[ np.ndarray, np.ndarray ]:
+    """
+    Get the radius and number of points of each ring, see `get_concentric_ring_coords` for details.
+    """
+
     ## Input validation and defaults — after this, we're guaranteed one of `dist_btwn_rings_km` or `num_rings` will be a float and the other will be None.
     if (dist_btwn_rings_km is not ...) and (num_rings is not None):
         raise ValueError('Cannot provide both `dist_btwn_rings_km` and `num_rings` — provide only one or neither.')
 
-    if num_rings:
+    if num_rings is not None:
         dist_btwn_rings_km = None
-    else:
+    elif dist_btwn_rings_km is ...:
         dist_btwn_rings_km = 5
 
     ## Get radii for a series of concentric rings, starting at the center and going up to a distance of `radius_km`.
@@ -77,23 +184,24 @@ def get_concentric_ring_coords(
     min_num_points = 10
     num_points__per_ring[num_points__per_ring < min_num_points] = min_num_points
 
-    ## Generate (lon,lat) coordinates for each point on each ring.
-    ring_coords__per_ring = []
-    for (ring_radius_km, num_points) in zip(ring_radius_km__per_ring, num_points__per_ring):
-        ## Generate the (lon,lat) coordinates of `num_points` points around the circle of radius `ring_radius_km`.
-        ring_coords = geodesy.make_circle(
-            lon       = lon,
-            lat       = lat,
-            radius    = ring_radius_km * 1e3,
-            n_samples = num_points,
-            endpoint  = False,
-        )
-        ring_coords__per_ring.append(ring_coords)
+    return ring_radius_km__per_ring, num_points__per_ring
 
-    return (
-        ring_radius_km__per_ring,
-        tuple(ring_coords__per_ring)
-    )
+
+
+def _get_ring_points(
+    ring_radius_km__per_ring : np.ndarray,
+    ring_offsets             : np.ndarray,
+    p0                       : int,
+    p1                       : int,
+) -> tuple[ np.ndarray, np.ndarray ]:
+    """
+    Get the azimuth (degrees) and distance (meters) from the center of points `p0` to `p1` (exclusive) in the flat layout of `get_concentric_ring_coords_flat`, where points go clockwise from due north on each ring (same as `geodesy.make_circle`).
+    """
+    point_index = np.arange(p0, p1)
+    ring_index = np.searchsorted(ring_offsets, point_index, side='right') - 1
+    num_points = ring_offsets[ring_index + 1] - ring_offsets[ring_index]
+    azimuths = 360 - 360 * (point_index - ring_offsets[ring_index]) / num_points
+    return azimuths, ring_radius_km__per_ring[ring_index] * 1e3
 
 
 
@@ -103,6 +211,7 @@ def get_profile(
     ring_coords__per_ring : tuple[np.ndarray],
     accessor              : Callable[[float, float], float],
     return_stats          : bool = False,
+    vectorized            : bool | None = None,
 ) -> np.ndarray | tuple[ np.ndarray, np.ndarray, tuple[np.ndarray] ]:
     """
     Compute a radial profile using data extracted from concentric rings.
@@ -118,6 +227,12 @@ def get_profile(
         A function that accepts two arguments (longitude and latitude), then returns a numerical value corresponding to a data point at those coordinates. See Notes for more information.
     return_stats : bool, optional
         If True, the function returns additional statistical data (standard deviation and raw values for each ring) along with the averaged values. Default is False.
+    vectorized : bool | None, optional
+        Whether `accessor` accepts whole arrays of paired coordinates, in which case it's called once for all points of all rings rather than once per point (this is orders of magnitude faster). Options are:
+
+        - None (default): Automatically detect RedPlanet getters, i.e. functions with a `pointwise` parameter (e.g. `redplanet.Crust.topo.get`), which are called as `accessor(lons, lats, pointwise=True)`. Any other accessor is called once per point.
+        - True: Call `accessor(lons, lats)` once, where `lons` and `lats` are 1D arrays of the same length, and it must return a 1D array of values for each (lon, lat) pair.
+        - False: Call `accessor(lon, lat)` once per point.
 
 
     Returns
@@ -143,25 +258,621 @@ def get_profile(
     - Example 2: For functions which require additional arguments (e.g., vector components of the magnetic field or custom calculations), you should define a separate function that will only require longitude and latitude as arguments. There are two ways to do this:
         - Directly supply a lambda function like `accessor = lambda lon, lat: redplanet.Mag.sh.get(lon, lat, quantity='radial')` — this is ideal for simple one-line accessors.
         - Define a function separately like `def get_value(lon, lat): return redplanet.Mag.sh.get(lon, lat, quantity='radial')`, and then pass `accessor = get_value` — this is ideal when your implementation of the `get_value` function involves multiple steps, e.g. querying multiple datasets, performing calculations, conditional/loop blocks, etc.
+    - Accessors in Example 2 can be made much faster by accepting arrays: e.g. `accessor = lambda lon, lat: redplanet.Mag.sh.get(lon, lat, quantity='radial', pointwise=True)` with `vectorized=True`. Getters passed directly (Example 1) are detected and vectorized automatically.
     """
 
-    vals__per_ring = []
-    for ring_coords in ring_coords__per_ring:
-        vals = []
-        for (lon, lat) in ring_coords:
-            vals.append(accessor(lon, lat))
-        vals = np.array(vals)
-        vals__per_ring.append(vals)
+    if len(ring_coords__per_ring) == 0:
+        return (np.array([]), np.array([]), ()) if return_stats else np.array([])
 
-    avg_vals__per_ring = np.array([np.mean(vals) for vals in vals__per_ring])
+    ## Flatten all rings into one array of points, with the index of the first point of each ring.
+    num_points__per_ring = np.array([len(ring_coords) for ring_coords in ring_coords__per_ring])
+    ring_offsets = np.concatenate([[0], np.cumsum(num_points__per_ring)])
+    ring_coords = np.concatenate(ring_coords__per_ring).reshape(-1, 2)
+
+    vals, avg_vals__per_ring, sigma__per_ring = _get_ring_stats(ring_offsets, ring_coords, *_resolve_accessor(accessor, vectorized))
 
     if not return_stats:
         return avg_vals__per_ring
 
-    sigma__per_ring = np.array([np.std(vals) for vals in vals__per_ring])
-
     return (
         avg_vals__per_ring,
         sigma__per_ring,
-        tuple(vals__per_ring),
+        tuple(np.split(vals, ring_offsets[1:-1])),
+    )
+
+
+
+
+
+def get_polar_grid(
+    lon                 : float,
+    lat                 : float,
+    radius_km           : float,
+    accessor            : Callable[[float, float], float],
+    num_azimuths        : int   = 36,
+    dist_btwn_rings_km  : float = ...,
+    num_rings           : int   = None,
+    dist_btwn_points_km : float | None = 5,
+    vectorized          : bool | None = None,
+) -> xr.DataArray:
+    """
+    Compute a sector-resolved (radius x azimuth) profile around a central point, e.g. to study asymmetric ejecta or magnetization around a basin.
+
+    Rings have the same radii as `get_concentric_ring_coords`, and each ring is split into `num_azimuths` equal sectors where values are averaged over the points within each sector. All points of the lattice are generated with a single vectorized geodesic call, and the data is extracted with a single paired lookup (for vectorized accessors), so this costs about the same as a full-ring profile.
+
+    Every sector of a ring has the same number of points, so averaging over all azimuths of the result gives a full-ring average. However, it's not identical to `get_profile`, since the points are placed differently: here, each sector is divided into equal arcs which are sampled at their centers (at least one point per sector, i.e. at least `num_azimuths` per ring), whereas `get_concentric_ring_coords` places `ceil(2*pi*r / dist_btwn_points_km)` points (at least 10) starting at due north. The two only agree up to these sampling differences.
+
+
+    Parameters
+    ----------
+    lon : float
+        Longitude coordinate of the center, in range [-180, 360].
+    lat : float
+        Latitude coordinate of the center, in range [-90, 90].
+    radius_km : float
+        Radius (in kilometers) of the largest/outermost ring.
+    accessor : Callable[[float, float], float]
+        A function that accepts two arguments (longitude and latitude), then returns a numerical value corresponding to a data point at those coordinates. See `get_profile` for more information.
+    num_azimuths : int, optional
+        Number of azimuth sectors, where the first sector starts at due north (azimuth 0) and sectors go clockwise (towards east). Default is 36 (i.e. 10 degree sectors).
+    dist_btwn_rings_km : float, optional
+        Distance (in kilometers) between consecutive rings. You can't provide both this and `num_rings`. Default is 5 km.
+    num_rings : int, optional
+        Total number of rings to generate. You can't provide both this and `dist_btwn_rings_km`. Default is None.
+    dist_btwn_points_km : float | None, optional
+        Desired spacing (in kilometers) between adjacent points within each sector, where every sector has at least one point. If None, each sector is only sampled at its center. Default is 5.
+    vectorized : bool | None, optional
+        Whether `accessor` accepts whole arrays of paired coordinates, see `get_profile`. Default is None (automatically detect RedPlanet getters).
+
+
+    Returns
+    -------
+    xr.DataArray
+        Averaged values with dims `('radius_km', 'azimuth')`, where the 'azimuth' coordinate is the center of each sector in degrees. The number of points averaged in each sector is given by the `num_points` coordinate (with dim 'radius_km', since it's the same for every sector of a ring), and the coordinates of the center are given in the attributes.
+
+
+    Raises
+    ------
+    ValueError
+        - If both `dist_btwn_rings_km` and `num_rings` are specified.
+        - If `num_azimuths` is less than 1.
+    """
+
+    if num_azimuths < 1:
+        raise ValueError(f'`num_azimuths` must be at least 1. Got {num_azimuths}.')
+
+    ring_radius_km__per_ring, _ = _get_ring_layout(radius_km, dist_btwn_rings_km, num_rings, 1)
+    num_radii = ring_radius_km__per_ring.size
+
+    ## Number of points in each sector of each ring, using the same arc length approximation as `get_concentric_ring_coords`.
+    if dist_btwn_points_km is None:
+        num_points__per_ring = np.ones(num_radii, dtype=int)
+    else:
+        num_points__per_ring = np.maximum(1, np.ceil(2 * np.pi * ring_radius_km__per_ring / num_azimuths / dist_btwn_points_km).astype(int))
+
+    ## Flat azimuth/radius pairs where points of each (ring, sector) are contiguous, ordered by ring then sector.
+    num_points__per_bin = np.repeat(num_points__per_ring, num_azimuths)
+    bin_offsets = np.concatenate([[0], np.cumsum(num_points__per_bin)])
+    bin_index = np.repeat(np.arange(num_points__per_bin.size), num_points__per_bin)
+    point_index = np.arange(bin_offsets[-1]) - bin_offsets[bin_index]
+    ring_index, sector_index = np.divmod(bin_index, num_azimuths)
+
+    sector_width = 360 / num_azimuths
+    azimuths = sector_width * (sector_index + (point_index + 0.5) / num_points__per_bin[bin_index])
+    distances_m = ring_radius_km__per_ring[ring_index] * 1e3
+
+    ## Extract values and average each sector.
+    accessor, vectorized = _resolve_accessor(accessor, vectorized)
+    if num_radii > 0:
+        coords = geodesy.move_forward(
+            start    = [lon, lat],
+            azimuth  = azimuths,
+            distance = distances_m,
+        )
+        _, avg_vals__per_bin, _ = _get_ring_stats(bin_offsets, coords, accessor, vectorized)
+    else:
+        avg_vals__per_bin = np.empty(0)
+
+    return xr.DataArray(
+        data   = avg_vals__per_bin.reshape(num_radii, num_azimuths),
+        dims   = ('radius_km', 'azimuth'),
+        coords = {
+            'radius_km' : ring_radius_km__per_ring,
+            'azimuth'   : sector_width * (np.arange(num_azimuths) + 0.5),
+            'num_points': ('radius_km', num_points__per_ring),
+        },
+        attrs  = {
+            'lon': lon,
+            'lat': lat,
+        },
+    )
+
+
+
+def get_profile_stats(
+    lon                 : float,
+    lat                 : float,
+    radius_km           : float,
+    accessor            : Callable[[float, float], float],
+    dist_btwn_rings_km  : float = ...,
+    num_rings           : int   = None,
+    dist_btwn_points_km : float = 5,
+    stats               : list[str] = ('mean', 'std'),
+    vectorized          : bool | None = None,
+    nodata              : float | None = None,
+    max_chunk_points    : int = 2**18,
+    compression         : int = 200,
+) -> tuple[ np.ndarray, dict[str, np.ndarray] ]:
+    """
+    Compute summary statistics of data extracted from concentric rings in a single streaming pass, without keeping all coordinates or values in memory.
+
+    This is an alternative to `get_concentric_ring_coords` followed by `get_profile(..., return_stats=True)` for very dense rings (e.g. large radii on high resolution DEMs): the coordinates of each chunk of at most `max_chunk_points` points are generated only when it's processed, and only a constant amount of state is kept per ring, so memory usage doesn't grow with the number of points per ring.
+
+
+    Parameters
+    ----------
+    lon : float
+        Longitude coordinate of the center of the rings, in range [-180, 360].
+    lat : float
+        Latitude coordinate of the center of the rings, in range [-90, 90].
+    radius_km : float
+        Radius (in kilometers) of the largest/outermost ring.
+    accessor : Callable[[float, float], float]
+        A function that accepts two arguments (longitude and latitude), then returns a numerical value corresponding to a data point at those coordinates. See `get_profile` for more information.
+    dist_btwn_rings_km : float, optional
+        Distance (in kilometers) between consecutive rings. You can't provide both this and `num_rings`. Default is 5 km.
+    num_rings : int, optional
+        Total number of rings to generate. You can't provide both this and `dist_btwn_rings_km`. Default is None.
+    dist_btwn_points_km : float, optional
+        Desired spacing (in kilometers) between adjacent points on each ring. Default is 5.
+    stats : list[str], optional
+        Statistics to compute for each ring. Options are:
+
+        - 'mean', 'std', 'var' : Exact (computed with Welford's online algorithm, where per-chunk results are combined with Chan's parallel update).
+        - 'min', 'max' : Exact.
+        - 'count' : Number of valid values.
+        - 'count_nan' : Number of missing values (NaN, or equal to `nodata`).
+        - 'median', and percentiles given as 'p' followed by a number in [0, 100] (e.g. 'p5', 'p97.5') : Approximate (see notes).
+
+        Default is ('mean', 'std').
+    vectorized : bool | None, optional
+        Whether `accessor` accepts whole arrays of paired coordinates, see `get_profile`. Default is None (automatically detect RedPlanet getters).
+    nodata : float | None, optional
+        Sentinel value for missing data (e.g. the raw nodata value of a DEM), which is excluded from statistics like NaN. Default is None.
+    max_chunk_points : int, optional
+        Maximum number of points processed at a time. Default is 2^18.
+    compression : int, optional
+        Maximum number of centroids kept per ring for approximate quantiles, which trades memory for accuracy. Default is 200.
+
+
+    Returns
+    -------
+    ring_radius_km__per_ring : np.ndarray
+        Ring radii (in kilometers) for each ring.
+    stats : dict[str, np.ndarray]
+        Mapping from each name in `stats` to an array of values per ring (starting with the smallest). Statistics of rings without any valid values are NaN (counts are zero).
+
+
+    Raises
+    ------
+    ValueError
+        - If a requested statistic is not recognized.
+        - If both `dist_btwn_rings_km` and `num_rings` are specified.
+
+
+    Notes
+    -----
+    Quantiles are estimated with a merging t-digest (Dunning & Ertl, 2019, [arXiv:1902.04023](https://arxiv.org/abs/1902.04023){target="_blank"}): values are summarized by at most `compression` weighted centroids per ring, which are smaller near the tails of the distribution so extreme quantiles remain accurate. Rings with fewer than ~0.6 * `compression` valid values are summarized exactly (i.e. quantiles match `np.percentile`).
+    """
+
+    ## Input validation
+    stats = list(stats)
+    quantiles = [_parse_stat(stat) for stat in stats]
+    use_digest = any(q is not None for q in quantiles)
+
+    ring_radius_km__per_ring, num_points__per_ring = _get_ring_layout(radius_km, dist_btwn_rings_km, num_rings, dist_btwn_points_km)
+    num_rings = ring_radius_km__per_ring.size
+    if num_rings == 0:
+        return ring_radius_km__per_ring, {stat: np.array([]) for stat in stats}
+
+    ring_offsets = np.concatenate([[0], np.cumsum(num_points__per_ring)])
+    accessor, vectorized = _resolve_accessor(accessor, vectorized)
+
+
+    ## Running state per ring
+    count     = np.zeros(num_rings, dtype=np.int64)
+    count_nan = np.zeros(num_rings, dtype=np.int64)
+    mean      = np.zeros(num_rings)
+    m2        = np.zeros(num_rings)
+    minimum   = np.full(num_rings,  np.inf)
+    maximum   = np.full(num_rings, -np.inf)
+    digests   = [_QuantileDigest(compression) for _ in range(num_rings)] if use_digest else None
+
+    for p0 in range(0, ring_offsets[-1], max_chunk_points):
+        p1 = min(ring_offsets[-1], p0 + max_chunk_points)
+
+        ## Generate the coordinates of the chunk (which can span several rings) in the same layout as `get_concentric_ring_coords_flat`.
+        azimuths, distances_m = _get_ring_points(ring_radius_km__per_ring, ring_offsets, p0, p1)
+        coords = geodesy.move_forward(start=[lon, lat], azimuth=azimuths, distance=distances_m)
+
+        if vectorized:
+            vals = np.atleast_1d(np.asarray(accessor(coords[:,0], coords[:,1]), dtype=np.float64))  ## some accessors return a scalar for a single point
+            if vals.shape != (coords.shape[0],):
+                raise ValueError(f'When `vectorized=True`, `accessor(lons, lats)` must return one value per (lon, lat) pair, i.e. shape {(coords.shape[0],)}. Got shape {vals.shape}.')
+        else:
+            vals = np.array([accessor(lon, lat) for (lon, lat) in coords], dtype=np.float64)
+
+        valid = ~np.isnan(vals)
+        if nodata is not None:
+            valid &= (vals != nodata)
+
+        ## Segments of the chunk belonging to each ring, skipping rings without points (`reduceat` would return the next element for them rather than zero).
+        r0 = np.searchsorted(ring_offsets, p0, side='right') - 1
+        r1 = np.searchsorted(ring_offsets, p1, side='left')
+        rings = np.arange(r0, r1)
+        rings = rings[num_points__per_ring[rings] > 0]
+        seg_starts = np.maximum(ring_offsets[rings], p0) - p0
+        seg_count = np.add.reduceat(valid, seg_starts).astype(np.int64)
+        count_nan[rings] += np.diff(np.append(seg_starts, p1 - p0)) - seg_count
+
+        vals_valid = np.where(valid, vals, 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            seg_mean = np.add.reduceat(vals_valid, seg_starts) / seg_count
+        seg_index = np.repeat(np.arange(rings.size), np.diff(np.append(seg_starts, p1 - p0)))
+        seg_m2 = np.add.reduceat(np.where(valid, vals - seg_mean[seg_index], 0)**2, seg_starts)
+
+        minimum[rings] = np.minimum(minimum[rings], np.minimum.reduceat(np.where(valid, vals,  np.inf), seg_starts))
+        maximum[rings] = np.maximum(maximum[rings], np.maximum.reduceat(np.where(valid, vals, -np.inf), seg_starts))
+
+        ## Chan et al. parallel update of the running mean and sum of squared deviations.
+        has = seg_count > 0
+        n_a, n_b = count[rings][has], seg_count[has]
+        n = n_a + n_b
+        delta = seg_mean[has] - mean[rings][has]
+        mean[rings[has]] += delta * (n_b / n)
+        m2[rings[has]] += seg_m2[has] + delta**2 * (n_a * n_b / n)
+        count[rings[has]] = n
+
+        if use_digest:
+            seg_ends = np.append(seg_starts[1:], p1 - p0)
+            for i in np.flatnonzero(has):
+                seg = slice(seg_starts[i], seg_ends[i])
+                digests[rings[i]].update(vals[seg][valid[seg]])
+
+
+    ## Output
+    empty = count == 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = np.where(empty, np.nan, m2 / count)
+    results = {}
+    for stat, q in zip(stats, quantiles):
+        match stat:
+            case 'mean':
+                results[stat] = np.where(empty, np.nan, mean)
+            case 'std':
+                results[stat] = np.sqrt(var)
+            case 'var':
+                results[stat] = var
+            case 'min':
+                results[stat] = np.where(empty, np.nan, minimum)
+            case 'max':
+                results[stat] = np.where(empty, np.nan, maximum)
+            case 'count':
+                results[stat] = count
+            case 'count_nan':
+                results[stat] = count_nan
+            case _:
+                results[stat] = np.array([digest.quantile(q) for digest in digests])
+    return ring_radius_km__per_ring, results
+
+
+
+def get_profiles(
+    getters             : dict[str, Callable],
+    craters             : pd.DataFrame | None = None,
+    lon                 : float | np.ndarray | None = None,
+    lat                 : float | np.ndarray | None = None,
+    radius_km           : float | np.ndarray | None = None,
+    dist_btwn_rings_km  : float = ...,
+    num_rings           : int   = None,
+    dist_btwn_points_km : float = 5,
+    vectorized          : bool | None = None,
+    executor            : str = 'process',
+    max_workers         : int | None = None,
+    progress            : bool = False,
+) -> xr.Dataset:
+    """
+    Compute radial profiles of one or more quantities around many centers (e.g. every crater in `redplanet.Craters.get()`), in parallel.
+
+    This is equivalent to calling `get_concentric_ring_coords` and `get_profile` for every center and getter, but the work is distributed across a pool of workers and results are collected into a single padded dataset.
+
+
+    Parameters
+    ----------
+    getters : dict[str, Callable]
+        Mapping from the name of each quantity to its accessor function, e.g. `{'topo': redplanet.Crust.topo.get, 'moho': redplanet.Crust.moho.get}`. See `get_profile` for details about accessors.
+    craters : pd.DataFrame | None, optional
+        Table of centers with columns 'lon' and 'lat', e.g. the output of `redplanet.Craters.get()`. If provided, `lon` and `lat` must be None. If it has 'id' or 'name' columns, they're included as coordinates of the output.
+    lon : float | np.ndarray | None, optional
+        Longitude coordinate(s) of the center(s), in range [-180, 360]. Only used if `craters` is None.
+    lat : float | np.ndarray | None, optional
+        Latitude coordinate(s) of the center(s), in range [-90, 90]. Only used if `craters` is None.
+    radius_km : float | np.ndarray
+        Radius (in kilometers) of the largest/outermost ring, either the same for every center or one per center (e.g. `2 * craters['diam']`).
+    dist_btwn_rings_km : float, optional
+        Distance (in kilometers) between consecutive rings. You can't provide both this and `num_rings`. Default is 5 km.
+    num_rings : int, optional
+        Total number of rings to generate for each center. You can't provide both this and `dist_btwn_rings_km`. Default is None.
+    dist_btwn_points_km : float, optional
+        Desired spacing (in kilometers) between adjacent points on each ring. Default is 5.
+    vectorized : bool | None, optional
+        Whether accessors accept whole arrays of paired coordinates, see `get_profile`. Default is None (automatically detect RedPlanet getters).
+    executor : str, optional
+        How to distribute the work across centers:
+
+        - `'process'` (default): a pool of worker processes. Getters must be picklable (i.e. module-level functions like `redplanet.Crust.topo.get`, not lambdas). Datasets which are currently loaded are reloaded in each worker from the data cache (memory-mapped files are reopened rather than copied).
+        - `'thread'`: a pool of threads in the current process, which allows any accessor (including lambdas). This is most effective when accessors are vectorized, since NumPy releases the GIL.
+        - `'serial'`: no pool, every center is processed in order in the current process.
+    max_workers : int | None, optional
+        Number of workers. Default is None, which uses the number of CPUs.
+    progress : bool, optional
+        If True, display a progress bar (requires the `tqdm` package). Default is False.
+
+
+    Returns
+    -------
+    xr.Dataset
+        Dataset with dims `('crater', 'ring', 'quantity')` and variables:
+
+        - `mean` : Averaged values per ring.
+        - `std` : Standard deviation per ring.
+
+        Coordinates include `lon`/`lat` (and `id`/`name` if available) for each center, `radius_km` with dims `('crater', 'ring')`, and `num_rings` for each center. Centers can have different numbers of rings (e.g. when `radius_km` differs and `dist_btwn_rings_km` is used), in which case arrays are padded with NaN up to the largest number of rings. Centers are always in the same order as the input, regardless of the order in which workers finish.
+
+
+    Raises
+    ------
+    ValueError
+        - If both or neither of `craters` and `lon`/`lat` are provided, or `radius_km` is missing.
+        - If `lon`, `lat`, and `radius_km` don't have compatible shapes.
+        - If `executor` is not one of the options.
+    """
+
+    ## Input validation
+    if craters is not None:
+        if (lon is not None) or (lat is not None):
+            raise ValueError('Provide either `craters` or `lon`/`lat`, not both.')
+        lon = craters['lon'].to_numpy()
+        lat = craters['lat'].to_numpy()
+    elif (lon is None) or (lat is None):
+        raise ValueError('Provide either `craters` or both `lon` and `lat`.')
+    if radius_km is None:
+        raise ValueError('`radius_km` is required.')
+
+    try:
+        lon, lat, radius_km = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(lon, dtype=np.float64)),
+            np.atleast_1d(np.asarray(lat, dtype=np.float64)),
+            np.atleast_1d(np.asarray(radius_km, dtype=np.float64)),
+        )
+    except ValueError:
+        raise ValueError(f'`lon`, `lat`, and `radius_km` must have the same shape (or be scalars). Got shapes {np.shape(lon)}, {np.shape(lat)}, and {np.shape(radius_km)}.')
+    lon, lat, radius_km = lon.ravel(), lat.ravel(), radius_km.ravel()
+
+    executors = ('process', 'thread', 'serial')
+    if executor not in executors:
+        raise ValueError(f'Unknown executor: "{executor}". Options are: {", ".join(executors)}.')
+
+    _get_ring_layout(1, dist_btwn_rings_km, num_rings, dist_btwn_points_km)  ## raises ValueError if ring options conflict
+
+
+    ## Compute profiles
+    quantities = list(getters)
+    ring_kwargs = dict(
+        dist_btwn_rings_km  = dist_btwn_rings_km,
+        num_rings           = num_rings,
+        dist_btwn_points_km = dist_btwn_points_km,
+    )
+    args = [
+        (lon[i], lat[i], radius_km[i], ring_kwargs, getters, vectorized)
+        for i in range(lon.size)
+    ]
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    if progress:
+        from tqdm import tqdm  ## imported lazily, since it's only needed for the progress bar
+        pbar = tqdm(total=len(args), desc='Computing radial profiles')
+    else:
+        pbar = None
+
+    results = [None] * len(args)
+    try:
+        if executor == 'serial':
+            for i, arg in enumerate(args):
+                results[i] = _get_profiles_single(arg)
+                if pbar is not None: pbar.update(1)
+        else:
+            if executor == 'process':
+                pool = ProcessPoolExecutor(
+                    max_workers = max_workers,
+                    initializer = _init_worker,
+                    initargs    = (_get_user_config(), _get_loaded_datasets()),
+                )
+            else:
+                pool = ThreadPoolExecutor(max_workers=max_workers)
+            with pool:
+                futures = {pool.submit(_get_profiles_single, arg): i for (i, arg) in enumerate(args)}
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+                    if pbar is not None: pbar.update(1)
+    finally:
+        if pbar is not None:
+            pbar.close()
+
+
+    ## Collect into a padded dataset
+    num_rings__per_crater = np.array([result[0].size for result in results], dtype=int)
+    max_num_rings = num_rings__per_crater.max(initial=0)
+
+    radius = np.full((len(results), max_num_rings), np.nan)
+    mean   = np.full((len(results), max_num_rings, len(quantities)), np.nan)
+    std    = np.full((len(results), max_num_rings, len(quantities)), np.nan)
+    for i, (ring_radius_km__per_ring, avg_vals, sigmas) in enumerate(results):
+        n = ring_radius_km__per_ring.size
+        radius[i, :n] = ring_radius_km__per_ring
+        mean[i, :n] = avg_vals
+        std[i, :n] = sigmas
+
+    coords = {
+        'quantity' : quantities,
+        'lon'      : ('crater', lon),
+        'lat'      : ('crater', lat),
+        'num_rings': ('crater', num_rings__per_crater),
+        'radius_km': (('crater', 'ring'), radius),
+    }
+    if craters is not None:
+        for col in ('id', 'name'):
+            if col in craters.columns:
+                coords[col] = ('crater', craters[col].to_numpy())
+
+    return xr.Dataset(
+        data_vars = {
+            'mean': (('crater', 'ring', 'quantity'), mean),
+            'std' : (('crater', 'ring', 'quantity'), std),
+        },
+        coords = coords,
     )
+
+
+
+
+
+def _get_profiles_single(
+    args: tuple[float, float, float, dict, dict[str, Callable], bool | None],
+) -> tuple[ np.ndarray, np.ndarray, np.ndarray ]:
+    """
+    Compute radial profiles of every quantity around a single center (runs in a worker for `get_profiles`). Returns the ring radii, and the means and standard deviations with shape (num_rings, num_quantities).
+    """
+    lon, lat, radius_km, ring_kwargs, getters, vectorized = args
+
+    ring_radius_km__per_ring, ring_offsets, ring_coords = get_concentric_ring_coords_flat(lon, lat, radius_km, **ring_kwargs)
+
+    avg_vals = np.full((ring_radius_km__per_ring.size, len(getters)), np.nan)
+    sigmas   = np.full((ring_radius_km__per_ring.size, len(getters)), np.nan)
+    if ring_radius_km__per_ring.size > 0:
+        for j, getter in enumerate(getters.values()):
+            _, avg_vals[:, j], sigmas[:, j] = _get_ring_stats(ring_offsets, ring_coords, *_resolve_accessor(getter, vectorized))
+
+    return ring_radius_km__per_ring, avg_vals, sigmas
+
+
+
+def _resolve_accessor(
+    accessor   : Callable,
+    vectorized : bool | None,
+) -> tuple[ Callable, bool ]:
+    """
+    Resolve `vectorized=None` by detecting RedPlanet getters (see `get_profile`), which are wrapped to perform paired lookups.
+    """
+    if vectorized is None:
+        try:
+            vectorized = 'pointwise' in inspect.signature(accessor).parameters
+        except (TypeError, ValueError):
+            vectorized = False
+        if vectorized:
+            _accessor = accessor
+            accessor = lambda lon, lat: _accessor(lon, lat, pointwise=True)
+    return accessor, vectorized
+
+
+
+def _get_ring_stats(
+    ring_offsets : np.ndarray,
+    ring_coords  : np.ndarray,
+    accessor     : Callable,
+    vectorized   : bool,
+) -> tuple[ np.ndarray, np.ndarray, np.ndarray ]:
+    """
+    Extract values at flat ring coordinates (see `get_concentric_ring_coords_flat`), and compute the mean and standard deviation of each ring with segmented reductions.
+    """
+
+    ## Extract values for all points at once (or one at a time for scalar accessors).
+    if vectorized:
+        vals = np.atleast_1d(np.asarray(accessor(ring_coords[:,0], ring_coords[:,1])))  ## some accessors return a scalar for a single point
+        if vals.shape != (ring_coords.shape[0],):
+            raise ValueError(f'When `vectorized=True`, `accessor(lons, lats)` must return one value per (lon, lat) pair, i.e. shape {(ring_coords.shape[0],)}. Got shape {vals.shape}.')
+    else:
+        vals = np.array([accessor(lon, lat) for (lon, lat) in ring_coords])
+
+    ## Segmented reductions over each ring.
+    num_points__per_ring = np.diff(ring_offsets)
+    ring_index = np.repeat(np.arange(num_points__per_ring.size), num_points__per_ring)
+    avg_vals__per_ring = np.add.reduceat(vals, ring_offsets[:-1]) / num_points__per_ring
+    sigma__per_ring = np.sqrt(np.add.reduceat((vals - avg_vals__per_ring[ring_index])**2, ring_offsets[:-1]) / num_points__per_ring)
+
+    return vals, avg_vals__per_ring, sigma__per_ring
+
+
+
+def _parse_stat(stat: str) -> float | None:
+    """
+    Validate a statistic name for `get_profile_stats`, and return its quantile in [0, 1] if it's the median/a percentile (otherwise None).
+    """
+    if stat in ('mean', 'std', 'var', 'min', 'max', 'count', 'count_nan'):
+        return None
+    q = _parse_percentile(stat)
+    if q is not None:
+        return q / 100
+    raise ValueError(f'Unknown statistic: "{stat}". Options are "mean", "std", "var", "min", "max", "count", "count_nan", "median", or a percentile like "p5" or "p97.5".')
+
+
+
+class _QuantileDigest:
+    """
+    Minimal merging t-digest (Dunning & Ertl, 2019) for streaming quantile estimates: a sorted list of weighted centroids, where new values are merged in batches and adjacent centroids are combined when their midpoints fall within the same unit of the "k1" scale function `k(q) = compression * (arcsin(2q - 1) / pi + 1/2)`.
+    """
+
+    def __init__(self, compression: int):
+        self.compression = compression
+        self.means   = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values: np.ndarray) -> None:
+        if values.size == 0:
+            return
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+        means = np.concatenate([self.means, values])
+        weights = np.concatenate([self.weights, np.ones(values.size)])
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+
+        ## group contiguous centroids by the integer part of the scale function at their midpoint -- a centroid spanning two or more units never shares a group with its neighbors, so merged centroids span at most three units (grouping by left edges instead lets centroids grow without bound over many small updates)
+        cum_weights = np.cumsum(weights)
+        q_mid = (cum_weights - weights / 2) / cum_weights[-1]
+        k = np.floor(self.compression * (np.arcsin(2 * q_mid - 1) / np.pi + 0.5))
+        starts = np.flatnonzero(np.diff(k, prepend=-1))
+
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+        return
+
+    def quantile(self, q: float) -> float:
+        if self.weights.size == 0:
+            return np.nan
+        if np.all(self.weights == 1):
+            return np.quantile(self.means, q)  ## every value is its own centroid, so this is exact
+
+        ## interpolate between centroid centers (by cumulative weight), anchored at the exact min/max
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        return np.interp(
+            q * total,
+            np.concatenate([[0], centers, [total]]),
+            np.concatenate([[self.min], self.means, [self.max]]),
+        )
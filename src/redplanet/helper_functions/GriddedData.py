@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from types import MappingProxyType
 from pprint import pformat
 from textwrap import dedent, indent
@@ -6,7 +6,11 @@ from textwrap import dedent, indent
 import numpy as np
 import xarray as xr
 
-from redplanet.helper_functions.misc import find_closest_indices
+from redplanet.helper_functions.misc import (
+    find_closest_indices,
+    find_closest_indices_regular,
+    get_regular_spacing,
+)
 from redplanet.helper_functions.coordinates import (
     _verify_coords,
     _plon2slon,
@@ -16,6 +20,10 @@ from redplanet.helper_functions.docstrings.main import substitute_docstrings
 
 
 
+_interp_methods: tuple[str] = ('nearest', 'bilinear', 'bicubic')
+
+
+
 
 
 @dataclass(frozen=True)
@@ -29,6 +37,13 @@ class GriddedData:
     lat       : np.ndarray
     data_dict : dict[str, np.ndarray]  ## datasets (2D numpy arrays) must be indexed by `[lat, lon]`, corresponding to the order in `self.lat` and `self.lon` respectively.
     metadata  : dict
+    nan_value : float | None = None  ## sentinel value for missing data in integer datasets which don't support `np.nan` (e.g. DEMs stored as int16). Only used when interpolating.
+    overviews : tuple['GriddedData', ...] = field(default=(), repr=False, compare=False)  ## optional block-averaged copies of the dataset at progressively coarser resolutions, ordered from finest to coarsest (see `redplanet.helper_functions.overviews`). Used by `get_values` to avoid reading the full-resolution data for coarse grids.
+
+    ## PRIVATE INSTANCE VARIABLES -- computed in `__post_init__`.
+    _lon_step : float | None = field(init=False, repr=False, compare=False, default=None)  ## spacing of the lon/lat axes if they're regularly spaced (all datasets built by the loaders are), otherwise None.
+    _lat_step : float | None = field(init=False, repr=False, compare=False, default=None)
+    _lon_wrap : tuple[int, float] | None = field(init=False, repr=False, compare=False, default=None)  ## if the lon axis covers the full globe: `(number of unique columns, columns per 360 degrees)`, otherwise None.
 
     @property
     def data_vars(self) -> list[str]:
@@ -49,6 +64,19 @@ class GriddedData:
         self.lon.flags.writeable = False
         self.lat.flags.writeable = False
 
+        ## detect regular spacing so nearest indices can be computed arithmetically rather than with a binary search
+        object.__setattr__(self, '_lon_step', get_regular_spacing(self.lon))
+        object.__setattr__(self, '_lat_step', get_regular_spacing(self.lat))
+
+        ## detect global longitude coverage so interpolation can wrap around the 0/360 (or ±180) seam
+        if self._lon_step is not None:
+            gap = (self.lon[0] + 360) - self.lon[-1]  ## distance between the last column and the first column shifted by one revolution
+            if abs(gap) <= 1e-6 * self._lon_step:
+                ## last column duplicates the first (e.g. `pyshtools` grids include both 0 and 360)
+                object.__setattr__(self, '_lon_wrap', (self.lon.size - 1, 360 / self._lon_step))
+            elif 0 < gap <= 2 * self._lon_step:
+                object.__setattr__(self, '_lon_wrap', (self.lon.size, 360 / self._lon_step))
+
         ## make dicts immutable
         object.__setattr__(self, 'data_dict', MappingProxyType(self.data_dict))
         object.__setattr__(self, 'metadata' , MappingProxyType(self.metadata))
@@ -119,13 +147,294 @@ class GriddedData:
 
 
 
+    def window(
+        self,
+        lon_range : tuple[float, float],
+        lat_range : tuple[float, float],
+        stride    : int = 1,
+    ) -> 'GriddedData':
+        """
+        Get a regional subset of the dataset as a new `GriddedData` object, without copying any data.
+
+        The data arrays of the returned object are views (basic slices) into the original arrays. For memory-mapped datasets (e.g. topography DEMs), this means nothing is read from disk until the values are actually used, and then only the pages covering the region are touched.
+
+        Parameters
+        ----------
+        lon_range : tuple[float, float]
+            Western and eastern longitude bounds of the region, each in range [-180, 360]. If the western bound is greater than the eastern bound (e.g. `(170, -170)` or `(350, 10)`), the region crosses the antimeridian/prime meridian and the two halves are stitched together. A range spanning 360 degrees (e.g. `(-180, 180)` or `(0, 360)`) selects all longitudes.
+        lat_range : tuple[float, float]
+            Southern and northern latitude bounds of the region, each in range [-90, 90].
+        stride : int, optional
+            Only keep every `stride`-th grid point along each axis, by default 1.
+
+        Returns
+        -------
+        GriddedData
+            Subset containing all grid points within the (inclusive) bounds.
+
+        Raises
+        ------
+        ValueError
+            - If `stride` is not a positive integer.
+            - If the region contains no grid points.
+            - If the region wraps around the globe such that its longitudes can't be expressed in increasing order in either the [-180, 180] or [0, 360] convention.
+
+        Notes
+        -----
+        If the region crosses the seam of the dataset's longitude axis (i.e. ±180 for datasets with longitudes in [-180, 180], or 0/360 for datasets with longitudes in [0, 360]), the two views are stitched together with `np.concatenate`, which copies only the data inside the window. The longitudes of the returned object then use the opposite convention so they remain increasing (e.g. a window `(170, -170)` of a [-180, 180] dataset will have longitudes in [170, 190]).
+        """
+
+        ## input validation
+        if (not isinstance(stride, (int, np.integer))) or (stride < 1):
+            raise ValueError(f'`stride` must be a positive integer, got {stride}.')
+
+        lon_w, lon_e = lon_range
+        lat_s, lat_n = lat_range
+        _verify_coords([lon_w, lon_e], [lat_s, lat_n])
+
+
+        ## latitudes
+        i_s = np.searchsorted(self.lat, lat_s, side='left')
+        i_n = np.searchsorted(self.lat, lat_n, side='right')
+        slice_lat = slice(i_s, i_n, stride)
+        lat = self.lat[slice_lat]
+
+
+        ## longitudes
+        num_cols = self.lon.size if self._lon_wrap is None else self._lon_wrap[0]  ## excludes a duplicated 0/360 column
+
+        if (lon_e - lon_w) >= 360:
+            slices_lon = [slice(0, num_cols, stride)]
+            lon = self.lon[slices_lon[0]]
+            is_slon = self.is_slon
+
+        else:
+            convert = _plon2slon if self.is_slon else _slon2plon
+            lon_w, lon_e = convert(np.array([lon_w, lon_e], dtype=np.float64))
+
+            i_w = np.searchsorted(self.lon, lon_w, side='left')
+            i_e = np.searchsorted(self.lon, lon_e, side='right')
+
+            if lon_w <= lon_e:
+                slices_lon = [slice(i_w, i_e, stride)]
+                lon = self.lon[slices_lon[0]]
+                is_slon = self.is_slon
+
+            else:
+                ## region crosses the seam -- take [i_w, end) and [0, i_e), keeping the stride continuous across the seam
+                len_1 = len(range(i_w, num_cols, stride))
+                start_2 = max(0, i_w + stride * len_1 - num_cols)
+                slices_lon = [slice(i_w, num_cols, stride), slice(start_2, i_e, stride)]
+                lon_1 = self.lon[slices_lon[0]]
+                lon_2 = self.lon[slices_lon[1]]
+
+                ## switch longitude convention so the stitched longitudes are increasing
+                if self.is_slon:
+                    lon = np.concatenate([lon_1, lon_2 + 360])
+                    is_slon = False
+                else:
+                    lon = np.concatenate([lon_1 - 360, lon_2])
+                    is_slon = True
+
+                if (lon.size > 0) and ( (lon[0] < -180) or (lon[-1] > 360) or (is_slon and lon[-1] > 180) or ((not is_slon) and lon[0] < 0) ):
+                    raise ValueError(f'The longitude range {lon_range} wraps around both the 0 and 180 meridians, so its longitudes cannot be expressed in increasing order. Split it into two windows instead.')
+
+        if (lat.size == 0) or (lon.size == 0):
+            raise ValueError(f'No grid points found within the given bounds: {lon_range=}, {lat_range=}.')
+
+
+        ## overviews -- keep the levels which still have grid points inside the window (stride only applies to the full resolution data)
+        overviews = []
+        for overview in self.overviews:
+            try:
+                overviews.append(overview.window(lon_range, lat_range))
+            except ValueError:
+                break
+
+
+        ## data
+        data_dict = {}
+        for key, array in self.data_dict.items():
+            if len(slices_lon) == 1:
+                data_dict[key] = array[slice_lat, slices_lon[0]]
+            else:
+                data_dict[key] = np.concatenate(
+                    [array[slice_lat, slice_lon] for slice_lon in slices_lon],
+                    axis = 1,
+                )
+
+        return GriddedData(
+            lon       = lon,
+            is_slon   = is_slon,
+            lat       = lat,
+            data_dict = data_dict,
+            metadata  = dict(self.metadata),
+            nan_value = self.nan_value,
+            overviews = tuple(overviews),
+        )
+
+
+
+    @staticmethod
+    def _find_closest_indices(
+        axis   : np.ndarray,
+        step   : float | None,
+        values : np.ndarray,
+    ) -> np.ndarray:
+        """
+        Find the index of the closest `axis` element for each value -- O(1) arithmetic for regularly spaced axes, otherwise fall back to a binary search.
+        """
+        if step is None:
+            return find_closest_indices(axis, values)
+        return find_closest_indices_regular(axis[0], step, axis.size, values)
+
+
+
+    @staticmethod
+    def _get_stencil(
+        axis   : np.ndarray,
+        step   : float | None,
+        wrap   : tuple[int, float] | None,
+        values : np.ndarray,
+        interp : str,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the indices and interpolation weights of the neighboring grid points along one axis.
+
+        Returns two arrays with shape `(*values.shape, n)`, where `n` is 2 for 'bilinear' or 4 for 'bicubic'. If `wrap` is given (see `self._lon_wrap`), indices wrap around the globe; otherwise positions are clamped to the axis range (i.e. edge values are extended).
+        """
+
+        ## fractional index position of each value along the axis
+        if step is not None:
+            pos = np.subtract(values, axis[0], dtype=np.float64)
+            pos /= step
+        else:
+            i = np.searchsorted(axis, values, side='right') - 1
+            i = np.clip(i, 0, axis.size - 2)
+            pos = i + (values - axis[i]) / (axis[i+1] - axis[i])
+
+        if wrap is not None:
+            num_cols, cols_per_rev = wrap
+            pos %= cols_per_rev
+            ## the seam between the last column and the first column (shifted by one revolution) might not be exactly one step wide (e.g. 'DEM_200m'), so stretch/squeeze that interval to a width of one index
+            seam = pos > (num_cols - 1)
+            if seam.any():
+                pos[seam] = (num_cols - 1) + (pos[seam] - (num_cols - 1)) / (cols_per_rev - (num_cols - 1))
+        else:
+            np.clip(pos, 0, axis.size - 1, out=pos)
+
+        base = np.floor(pos)
+        frac = pos - base
+        base = base.astype(np.intp)
+
+        if interp == 'bilinear':
+            offsets = (0, 1)
+            weights = (1 - frac, frac)
+        else:
+            ## cubic convolution kernel with a = -0.5 (i.e. Catmull-Rom spline), see Keys (1981) "Cubic convolution interpolation for digital image processing"
+            frac2 = frac * frac
+            frac3 = frac2 * frac
+            offsets = (-1, 0, 1, 2)
+            weights = (
+                -0.5*frac3 +     frac2 - 0.5*frac,
+                 1.5*frac3 - 2.5*frac2 + 1,
+                -1.5*frac3 + 2.0*frac2 + 0.5*frac,
+                 0.5*frac3 - 0.5*frac2,
+            )
+
+        idx = np.stack([base + offset for offset in offsets], axis=-1)
+        if wrap is not None:
+            idx %= wrap[0]
+        else:
+            np.clip(idx, 0, axis.size - 1, out=idx)
+
+        return idx, np.stack(weights, axis=-1)
+
+
+
+    def _interpolate(
+        self,
+        dat_full  : np.ndarray,
+        lon       : np.ndarray,
+        lat       : np.ndarray,
+        pointwise : bool,
+        interp    : str,
+    ) -> np.ndarray:
+        """
+        Interpolate `dat_full` at the given coordinates as a weighted sum of vectorized gathers over the neighboring grid points (4 for 'bilinear', 16 for 'bicubic'). Only the required elements are read, so this works directly on `np.memmap` arrays without loading them into memory.
+        """
+        idx_lon, w_lon = self._get_stencil(self.lon, self._lon_step, self._lon_wrap, lon, interp)
+        idx_lat, w_lat = self._get_stencil(self.lat, self._lat_step, None          , lat, interp)
+
+        n = w_lon.shape[-1]
+        if pointwise:
+            dat = np.zeros(lon.shape, dtype=np.float64)
+        else:
+            dat = np.zeros((lat.size, lon.size), dtype=np.float64)
+
+        for i in range(n):
+            for j in range(n):
+                if pointwise:
+                    weights = w_lat[..., i] * w_lon[..., j]
+                    values  = dat_full[idx_lat[..., i], idx_lon[..., j]]
+                else:
+                    weights = np.outer(w_lat[:, i], w_lon[:, j])
+                    values  = dat_full[np.ix_(idx_lat[:, i], idx_lon[:, j])]
+
+                values = np.asarray(values, dtype=np.float64)  ## fancy indexing already returns a copy, so in-place modification is safe
+                if self.nan_value is not None:
+                    values[values == self.nan_value] = np.nan
+
+                ## neighbors with zero weight (e.g. a query exactly on a grid point) shouldn't propagate NaNs
+                values *= weights
+                values[weights == 0] = 0
+                dat += values
+
+        return dat
+
+
+
+    def _select_overview(
+        self,
+        lon : float | np.ndarray,
+        lat : float | np.ndarray,
+    ) -> 'GriddedData':
+        """
+        Get the coarsest overview level whose grid spacing is still at least as fine as the spacing of the requested grid, or `self` if there is no such level.
+
+        The spacing of the requested grid is the smallest gap between distinct coordinates along each axis. Axes with a single coordinate don't constrain the choice, and if neither axis has multiple coordinates the full resolution data is used.
+        """
+        spacings = []
+        for values in (lon, lat):
+            values = np.unique(values)
+            if values.size > 1:
+                spacings.append(np.diff(values).min())
+            else:
+                spacings.append(np.inf)
+
+        if np.all(np.isinf(spacings)):
+            return self
+
+        selected = self
+        for overview in self.overviews:
+            steps = (overview._lon_step, overview._lat_step)
+            if (None in steps) or (steps[0] > spacings[0]) or (steps[1] > spacings[1]):
+                break
+            selected = overview
+        return selected
+
+
+
     @substitute_docstrings
     def get_values(
         self,
         lon                 : float | np.ndarray,
         lat                 : float | np.ndarray,
         var                 : str,
-        as_xarray           : bool = False
+        as_xarray           : bool = False,
+        pointwise           : bool = False,
+        interp              : str  = 'nearest',
+        use_overviews       : bool = True,
     ) -> float | np.ndarray | xr.DataArray:
         """
         Get specified dataset values at the specified coordinates.
@@ -137,6 +446,10 @@ class GriddedData:
         var : str
             The name of the data variable to extract (i.e. one value from `self.data_vars`).
         {param.as_xarray}
+        {param.pointwise}
+        {param.interp}
+        use_overviews : bool, optional
+            If True (default) and the dataset has overviews (i.e. coarser block-averaged copies, currently only built for the topography DEMs), then in grid mode (`pointwise=False`) the values are read from the coarsest overview whose resolution is still at least as fine as the spacing of the requested grid. This avoids touching the full resolution data when requesting coarse/global grids. Set to False to always read the full resolution data.
 
         Returns
         -------
@@ -145,11 +458,13 @@ class GriddedData:
         Raises
         ------
         ValueError
-            If `var` is not one of the available data variables in the dataset (i.e. one value from `self.data_vars`).
+            - If `var` is not one of the available data variables in the dataset (i.e. one value from `self.data_vars`).
+            - If `pointwise` is True and the shapes of `lon` and `lat` are not compatible.
+            - If `interp` is not one of the available interpolation methods.
 
         Notes
         -----
-        This indexing/accessing approach is a full order of magnitude (sometimes more) faster than accessing an xarray DataArray/Dataset when it comes to random point-like accesses (namely the coordinates in concentric rings when doing radial cross-sectioning averages).
+        This indexing/accessing approach is a full order of magnitude (sometimes more) faster than accessing an xarray DataArray/Dataset when it comes to random point-like accesses (namely the coordinates in concentric rings when doing radial cross-sectioning averages). For regularly spaced axes (which includes every dataset in RedPlanet), the nearest indices are computed arithmetically in constant time per point; irregular axes fall back to a binary search.
 
         `GriddedDataset` is used in the following modules: `Crust.boug`, `Crust.moho`, `Crust.topo`, `GRS`, `Mag.sh`.
         """
@@ -158,37 +473,109 @@ class GriddedData:
         if var not in self.data_vars:
             raise ValueError(f'Unknown data variable: "{var}".\nOptions are: {", ".join(self.data_vars)}.')
 
+        if interp not in _interp_methods:
+            raise ValueError(f'Unknown interpolation method: "{interp}".\nOptions are: {", ".join(_interp_methods)}.')
+
         _verify_coords(lon, lat)
+        is_scalar = (np.ndim(lon) == 0) and (np.ndim(lat) == 0)
 
-        if self.is_slon:
-            lon = _plon2slon(lon)
-        else:
-            lon = _slon2plon(lon)
+        if use_overviews and self.overviews and (not pointwise):
+            overview = self._select_overview(lon, lat)
+            if overview is not self:
+                return overview.get_values(lon, lat, var, as_xarray=as_xarray, interp=interp, use_overviews=False)
 
-        lon = np.atleast_1d(lon)
-        lat = np.atleast_1d(lat)
+        lon, lat = _prepare_coords(lon, lat, self.is_slon, pointwise)
 
 
         ## get data
-        idx_lon = find_closest_indices(self.lon, lon)
-        idx_lat = find_closest_indices(self.lat, lat)
-
         dat_full = self.data_dict[var]
-        dat = dat_full[np.ix_(idx_lat, idx_lon)]
-
-        dat = np.squeeze(dat)  ## remove singleton dimensions
-        if dat.ndim == 0: dat = dat.item()
 
+        if interp != 'nearest':
+            dat = self._interpolate(dat_full, lon, lat, pointwise, interp)
 
-        if as_xarray:
-            dat = xr.DataArray(
-                data = dat,
-                dims = ['lat', 'lon'],
-                coords = {
-                    'lat': lat,
-                    'lon': lon,
-                },
-                attrs = dict(self.metadata),
-            )
-
-        return dat
+        else:
+            idx_lon = self._find_closest_indices(self.lon, self._lon_step, lon)
+            idx_lat = self._find_closest_indices(self.lat, self._lat_step, lat)
+
+            if pointwise:
+                dat = dat_full[idx_lat, idx_lon]  ## single fancy-index gather, one value per (lon, lat) pair
+            else:
+                dat = dat_full[np.ix_(idx_lat, idx_lon)]
+
+
+        return _format_values(dat, lon, lat, as_xarray, pointwise, dict(self.metadata), is_scalar)
+
+
+
+
+
+def _prepare_coords(
+    lon       : float | np.ndarray,
+    lat       : float | np.ndarray,
+    is_slon   : bool,
+    pointwise : bool,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Convert (already verified) query coordinates to the longitude convention of a dataset, as arrays with at least one dimension. If `pointwise` is True, `lon` and `lat` are broadcast against each other.
+    """
+    if is_slon:
+        lon = _plon2slon(lon)
+    else:
+        lon = _slon2plon(lon)
+
+    lon = np.atleast_1d(lon)
+    lat = np.atleast_1d(lat)
+
+    if pointwise:
+        try:
+            lon, lat = np.broadcast_arrays(lon, lat)
+        except ValueError:
+            raise ValueError(f'When `pointwise=True`, `lon` and `lat` must have the same shape (or one must be a scalar). Got shapes {lon.shape} and {lat.shape}.')
+
+    return lon, lat
+
+
+
+def _format_values(
+    dat       : np.ndarray,
+    lon       : np.ndarray,
+    lat       : np.ndarray,
+    as_xarray : bool,
+    pointwise : bool,
+    attrs     : dict,
+    is_scalar : bool = False,
+) -> float | np.ndarray | xr.DataArray:
+    """
+    Convert values computed at coordinates from `_prepare_coords` to the return type described in `GriddedData.get_values`. In pointwise mode, values keep the (broadcast) shape of the inputs, and a float is only returned if both of the original inputs were scalars (`is_scalar`).
+    """
+    if as_xarray and pointwise:
+        return xr.DataArray(
+            data = dat.ravel(),
+            dims = ['point'],
+            coords = {
+                'lon': ('point', lon.ravel()),
+                'lat': ('point', lat.ravel()),
+            },
+            attrs = attrs,
+        )
+
+    if pointwise:
+        dat = np.asarray(dat).reshape(lon.shape)
+        return dat.item() if is_scalar else dat
+
+    dat = np.squeeze(dat)  ## remove singleton dimensions
+    if dat.ndim == 0: dat = dat.item()
+
+
+    if as_xarray:
+        dat = xr.DataArray(
+            data = dat,
+            dims = ['lat', 'lon'],
+            coords = {
+                'lat': lat,
+                'lon': lon,
+            },
+            attrs = attrs,
+        )
+
+    return dat
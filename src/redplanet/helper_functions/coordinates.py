@@ -117,3 +117,32 @@ def _slon2plon(
         return convert(slon)
     else:
         return convert(np.array(slon)).tolist()
+
+
+
+def _lonlat2xyz(
+    lon: float | np.ndarray,
+    lat: float | np.ndarray,
+) -> np.ndarray:
+    """
+    Convert longitude/latitude (in degrees) to unit vectors in Cartesian coordinates, e.g. for spatial indexing or great-circle computations.
+
+    Parameters
+    ----------
+    lon : float | np.ndarray
+        Longitude value(s) in degrees (any range).
+    lat : float | np.ndarray
+        Latitude value(s) in degrees, with the same shape as `lon` (or broadcastable to it).
+
+    Returns
+    -------
+    np.ndarray
+        Array with shape `(*shape, 3)` containing the x, y, z components, where the x-axis points to (0E, 0N) and the z-axis to the north pole.
+    """
+    lon = np.radians(lon)
+    lat = np.radians(lat)
+    cos_lat = np.cos(lat)
+    return np.stack(
+        np.broadcast_arrays(cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)),
+        axis = -1,
+    )
@@ -9,6 +9,34 @@ _dict_fragments = {
         lat : float | np.ndarray
             Latitude coordinate(s) in range [-90, 90].
         ''',
+    'param.pointwise':
+        '''
+        pointwise : bool, optional
+            If True, treat `lon` and `lat` as paired coordinates (i.e. the i-th longitude goes with the i-th latitude) and return one value per pair, rather than a grid of all combinations. The inputs must have the same shape, or one of them can be a scalar. This is the efficient way to sample scattered points (e.g. spacecraft ground tracks, crater centers, random Monte Carlo points). Default is False.
+        ''',
+    'param.interp':
+        '''
+        interp : str, optional
+            Method used to compute values between grid points. Options are:
+
+            - `'nearest'` (default): value of the closest grid point.
+            - `'bilinear'`: linear interpolation between the 2x2 surrounding grid points.
+            - `'bicubic'`: cubic convolution (Catmull-Rom spline) over the 4x4 surrounding grid points.
+
+            Longitudes wrap around the 0/360 (or ±180) seam for global datasets. If any of the surrounding grid points are missing data, the interpolated value is NaN.
+        ''',
+    'param.interp_sh':
+        '''
+        interp : str, optional
+            Method used to compute values. Options are:
+
+            - `'nearest'` (default): value of the closest grid point.
+            - `'bilinear'`: linear interpolation between the 2x2 surrounding grid points.
+            - `'bicubic'`: cubic convolution (Catmull-Rom spline) over the 4x4 surrounding grid points.
+            - `'sh_exact'`: evaluate the spherical harmonic coefficients exactly at each coordinate, rather than looking up the pre-expanded grid (~0.5 degree spacing). This is slower for large grids, but exact and efficient for scattered points (Legendre functions are computed once per unique latitude).
+
+            Longitudes wrap around the 0/360 seam.
+        ''',
     'param.as_xarray':
         '''
         as_xarray : bool, optional
@@ -22,6 +50,7 @@ _dict_fragments = {
             - float: if both `lon` and `lat` are floats.
             - numpy.ndarray (1D): if one of `lon` or `lat` is a numpy 1D array and the other is a float.
             - numpy.ndarray (2D): if both `lon` and `lat` are numpy 1D arrays. The first dimension of output array corresponds to `lat` values.
+            - numpy.ndarray (same shape as the inputs): if `pointwise` is True, with one value per (`lon`, `lat`) pair.
             - xarray.DataArray: see `as_xarray` parameter (this takes precedence over the above types).
         ''',
     'fulldoc.get_dataset_GriddedData':
@@ -1,5 +1,4 @@
 import numpy as np
-import cartopy.geodesic as cg
 
 
 '''
@@ -18,23 +17,26 @@ Mars reference ellipsoid (Oblate ellipsoid), 2009
 '''
 _semimajor_m = 3395428
 _flattening = 0.005227617843759314
+_mean_radius_m = _semimajor_m * (1 - _flattening / 3)  ## mean radius of the ellipsoid, (2a + b) / 3 -- used for spherical approximations
 
 
 
 
 
-'''
-TODO: implement this myself at some point since I'm not using cartopy for anything else
-    (for now we're just directly calling cartopy, but I wanted to put it in a module right away so it's easier to change later)
-
-https://scitools.org.uk/cartopy/docs/latest/reference/generated/cartopy.geodesic.Geodesic.html
-'''
+_methods: tuple[str] = ('vincenty', 'haversine')
+_chunk_size: int = 2**16  ## number of point pairs processed at a time, which bounds the memory of temporary arrays
+_tolerance: float = 1e-12  ## convergence tolerance for Vincenty's iterations (radians, ~3 nm on Mars)
+_max_iterations: int = 200
 
-__mars_geodesic: cg.Geodesic = None
+__mars_geodesic = None
 
-def __get_mars_geodesic() -> cg.Geodesic:
+def __get_mars_geodesic():
+    """
+    Cartopy is only used as a fallback for the rare (nearly antipodal) pairs where Vincenty's inverse method doesn't converge, so we import it lazily (it's slow to import).
+    """
     global __mars_geodesic
     if __mars_geodesic is None:
+        import cartopy.geodesic as cg
         __mars_geodesic = cg.Geodesic(
             radius     = _semimajor_m,
             flattening = _flattening,
@@ -44,8 +46,9 @@ def __get_mars_geodesic() -> cg.Geodesic:
 
 
 def get_distance(
-    start : list | np.ndarray,
-    end   : list | np.ndarray,
+    start  : list | np.ndarray,
+    end    : list | np.ndarray,
+    method : str = 'vincenty',
 ) -> np.ndarray:
     """
     Calculate the geodesic distance between two points on the surface of Mars.
@@ -56,15 +59,22 @@ def get_distance(
         Array of shape (2) or (n_points, 2) containing the longitude and latitude coordinates of the starting point(s).
     end : list | np.ndarray
         Similar to `start`, but for the ending point(s).
+    method : str, optional
+        Options are:
+
+        - `'vincenty'` (default): geodesics on the Mars reference ellipsoid (see notes), accurate to well under a millimeter.
+        - `'haversine'`: great circles on a sphere with the mean radius of Mars (3389.5 km). This is several times faster, with errors up to ~1% of the distance.
 
     Returns
     -------
     np.ndarray
-        Array of shape (n_points) [? verify this] containing the geodesic distances between the corresponding starting and ending point(s).
+        Array of shape (n_points, 3) where the columns are the geodesic distances in meters, the forward azimuths at the starting point(s), and the forward azimuths at the ending point(s). Azimuths are in degrees, where 0 is north and 90 is east.
 
-    See Also
-    --------
-    [cartopy.geodesic.Geodesic.circle](https://scitools.org.uk/cartopy/docs/latest/reference/generated/cartopy.geodesic.Geodesic.html)
+    Raises
+    ------
+    ValueError
+        - If `start` and `end` don't have shape (2) or (n_points, 2), or their number of points differ (one of them can be a single point).
+        - If `method` is not recognized.
 
     Notes
     -----
@@ -82,17 +92,32 @@ def get_distance(
         - (Found it here:)
             - https://www.fatiando.org/boule/latest/ellipsoids.html
 
-    For geodesic calculations, we use [cartopy.geodesic.Geodesic.circle](https://scitools.org.uk/cartopy/docs/latest/reference/generated/cartopy.geodesic.Geodesic.html).
+    Ellipsoidal calculations use Vincenty's formulae, vectorized with NumPy over all point pairs:
+
+    - Vincenty, T. (1975). Direct and Inverse Solutions of Geodesics on the Ellipsoid with Application of Nested Equations. Survey Review, 23(176), 88-93.
+    - https://doi.org/10.1179/sre.1975.23.176.88
+
+    The inverse method doesn't converge for nearly antipodal points, so those pairs are computed with [cartopy.geodesic.Geodesic](https://scitools.org.uk/cartopy/docs/latest/reference/generated/cartopy.geodesic.Geodesic.html) instead (Karney's algorithm).
     """
-    geodesic = __get_mars_geodesic()
-    return geodesic.inverse(start, end)
+    _verify_method(method)
+    start, end = _broadcast_points(start, end)
+
+    result = np.empty((start.shape[0], 3))
+    for i0 in range(0, start.shape[0], _chunk_size):
+        i1 = min(start.shape[0], i0 + _chunk_size)
+        if method == 'haversine':
+            result[i0:i1] = _inverse_sphere(start[i0:i1], end[i0:i1])
+        else:
+            result[i0:i1] = _inverse_vincenty(start[i0:i1], end[i0:i1])
+    return result
 
 
 
 def move_forward(
     start    : list | np.ndarray,
     azimuth  : float | list | np.ndarray,
-    distance : float,
+    distance : float | list | np.ndarray,
+    method   : str = 'vincenty',
 ) -> np.ndarray:
     """
     Calculate the coordinates of a point on the surface of Mars after moving a certain geodesic distance along a given angle.
@@ -100,23 +125,49 @@ def move_forward(
     Parameters
     ----------
     start : list | np.ndarray
-        Array of shape (2) containing the longitude and latitude coordinates of the starting point.
+        Array of shape (2) or (n_points, 2) containing the longitude and latitude coordinates of the starting point(s).
     azimuth : float | list | np.ndarray
         Array of shape (n_points) containing the azimuth angle(s) to "move forward" in degrees, where 0 is north and 90 is east.
-    distance : float
-        The geodesic distance to move forward in meters.
+    distance : float | list | np.ndarray
+        The geodesic distance(s) to move forward in meters, with shape (n_points) or a scalar.
+    method : str, optional
+        Either `'vincenty'` (default, ellipsoidal) or `'haversine'` (spherical), see `redplanet.helper_functions.geodesy.get_distance`.
 
     Returns
     -------
     np.ndarray
-        Array of shape (2) or (n_points, 2) [? verify this] containing the longitude and latitude coordinates of the point(s) after moving forward.
+        Array of shape (n_points, 2) containing the longitude and latitude coordinates of the point(s) after moving forward, where longitudes are in range [-180, 180).
+
+    Raises
+    ------
+    ValueError
+        - If the number of points in `start`, `azimuth`, and `distance` differ (any of them can be a single value).
+        - If `method` is not recognized.
 
     See Also
     --------
     For more details about the reference ellipsoid and geodesic calculations, see `redplanet.helper_functions.geodesy.get_distance`.
     """
-    geodesic = __get_mars_geodesic()
-    return geodesic.direct(start, azimuth, distance)[:,:2]
+    _verify_method(method)
+    start = _as_points(start)
+    azimuth = np.atleast_1d(np.asarray(azimuth, dtype=np.float64)).ravel()
+    distance = np.atleast_1d(np.asarray(distance, dtype=np.float64)).ravel()
+
+    num_points = max(start.shape[0], azimuth.size, distance.size)
+    if any(size not in (1, num_points) for size in (start.shape[0], azimuth.size, distance.size)):
+        raise ValueError(f'Inputs must have the same number of points (or a single value). Got {start.shape[0]} starting points, {azimuth.size} azimuths, and {distance.size} distances.')
+    start = np.broadcast_to(start, (num_points, 2))
+    azimuth = np.broadcast_to(azimuth, (num_points,))
+    distance = np.broadcast_to(distance, (num_points,))
+
+    result = np.empty((num_points, 2))
+    for i0 in range(0, num_points, _chunk_size):
+        i1 = min(num_points, i0 + _chunk_size)
+        if method == 'haversine':
+            result[i0:i1] = _direct_sphere(start[i0:i1], azimuth[i0:i1], distance[i0:i1])
+        else:
+            result[i0:i1] = _direct_vincenty(start[i0:i1], azimuth[i0:i1], distance[i0:i1])
+    return result
 
 
 
@@ -126,6 +177,7 @@ def make_circle(
     radius    : float,  ## TODO: should this be suffixed with '_m' or '_km' to indicate units...?
     n_samples : int  = 180,
     endpoint  : bool = False,
+    method    : str  = 'vincenty',
 ) -> np.ndarray:
     """
     Generate a geodesic circle of points on the surface of Mars.
@@ -138,17 +190,296 @@ def make_circle(
         Latitude coordinate of the center of the circle, in range [-90, 90].
     radius : float
         Radius of the circle in meters.
+    n_samples : int, optional
+        Number of points on the circle. Default is 180.
     endpoint : bool, optional
         If True, include the starting point at the end of the circle. Default is False.
+    method : str, optional
+        Either `'vincenty'` (default, ellipsoidal) or `'haversine'` (spherical), see `redplanet.helper_functions.geodesy.get_distance`.
 
     Returns
     -------
     np.ndarray
-        Array of shape (n_samples, 2) [? verify this] containing the longitude and latitude coordinates of the circle points.
+        Array of shape (n_samples, 2) containing the longitude and latitude coordinates of the circle points, where longitudes are in range [-180, 180). Points go clockwise (decreasing azimuth) starting from due north, like `cartopy.geodesic.Geodesic.circle`.
 
     See Also
     --------
     For more details about the reference ellipsoid, see `redplanet.helper_functions.geodesy.get_distance`.
     """
-    geodesic = __get_mars_geodesic()
-    return geodesic.circle(lon, lat, radius, n_samples, endpoint)
+    azimuths = np.linspace(360., 0., n_samples, endpoint=endpoint)
+    return move_forward([lon, lat], azimuths, radius, method=method)
+
+
+
+
+
+def _verify_method(method: str) -> None:
+    if method not in _methods:
+        raise ValueError(f'Unknown method: "{method}". Options are: {", ".join(_methods)}.')
+    return
+
+
+def _as_points(points: list | np.ndarray) -> np.ndarray:
+    points = np.asarray(points, dtype=np.float64)
+    if (points.ndim > 2) or (points.shape[-1] != 2):
+        raise ValueError(f'Expecting points with shape (2) or (n_points, 2), got {points.shape}.')
+    return points.reshape(-1, 2)
+
+
+def _broadcast_points(
+    start : list | np.ndarray,
+    end   : list | np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    start = _as_points(start)
+    end = _as_points(end)
+    num_points = max(start.shape[0], end.shape[0])
+    if any(size not in (1, num_points) for size in (start.shape[0], end.shape[0])):
+        raise ValueError(f'`start` and `end` must have the same number of points (or a single point). Got {start.shape[0]} and {end.shape[0]}.')
+    return np.broadcast_to(start, (num_points, 2)), np.broadcast_to(end, (num_points, 2))
+
+
+def _wrap_lon(lon: np.ndarray) -> np.ndarray:
+    return (lon + 180) % 360 - 180
+
+
+
+def _inverse_sphere(
+    start : np.ndarray,
+    end   : np.ndarray,
+) -> np.ndarray:
+    """
+    Haversine distance and forward azimuths on a sphere with the mean radius of Mars.
+    """
+    lat1 = np.radians(start[:, 1])
+    lat2 = np.radians(end[:, 1])
+    dlon = np.radians(end[:, 0] - start[:, 0])
+
+    sin_lat1, cos_lat1 = np.sin(lat1), np.cos(lat1)
+    sin_lat2, cos_lat2 = np.sin(lat2), np.cos(lat2)
+    sin_dlon, cos_dlon = np.sin(dlon), np.cos(dlon)
+
+    hav = np.sin((lat2 - lat1) / 2)**2 + cos_lat1 * cos_lat2 * np.sin(dlon / 2)**2
+    dist = 2 * _mean_radius_m * np.arcsin(np.sqrt(np.clip(hav, 0, 1)))
+
+    az1 = np.arctan2(sin_dlon * cos_lat2, cos_lat1 * sin_lat2 - sin_lat1 * cos_lat2 * cos_dlon)
+    az2 = np.arctan2(sin_dlon * cos_lat1, cos_lat1 * sin_lat2 * cos_dlon - sin_lat1 * cos_lat2)
+
+    return np.column_stack([dist, np.degrees(az1), np.degrees(az2)])
+
+
+
+def _direct_sphere(
+    start    : np.ndarray,
+    azimuth  : np.ndarray,
+    distance : np.ndarray,
+) -> np.ndarray:
+    """
+    Destination point along a great circle on a sphere with the mean radius of Mars.
+    """
+    lat1 = np.radians(start[:, 1])
+    az = np.radians(azimuth)
+    delta = distance / _mean_radius_m
+
+    sin_lat1, cos_lat1 = np.sin(lat1), np.cos(lat1)
+    sin_delta, cos_delta = np.sin(delta), np.cos(delta)
+
+    sin_lat2 = np.clip(sin_lat1 * cos_delta + cos_lat1 * sin_delta * np.cos(az), -1, 1)
+    lat2 = np.arcsin(sin_lat2)
+    dlon = np.arctan2(np.sin(az) * sin_delta * cos_lat1, cos_delta - sin_lat1 * sin_lat2)
+
+    return np.column_stack([_wrap_lon(start[:, 0] + np.degrees(dlon)), np.degrees(lat2)])
+
+
+
+def _vincenty_series(
+    cos2_alpha : np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Coefficients A and B of Vincenty's series for the length of a geodesic, and C for its longitude, which only depend on the azimuth of the geodesic at the equator.
+    """
+    f = _flattening
+    b = _semimajor_m * (1 - f)
+    u2 = cos2_alpha * (_semimajor_m**2 - b**2) / b**2
+    A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+    return A, B, C
+
+
+def _vincenty_delta_sigma(
+    B          : np.ndarray,
+    sin_sigma  : np.ndarray,
+    cos_sigma  : np.ndarray,
+    cos_2sigma : np.ndarray,
+) -> np.ndarray:
+    return B * sin_sigma * (
+        cos_2sigma + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma**2)
+            - B / 6 * cos_2sigma * (-3 + 4 * sin_sigma**2) * (-3 + 4 * cos_2sigma**2)
+        )
+    )
+
+
+
+def _reduced_latitude(
+    lat : np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Sine and cosine of the reduced latitude, `tan(U) = (1 - f) * tan(lat)`, without evaluating any inverse trigonometric functions.
+    """
+    lat = np.radians(lat)
+    sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+    sin_lat *= 1 - _flattening
+    norm = np.sqrt(sin_lat * sin_lat + cos_lat * cos_lat)
+    return sin_lat / norm, cos_lat / norm
+
+
+def _sincos_offset(
+    sin_x : np.ndarray,
+    cos_x : np.ndarray,
+    d     : np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Sine and cosine of `x + d` for small offsets `d`, given those of `x`. Taylor series for the sine and cosine of `d` are accurate to machine precision for `|d| < 0.02`, which avoids evaluating `np.sin` and `np.cos` (by far the most expensive operations in Vincenty's iterations).
+    """
+    d2 = d * d
+    sin_d = d * (1 - d2 / 6 * (1 - d2 / 20))
+    cos_d = 1 - d2 / 2 * (1 - d2 / 12 * (1 - d2 / 30))
+    return sin_x * cos_d + cos_x * sin_d, cos_x * cos_d - sin_x * sin_d
+
+
+
+def _inverse_vincenty(
+    start : np.ndarray,
+    end   : np.ndarray,
+) -> np.ndarray:
+    """
+    Vincenty's inverse method, iterating only on the pairs which haven't converged yet. Pairs which don't converge (nearly antipodal points) are computed with cartopy.
+
+    The longitude on the auxiliary sphere only differs from the longitude difference `L` by at most `f * pi` (~0.017 rad), so its sine and cosine are computed from those of `L` with `_sincos_offset`.
+    """
+    f = _flattening
+    b = _semimajor_m * (1 - f)
+
+    sin_U1, cos_U1 = _reduced_latitude(start[:, 1])
+    sin_U2, cos_U2 = _reduced_latitude(end[:, 1])
+
+    L = np.radians(_wrap_lon(end[:, 0] - start[:, 0]))
+    sin_L, cos_L = np.sin(L), np.cos(L)
+
+    n = start.shape[0]
+    sin_lam    = np.empty(n)
+    cos_lam    = np.empty(n)
+    sin_sigma  = np.empty(n)
+    cos_sigma  = np.empty(n)
+    sigma      = np.empty(n)
+    cos2_alpha = np.empty(n)
+    cos_2sigma = np.empty(n)
+
+    ## state of the pairs which haven't converged yet is kept in compacted arrays, and results are written out as pairs converge. Compacting is only worth it once at least half of the remaining pairs have converged -- until then, converged pairs keep iterating (which only refines them)
+    todo = np.arange(n)
+    d_t = np.zeros(n)  ## lambda - L
+    sin_L_t, cos_L_t = sin_L, cos_L
+    sl, cl = sin_L, cos_L
+    cu2 = cos_U2
+    cu1_su2 = cos_U1 * sin_U2
+    su1_cu2 = sin_U1 * cos_U2
+    su1_su2 = sin_U1 * sin_U2
+    cu1_cu2 = cos_U1 * cos_U2
+
+    for _ in range(_max_iterations):
+        y = cu2 * sl
+        x = cu1_su2 - su1_cu2 * cl
+        ss = np.sqrt(y * y + x * x)
+        cs = su1_su2 + cu1_cu2 * cl
+        sg = np.arctan2(ss, cs)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sin_alpha = np.where(ss == 0, 0, cu1_cu2 * sl / ss)  ## coincident points
+            c2a = 1 - sin_alpha**2
+            c2s = np.where(c2a == 0, 0, cs - 2 * su1_su2 / c2a)  ## equatorial geodesics
+
+        C = f / 16 * c2a * (4 + f * (4 - 3 * c2a))  ## same as `_vincenty_series`
+        d_new = (1 - C) * f * sin_alpha * (sg + C * ss * (c2s + C * cs * (-1 + 2 * c2s**2)))
+        sl, cl = _sincos_offset(sin_L_t, cos_L_t, d_new)
+
+        converged = np.abs(d_new - d_t) <= _tolerance
+        num_converged = np.count_nonzero(converged)
+        if num_converged == todo.size:
+            sin_lam[todo], cos_lam[todo], sin_sigma[todo], cos_sigma[todo], sigma[todo], cos2_alpha[todo], cos_2sigma[todo] = sl, cl, ss, cs, sg, c2a, c2s
+            todo = todo[:0]
+            break
+        if 2 * num_converged < todo.size:
+            d_t = d_new
+            continue
+
+        done = todo[converged]
+        sin_lam[done], cos_lam[done], sin_sigma[done], cos_sigma[done], sigma[done], cos2_alpha[done], cos_2sigma[done] = (
+            sl[converged], cl[converged], ss[converged], cs[converged], sg[converged], c2a[converged], c2s[converged]
+        )
+        keep = ~converged
+        todo = todo[keep]
+        d_t, sl, cl, sin_L_t, cos_L_t, cu2, cu1_su2, su1_cu2, su1_su2, cu1_cu2 = (
+            d_new[keep], sl[keep], cl[keep], sin_L_t[keep], cos_L_t[keep], cu2[keep], cu1_su2[keep], su1_cu2[keep], su1_su2[keep], cu1_cu2[keep]
+        )
+    else:
+        ## pairs which didn't converge (possibly along with a few which just did) are overwritten by the fallback below, but keep the arrays finite in the meantime
+        for arr in (sin_lam, cos_lam, sin_sigma, cos_sigma, sigma, cos2_alpha, cos_2sigma):
+            arr[todo] = 0
+
+    A, B, _ = _vincenty_series(cos2_alpha)
+    dist = b * A * (sigma - _vincenty_delta_sigma(B, sin_sigma, cos_sigma, cos_2sigma))
+
+    az1 = np.arctan2(cos_U2 * sin_lam, cos_U1 * sin_U2 - sin_U1 * cos_U2 * cos_lam)
+    az2 = np.arctan2(cos_U1 * sin_lam, -sin_U1 * cos_U2 + cos_U1 * sin_U2 * cos_lam)
+
+    result = np.column_stack([dist, np.degrees(az1), np.degrees(az2)])
+    if todo.size > 0:
+        result[todo] = __get_mars_geodesic().inverse(start[todo], end[todo])
+    return result
+
+
+
+def _direct_vincenty(
+    start    : np.ndarray,
+    azimuth  : np.ndarray,
+    distance : np.ndarray,
+) -> np.ndarray:
+    """
+    Vincenty's direct method (which always converges).
+    """
+    f = _flattening
+    b = _semimajor_m * (1 - f)
+
+    az = np.radians(azimuth)
+    sin_az, cos_az = np.sin(az), np.cos(az)
+
+    sin_U1, cos_U1 = _reduced_latitude(start[:, 1])
+
+    sigma1 = np.arctan2(sin_U1, cos_U1 * cos_az)
+    sin_alpha = cos_U1 * sin_az
+    cos2_alpha = 1 - sin_alpha**2
+    A, B, C = _vincenty_series(cos2_alpha)
+
+    sigma0 = distance / (b * A)
+    sigma = sigma0.copy()
+    for _ in range(_max_iterations):
+        cos_2sigma = np.cos(2 * sigma1 + sigma)
+        sin_sigma, cos_sigma = np.sin(sigma), np.cos(sigma)
+        sigma_new = sigma0 + _vincenty_delta_sigma(B, sin_sigma, cos_sigma, cos_2sigma)
+        converged = np.abs(sigma_new - sigma) <= _tolerance
+        sigma = sigma_new
+        if converged.all():
+            break
+
+    cos_2sigma = np.cos(2 * sigma1 + sigma)
+    sin_sigma, cos_sigma = np.sin(sigma), np.cos(sigma)
+
+    tmp = sin_U1 * sin_sigma - cos_U1 * cos_sigma * cos_az
+    lat2 = np.arctan2(
+        sin_U1 * cos_sigma + cos_U1 * sin_sigma * cos_az,
+        (1 - f) * np.hypot(sin_alpha, tmp),
+    )
+    lam = np.arctan2(sin_sigma * sin_az, cos_U1 * cos_sigma - sin_U1 * sin_sigma * cos_az)
+    dlon = lam - (1 - C) * f * sin_alpha * (sigma + C * sin_sigma * (cos_2sigma + C * cos_sigma * (-1 + 2 * cos_2sigma**2)))
+
+    return np.column_stack([_wrap_lon(start[:, 0] + np.degrees(dlon)), np.degrees(lat2)])
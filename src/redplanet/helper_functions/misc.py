@@ -81,3 +81,94 @@ def find_closest_indices(
         insertion_indices
     )
     return closest_indices
+
+
+
+def find_closest_indices_regular(
+    start         : float,
+    step          : float,
+    num           : int,
+    target_values : np.ndarray,
+) -> np.ndarray:
+    """
+    Find the indices of the closest elements in a regularly spaced array (i.e. `start + step * np.arange(num)`) for each target value.
+
+    This gives the same result as `find_closest_indices` (including ties being resolved to the left/smaller element), but the index is computed arithmetically as `(target - start) / step` rather than with a binary search, so the cost per target value is constant regardless of the array size. All intermediate operations are done in place on a single temporary array.
+
+    Parameters
+    ----------
+    start : float
+        First value of the regularly spaced array.
+    step : float
+        Spacing between consecutive values, must be positive.
+    num : int
+        Number of elements in the regularly spaced array.
+    target_values : np.ndarray
+        Target values for which to find the closest indices.
+
+    Returns
+    -------
+    np.ndarray
+        Array of integers with the same shape as `target_values`, where each element is the index of the closest element. Values outside the array range are clipped to the first/last index.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> find_closest_indices_regular(10, 10, 5, np.array([25, 35, 5, 55]))
+    array([1, 2, 0, 4])
+    """
+    idx = np.subtract(target_values, start, dtype=np.float64)
+    idx /= step
+    ## subtracting 0.5 before `ceil` is equivalent to rounding to the nearest integer, except exact midpoints go to the left neighbor (consistent with `find_closest_indices`)
+    idx -= 0.5
+    np.ceil(idx, out=idx)
+    np.clip(idx, 0, num - 1, out=idx)
+    return idx.astype(np.intp)
+
+
+
+def get_regular_spacing(
+    array : np.ndarray,
+    rtol  : float = 1e-6,
+) -> float | None:
+    """
+    Check whether a one-dimensional array is regularly spaced and ascending (i.e. `array[i] == array[0] + i * step` for all `i`), and if so, return the spacing.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        One-dimensional array to check.
+    rtol : float, optional
+        Maximum allowed deviation of any element from its ideal position, as a fraction of the spacing. Default is 1e-6.
+
+    Returns
+    -------
+    float | None
+        The spacing `step` if the array is regularly spaced, otherwise None.
+    """
+    if array.size < 2:
+        return None
+    step = (array[-1] - array[0]) / (array.size - 1)
+    if not step > 0:
+        return None
+    ideal = array[0] + step * np.arange(array.size)
+    if np.max(np.abs(array - ideal)) > rtol * step:
+        return None
+    return float(step)
+
+
+
+def _parse_percentile(stat: str) -> float | None:
+    """
+    Parse the name of a percentile statistic, i.e. 'median' or 'p' followed by a number in [0, 100] (e.g. 'p5', 'p97.5'), and return the percentile in [0, 100]. Returns None for any other name.
+    """
+    if stat == 'median':
+        return 50.0
+    if stat.startswith('p'):
+        try:
+            q = float(stat[1:])
+        except ValueError:
+            return None
+        if 0 <= q <= 100:
+            return q
+    return None
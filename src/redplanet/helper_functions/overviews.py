@@ -0,0 +1,160 @@
+from pathlib import Path
+
+import numpy as np
+
+from redplanet.helper_functions.GriddedData import GriddedData
+
+
+
+
+
+def get_overviews(
+    fpath_dataset   : Path,
+    key             : str,
+    shape           : tuple[int, int],
+    dtype           : np.dtype,
+    lon             : np.ndarray,
+    lat             : np.ndarray,
+    is_slon         : bool,
+    var             : str,
+    metadata        : dict,
+    nan_value       : float | None = None,
+    min_num_cols    : int = 1024,
+    max_block_bytes : int = 2**26,
+) -> tuple[GriddedData]:
+    """
+    Get a multi-resolution pyramid ("overviews") for a memory-mapped 2D dataset, building and caching any missing levels on disk.
+
+    Each level is decimated by a factor of 2 along both axes relative to the previous level (level 1 is decimated relative to the original dataset), where each value is the average of the corresponding 2x2 block. Levels are created until the number of columns would drop below `min_num_cols`.
+
+    Levels are saved next to the original dataset file as `<stem>.<key>.ovr<level>.memmap`. Since the `key` is part of the file name (e.g. the hash of the original dataset), levels are automatically rebuilt if the original dataset changes.
+
+    Parameters
+    ----------
+    fpath_dataset : Path
+        Path to the original memory-mapped dataset.
+    key : str
+        Identifier for the version of the original dataset, e.g. its hash.
+    shape : tuple[int, int]
+        Shape of the original dataset, `(num_lats, num_lons)`.
+    dtype : np.dtype
+        Data type of the original dataset (levels use the same data type).
+    lon : np.ndarray
+        Longitude coordinates of the original dataset.
+    lat : np.ndarray
+        Latitude coordinates of the original dataset.
+    is_slon : bool
+        Whether longitudes are in range [-180, 180] (True) or [0, 360] (False).
+    var : str
+        Name of the data variable for the returned `GriddedData` objects.
+    metadata : dict
+        Metadata of the original dataset. A copy is attached to each level, with `'meters_per_pixel'` (if present) scaled accordingly and the extra key `'overview_level'`.
+    nan_value : float | None, optional
+        Sentinel value for missing data, which is excluded from block averages. Default is None (NaNs are always excluded for floating point data).
+    min_num_cols : int, optional
+        Minimum number of columns for the coarsest level. Default is 1024.
+    max_block_bytes : int, optional
+        Approximate maximum memory (in bytes) of the temporary arrays used while building a level, by default 64 MiB. Levels are built by streaming over the previous level in blocks of rows, so peak memory is a small multiple of this regardless of the dataset size.
+
+    Returns
+    -------
+    tuple[GriddedData]
+        One `GriddedData` object per level, ordered from finest to coarsest. Data arrays are read-only `np.memmap` arrays.
+    """
+
+    overviews = []
+
+    fpath_src = fpath_dataset
+    shape_src = shape
+
+    level = 0
+    while (shape_src[1] // 2) >= min_num_cols:
+        level += 1
+
+        shape_dst = (shape_src[0] // 2, shape_src[1] // 2)
+        fpath_dst = fpath_dataset.with_name(f'{fpath_dataset.stem}.{key}.ovr{level}.memmap')
+
+        if not fpath_dst.is_file():
+            src = np.memmap(fpath_src, mode='r', dtype=dtype, shape=shape_src)
+            _build_level(src, fpath_dst, nan_value, max_block_bytes)
+            del src
+
+        ## coordinates are the centers of each 2x2 block
+        lon = (lon[0:2*shape_dst[1]:2] + lon[1:2*shape_dst[1]:2]) / 2
+        lat = (lat[0:2*shape_dst[0]:2] + lat[1:2*shape_dst[0]:2]) / 2
+
+        metadata_level = dict(metadata)
+        metadata_level['overview_level'] = level
+        if 'meters_per_pixel' in metadata_level:
+            metadata_level['meters_per_pixel'] = metadata['meters_per_pixel'] * 2**level
+
+        overviews.append(
+            GriddedData(
+                lon       = lon,
+                is_slon   = is_slon,
+                lat       = lat,
+                data_dict = {var: np.memmap(fpath_dst, mode='r', dtype=dtype, shape=shape_dst)},
+                metadata  = metadata_level,
+                nan_value = nan_value,
+            )
+        )
+
+        fpath_src = fpath_dst
+        shape_src = shape_dst
+
+    return tuple(overviews)
+
+
+
+def _build_level(
+    src             : np.ndarray,
+    fpath_dst       : Path,
+    nan_value       : float | None,
+    max_block_bytes : int,
+) -> None:
+    """
+    Write a 2x block-averaged copy of `src` to `fpath_dst`, streaming over `src` in blocks of rows. The file is first written to a temporary path and then renamed, so an interrupted build never leaves a partial file in the cache.
+    """
+    num_rows, num_cols = src.shape[0] // 2, src.shape[1] // 2
+
+    is_int = np.issubdtype(src.dtype, np.integer)
+    if is_int and (nan_value is not None):
+        info = np.iinfo(src.dtype)
+        if not (info.min <= nan_value <= info.max):
+            nan_value = None  ## sentinel can't occur in the data
+    fill_value = nan_value if is_int else np.nan
+
+    fpath_tmp = fpath_dst.with_name(fpath_dst.name + '.tmp')
+    dst = np.memmap(fpath_tmp, mode='w+', dtype=src.dtype, shape=(num_rows, num_cols))
+
+    ## each output row needs two input rows, which are temporarily converted to float64
+    rows_per_block = max(1, max_block_bytes // (2 * src.shape[1] * 8))
+
+    for r0 in range(0, num_rows, rows_per_block):
+        r1 = min(num_rows, r0 + rows_per_block)
+
+        block = np.asarray(src[2*r0:2*r1, :2*num_cols], dtype=np.float64)
+        block = block.reshape(r1 - r0, 2, num_cols, 2)
+
+        if is_int and (nan_value is None):
+            mean = block.mean(axis=(1, 3))
+        else:
+            invalid = np.isnan(block)
+            if nan_value is not None:
+                invalid |= (block == nan_value)
+            block[invalid] = 0
+            count = 4 - invalid.sum(axis=(1, 3))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = block.sum(axis=(1, 3)) / count
+            if fill_value is not None:
+                mean[count == 0] = fill_value
+
+        if is_int:
+            np.rint(mean, out=mean)
+
+        dst[r0:r1] = mean
+
+    dst.flush()
+    del dst
+    fpath_tmp.replace(fpath_dst)
+    return
@@ -0,0 +1,91 @@
+from redplanet.user_config import (
+    get_dirpath_datacache,
+    set_dirpath_datacache,
+    get_max_size_to_calculate_hash_GiB,
+    set_max_size_to_calculate_hash_GiB,
+    get_enable_stream_hash_check,
+    set_enable_stream_hash_check,
+)
+
+
+
+
+
+def _get_user_config() -> tuple:
+    """
+    Get the user config which needs to be forwarded to worker processes (module-level state isn't inherited when processes are spawned rather than forked).
+    """
+    return (
+        get_dirpath_datacache(),
+        get_max_size_to_calculate_hash_GiB(),
+        get_enable_stream_hash_check(),
+    )
+
+
+
+def _get_loaded_datasets() -> dict[str, dict]:
+    """
+    Get the arguments needed to reload every dataset which is currently loaded, so worker processes can reopen them (memory-mapped/cached files are reopened from the data cache, rather than pickling the arrays).
+
+    Datasets which are loaded automatically on first access (e.g. GRS, craters, magnetic source depths) are omitted.
+    """
+    from redplanet.Crust.topo  import loader as topo_loader
+    from redplanet.Crust.moho  import loader as moho_loader
+    from redplanet.Crust.boug  import loader as boug_loader
+    from redplanet.Mag.sh      import loader as mag_loader
+
+    loaded = {}
+
+    if topo_loader._dat_topo is not None:
+        loaded['topo'] = {
+            'model'    : topo_loader._dat_topo.metadata['short_name'],
+            'overviews': len(topo_loader._dat_topo.overviews) > 0,
+        }
+
+    if moho_loader._dat_moho is not None:
+        params = moho_loader._dat_moho.metadata['model_params']
+        loaded['moho'] = {
+            'interior_model'   : params['interior_model'],
+            'insight_thickness': params['insight_thickness_km'],
+            'rho_south'        : params['rho_south'],
+            'rho_north'        : params['rho_north'],
+        }
+
+    if boug_loader._dat_boug is not None:
+        loaded['boug'] = {
+            'model': boug_loader._dat_boug.metadata['short_name'],
+        }
+
+    if mag_loader._dat_mag is not None:
+        loaded['mag'] = {
+            'model': mag_loader._dat_mag.metadata['short_name'],
+            'lmax' : mag_loader._dat_mag.metadata['lmax'],
+        }
+
+    return loaded
+
+
+
+def _init_worker(
+    user_config     : tuple,
+    loaded_datasets : dict[str, dict] | None = None,
+) -> None:
+    """
+    Initializer for worker processes: restore the user config and (optionally) reload datasets, see `_get_user_config` and `_get_loaded_datasets`.
+    """
+    dirpath_datacache, max_size_to_calculate_hash_GiB, enable_stream_hash_check = user_config
+    set_dirpath_datacache(dirpath_datacache)
+    set_max_size_to_calculate_hash_GiB(max_size_to_calculate_hash_GiB)
+    set_enable_stream_hash_check(enable_stream_hash_check)
+
+    if loaded_datasets:
+        from redplanet import Crust, Mag
+        loaders = {
+            'topo': Crust.topo.load,
+            'moho': Crust.moho.load,
+            'boug': Crust.boug.load,
+            'mag' : Mag.sh.load,
+        }
+        for name, kwargs in loaded_datasets.items():
+            loaders[name](**kwargs)
+    return
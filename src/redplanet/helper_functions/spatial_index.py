@@ -0,0 +1,207 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+from redplanet.helper_functions import geodesy
+from redplanet.helper_functions.coordinates import _lonlat2xyz
+
+
+
+
+
+## Geodesic distances between points separated by an angle theta on the unit sphere (using the same latitudes) are between `a * (1 - e^2) * theta` and `a * theta / sqrt(1 - e^2)`, i.e. the smallest and largest radii of curvature of the reference ellipsoid. These bounds let us search a KD-tree over unit vectors, then refine candidates with exact geodesic distances.
+_e2: float = geodesy._flattening * (2 - geodesy._flattening)
+_min_radius_km: float = geodesy._semimajor_m * (1 - _e2) / 1e3
+_max_radius_km: float = geodesy._semimajor_m / np.sqrt(1 - _e2) / 1e3
+
+
+
+def _build_tree(
+    lon : np.ndarray,
+    lat : np.ndarray,
+) -> cKDTree:
+    """
+    Build a KD-tree over the unit vectors of the given points.
+    """
+    return cKDTree(_lonlat2xyz(lon, lat))
+
+
+def _chord2angle(chord: np.ndarray) -> np.ndarray:
+    return 2 * np.arcsin(np.minimum(chord / 2, 1))
+
+
+def _angle2chord(angle: np.ndarray) -> np.ndarray:
+    return 2 * np.sin(np.minimum(angle, np.pi) / 2)
+
+
+
+def _query_nearest(
+    tree       : cKDTree,
+    coords     : np.ndarray,
+    lon        : np.ndarray,
+    lat        : np.ndarray,
+    k          : int,
+    chunk_size : int = 2**14,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Find the `k` closest points of `coords` (shape (n, 2) with longitude/latitude, indexed by `tree`) to each of the points given by 1D arrays `lon` and `lat`, by geodesic distance. Returns arrays `(index, distance_km)` with shape `(num_points, k)` sorted by distance.
+
+    If the k-th closest candidate is within `_min_radius_km * theta` of the query point (where theta is the angle to the furthest candidate), no other point can be closer. Otherwise, we retry with more candidates.
+    """
+    idx = np.empty((lon.size, k), dtype=int)
+    distances_km = np.empty((lon.size, k))
+
+    for i0 in range(0, lon.size, chunk_size):
+        i1 = min(lon.size, i0 + chunk_size)
+        xyz = _lonlat2xyz(lon[i0:i1], lat[i0:i1])
+
+        todo = np.arange(i1 - i0)
+        num_candidates = min(tree.n, max(2 * k, k + 8))
+        while todo.size > 0:
+            chord, candidates = tree.query(xyz[todo], k=num_candidates)
+            chord      = chord.reshape(todo.size, num_candidates)
+            candidates = candidates.reshape(todo.size, num_candidates)
+
+            ## exact distances to candidates, sorted
+            dist = geodesy.get_distance(
+                start = np.repeat(np.column_stack([lon[i0:i1][todo], lat[i0:i1][todo]]), num_candidates, axis=0),
+                end   = coords[candidates.ravel()],
+            )[:, 0].reshape(todo.size, num_candidates) / 1e3
+            order = np.argsort(dist, axis=1, kind='stable')[:, :k]
+            idx[i0:i1][todo]          = np.take_along_axis(candidates, order, axis=1)
+            distances_km[i0:i1][todo] = np.take_along_axis(dist, order, axis=1)
+
+            ## check which points are guaranteed to be correct
+            if num_candidates == tree.n:
+                break
+            bound_km = _min_radius_km * _chord2angle(chord[:, -1])
+            todo = todo[distances_km[i0:i1][todo][:, -1] > bound_km]
+            num_candidates = min(tree.n, num_candidates * 4)
+
+    return idx, distances_km
+
+
+
+def _query_nearest_index(
+    tree       : cKDTree,
+    coords     : np.ndarray,
+    lon        : np.ndarray,
+    lat        : np.ndarray,
+    chunk_size : int = 2**16,
+) -> np.ndarray:
+    """
+    Find the index of the closest point of `coords` (by geodesic distance) to each of the points given by 1D arrays `lon` and `lat`.
+
+    This gives the same result as `_query_nearest(..., k=1)`, but avoids computing geodesic distances for almost all points: a candidate can only be closer than the nearest neighbor on the unit sphere if its angle is within a factor `_max_radius_km / _min_radius_km` (~1.6%) of it. Only those ambiguous points are refined with exact distances.
+    """
+    max_ratio = _max_radius_km / _min_radius_km
+    num_candidates = min(tree.n, 4)
+
+    idx = np.empty(lon.size, dtype=int)
+
+    for i0 in range(0, lon.size, chunk_size):
+        i1 = min(lon.size, i0 + chunk_size)
+        lon_chunk, lat_chunk = lon[i0:i1], lat[i0:i1]
+
+        chord, candidates = tree.query(_lonlat2xyz(lon_chunk, lat_chunk), k=num_candidates)
+        chord      = chord.reshape(-1, num_candidates)
+        candidates = candidates.reshape(-1, num_candidates)
+        idx[i0:i1] = candidates[:, 0]
+
+        if num_candidates == 1:
+            continue
+
+        angle = _chord2angle(chord)
+        is_possible = angle <= max_ratio * angle[:, :1]
+
+        ## exact distances to every possible candidate
+        ambiguous = np.flatnonzero(is_possible[:, 1])
+        if ambiguous.size > 0:
+            cands = candidates[ambiguous]
+            dist = geodesy.get_distance(
+                start = np.repeat(np.column_stack([lon_chunk[ambiguous], lat_chunk[ambiguous]]), num_candidates, axis=0),
+                end   = coords[cands.ravel()],
+            )[:, 0].reshape(ambiguous.size, num_candidates)
+            dist[~is_possible[ambiguous]] = np.inf
+            idx[i0:i1][ambiguous] = cands[np.arange(ambiguous.size), np.argmin(dist, axis=1)]
+
+        ## if even the furthest candidate is possible, there may be others -- fall back to the general method (very rare)
+        overflow = np.flatnonzero(is_possible[:, -1])
+        if overflow.size > 0:
+            idx[i0:i1][overflow] = _query_nearest(tree, coords, lon_chunk[overflow], lat_chunk[overflow], k=1)[0][:, 0]
+
+    return idx
+
+
+
+def _query_radius(
+    tree       : cKDTree,
+    coords     : np.ndarray,
+    lon        : np.ndarray,
+    lat        : np.ndarray,
+    radius_km  : np.ndarray,
+    extra_km   : np.ndarray | None = None,
+    chunk_size : int = 2**12,
+) -> tuple[list[np.ndarray], list[np.ndarray]]:
+    """
+    Find all points of `coords` within a geodesic distance of `radius_km` (one value per query point) of each of the points given by 1D arrays `lon` and `lat`. If `extra_km` is given (one value per point of `coords`, e.g. the radius of a crater), it's added to the search radius for that point.
+
+    Returns lists (one element per query point) of `index` and `distance_km` arrays, sorted by distance.
+    """
+    max_extra_km = 0 if (extra_km is None or extra_km.size == 0) else np.nanmax(extra_km)
+
+    indices   = []
+    distances = []
+
+    for i0 in range(0, lon.size, chunk_size):
+        i1 = min(lon.size, i0 + chunk_size)
+
+        ## candidates within the largest possible angle, then exact distances for all (point, candidate) pairs at once
+        max_angle = (radius_km[i0:i1] + max_extra_km) / _min_radius_km
+        candidates = tree.query_ball_point(_lonlat2xyz(lon[i0:i1], lat[i0:i1]), r=_angle2chord(max_angle))
+        counts = np.array([len(c) for c in candidates], dtype=int)
+        candidates = np.fromiter((j for c in candidates for j in c), dtype=int, count=counts.sum())
+        point = np.repeat(np.arange(i1 - i0), counts)
+
+        dist = geodesy.get_distance(
+            start = np.column_stack([lon[i0:i1], lat[i0:i1]])[point],
+            end   = coords[candidates],
+        )[:, 0] / 1e3
+
+        limit = radius_km[i0:i1][point]
+        if extra_km is not None:
+            limit = limit + extra_km[candidates]
+        keep = dist <= limit
+        candidates, point, dist = candidates[keep], point[keep], dist[keep]
+
+        ## group by query point, sorted by distance
+        order = np.lexsort((dist, point))
+        bounds = np.cumsum(np.bincount(point, minlength=i1-i0))[:-1]
+        indices.extend(np.split(candidates[order], bounds))
+        distances.extend(np.split(dist[order], bounds))
+
+    return indices, distances
+
+
+
+def _get_angle_to_arcs(
+    p         : np.ndarray,
+    a         : np.ndarray,
+    b         : np.ndarray,
+    normal    : np.ndarray,
+    tangent_a : np.ndarray,
+    tangent_b : np.ndarray,
+) -> np.ndarray:
+    """
+    Get the angular distance (radians) from unit vectors `p` to the great-circle arcs from `a` to `b`, where `normal` is the unit normal of each arc (`a x b`, normalized) and `tangent_a`/`tangent_b` are `normal x a` and `normal x b`. All inputs have shape (..., 3) and are broadcast against each other.
+    """
+    def dot(u, v):
+        return np.einsum('...i,...i->...', u, v)
+
+    ## if the projection of the point onto the great circle falls within the arc, the distance is to the great circle -- otherwise it's to the closest endpoint
+    within = (dot(p, tangent_a) >= 0) & (dot(p, tangent_b) <= 0)
+    angle_circle = np.arcsin(np.minimum(np.abs(dot(p, normal)), 1))
+
+    chord_ends = np.sqrt(np.minimum(dot(p - a, p - a), dot(p - b, p - b)))
+    angle_ends = _chord2angle(chord_ends)
+
+    return np.where(within, angle_circle, angle_ends)
@@ -0,0 +1,245 @@
+from collections.abc import Callable
+
+import numpy as np
+import pyshtools as pysh
+import xarray as xr
+
+from redplanet.helper_functions.coordinates import _verify_coords
+from redplanet.helper_functions.GriddedData import _prepare_coords, _format_values
+
+
+
+
+
+_legendre_functions: dict[str, tuple] = {
+    ## normalization: (functions, first derivatives) -- see `pyshtools.legendre`
+    '4pi'    : (pysh.legendre.PlmBar     , pysh.legendre.PlmBar_d1    ),
+    'ortho'  : (pysh.legendre.PlmON      , pysh.legendre.PlmON_d1     ),
+    'schmidt': (pysh.legendre.PlmSchmidt , pysh.legendre.PlmSchmidt_d1),
+    'unnorm' : (pysh.legendre.PLegendreA , pysh.legendre.PLegendreA_d1),
+}
+
+
+
+def expand_points(
+    coeffs          : np.ndarray,
+    lon             : np.ndarray,
+    lat             : np.ndarray,
+    normalization   : str = '4pi',
+    csphase         : int = 1,
+    max_batch_bytes : int = 2**27,
+) -> np.ndarray:
+    """
+    Evaluate a real spherical harmonic expansion exactly at scattered points, without expanding it onto a global grid.
+
+    Parameters
+    ----------
+    coeffs : np.ndarray
+        Spherical harmonic coefficients with shape `(2, lmax+1, lmax+1)`, in the same format as `pyshtools.SHCoeffs.coeffs` (index 0 for cosine terms, index 1 for sine terms).
+    lon : np.ndarray
+        Longitudes of the points in degrees (any range).
+    lat : np.ndarray
+        Latitudes of the points in degrees, same shape as `lon`.
+    normalization : str, optional
+        Normalization of the coefficients, one of ['4pi', 'ortho', 'schmidt', 'unnorm']. Default is '4pi'.
+    csphase : int, optional
+        1 to exclude the Condon-Shortley phase factor, -1 to include it. Default is 1.
+    max_batch_bytes : int, optional
+        Approximate maximum memory (in bytes) used for tables of Legendre functions at a time, by default 128 MiB.
+
+    Returns
+    -------
+    np.ndarray
+        Values of the expansion at each point, same shape as `lon`.
+
+    Notes
+    -----
+    Associated Legendre functions only depend on latitude, so they're computed once per unique latitude and reused for all points sharing it (e.g. a full grid row, or a profile along a parallel). For each unique latitude, the sum over degree is collapsed into one coefficient per order $m$ with a matrix product, so each point only needs a sum of $2(L+1)$ terms.
+    """
+    return _synthesize([(coeffs, False)], lon, lat, normalization, csphase, max_batch_bytes)[0]
+
+
+
+def expand_points_mag(
+    coeffs          : np.ndarray,
+    r0              : float,
+    lon             : np.ndarray,
+    lat             : np.ndarray,
+    altitude        : float = 0,
+    normalization   : str = 'schmidt',
+    csphase         : int = 1,
+    max_batch_bytes : int = 2**27,
+) -> dict[str, np.ndarray]:
+    """
+    Evaluate the components of a (potential) magnetic field exactly at scattered points, without expanding it onto a global grid. This is the point-wise equivalent of `pyshtools.SHMagCoeffs.expand(a=r0+altitude)`.
+
+    Parameters
+    ----------
+    coeffs : np.ndarray
+        Spherical harmonic coefficients of the magnetic potential with shape `(2, lmax+1, lmax+1)`, in the same format as `pyshtools.SHMagCoeffs.coeffs` (e.g. Gauss coefficients in nT).
+    r0 : float
+        Reference radius of the coefficients in meters.
+    lon : np.ndarray
+        Longitudes of the points in degrees (any range).
+    lat : np.ndarray
+        Latitudes of the points in degrees, same shape as `lon`.
+    altitude : float, optional
+        Altitude above the reference radius `r0` in meters. Default is 0.
+    normalization : str, optional
+        Normalization of the coefficients, one of ['4pi', 'ortho', 'schmidt', 'unnorm']. Default is 'schmidt'.
+    csphase : int, optional
+        1 to exclude the Condon-Shortley phase factor, -1 to include it. Default is 1.
+    max_batch_bytes : int, optional
+        Approximate maximum memory (in bytes) used for tables of Legendre functions at a time, by default 128 MiB.
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        Arrays with the same shape as `lon` for keys ['radial', 'theta', 'phi', 'total', 'potential'] -- same names and conventions as `pyshtools.SHMagGrid`. Field components have the units of the coefficients (e.g. nT), and the potential has units of the coefficients times meters.
+    """
+
+    ## fold the radial dependence of each degree into the coefficients, such that $V = r_0 \sum_l (r_0/r)^{l+1} \sum_m (g_{lm} \cos m\phi + h_{lm} \sin m\phi) P_{lm}$ and $\mathbf{B} = -\nabla V$
+    lmax = coeffs.shape[1] - 1
+    l = np.arange(lmax + 1)[None, :, None]
+    m = np.arange(lmax + 1)[None, None, :]
+    ratio = r0 / (r0 + altitude)
+
+    coeffs_pot    = coeffs * (r0 * ratio**(l + 1))
+    coeffs_field  = coeffs * ratio**(l + 2)
+    coeffs_radial = coeffs_field * (l + 1)
+    coeffs_phi    = np.stack([-m[0] * coeffs_field[1], m[0] * coeffs_field[0]])  ## derivative with respect to longitude swaps cosine/sine terms
+
+    potential, radial, theta, phi = _synthesize(
+        [
+            (coeffs_pot   , False),
+            (coeffs_radial, False),
+            (coeffs_field , True ),
+            (coeffs_phi   , False),
+        ],
+        lon, lat, normalization, csphase, max_batch_bytes,
+    )
+
+    ## B_theta = -(1/r) dV/dtheta = sum(...) * sin(theta) * dP/dz, and B_phi = -(1/(r sin(theta))) dV/dphi
+    sin_colat = np.cos(np.radians(_clip_poles(lat)))
+    theta *= sin_colat
+    phi   /= sin_colat
+
+    return {
+        'radial'   : radial,
+        'theta'    : theta,
+        'phi'      : phi,
+        'total'    : np.sqrt(radial**2 + theta**2 + phi**2),
+        'potential': potential,
+    }
+
+
+
+
+
+def _get_values_exact(
+    evaluate  : Callable[[np.ndarray, np.ndarray], np.ndarray],
+    lon       : float | np.ndarray,
+    lat       : float | np.ndarray,
+    as_xarray : bool,
+    pointwise : bool,
+    attrs     : dict,
+) -> float | np.ndarray | xr.DataArray:
+    """
+    Evaluate `evaluate(lon, lat)` (e.g. a wrapper around `expand_points`) at the query coordinates, with the same input handling and return types as `GriddedData.get_values` (longitudes in range [0, 360]).
+    """
+    _verify_coords(lon, lat)
+    is_scalar = (np.ndim(lon) == 0) and (np.ndim(lat) == 0)
+    lon, lat = _prepare_coords(lon, lat, is_slon=False, pointwise=pointwise)
+
+    if pointwise:
+        dat = evaluate(lon, lat)
+    else:
+        lon_2d, lat_2d = np.meshgrid(lon, lat)
+        dat = evaluate(lon_2d, lat_2d)
+
+    return _format_values(dat, lon, lat, as_xarray, pointwise, attrs, is_scalar)
+
+
+
+def _clip_poles(lat: np.ndarray) -> np.ndarray:
+    """
+    Move points at the poles by a negligible amount (~0.6 m on Mars) so derivatives with respect to colatitude and longitude are well-defined.
+    """
+    return np.clip(lat, -90 + 1e-5, 90 - 1e-5)
+
+
+
+def _synthesize(
+    coeff_sets      : list[tuple[np.ndarray, bool]],
+    lon             : np.ndarray,
+    lat             : np.ndarray,
+    normalization   : str,
+    csphase         : int,
+    max_batch_bytes : int,
+) -> list[np.ndarray]:
+    """
+    Compute $\\sum_l \\sum_m (C_{lm} \\cos m\\phi + S_{lm} \\sin m\\phi) Q_{lm}(\\cos\\theta)$ at each point for several sets of coefficients, where $Q_{lm}$ is either the associated Legendre function or its derivative with respect to $\\cos\\theta$ (second element of each tuple in `coeff_sets`).
+    """
+
+    if normalization not in _legendre_functions:
+        raise ValueError(f'Unknown normalization: "{normalization}". Options are: {", ".join(_legendre_functions)}.')
+    legendre, legendre_d1 = _legendre_functions[normalization]
+    use_d1 = any(deriv for _, deriv in coeff_sets)
+
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    shape = lon.shape
+    lon = lon.ravel()
+    lat = lat.ravel()
+
+    lmax = coeff_sets[0][0].shape[1] - 1
+    m = np.arange(lmax + 1)
+
+
+    ## coefficient matrices with shape (num_lm, lmax+1), such that `P @ mat` collapses the sum over degree for each order (where `P` is a table of Legendre functions with shape (num_lats, num_lm) in `pyshtools` index order `l*(l+1)/2 + m`)
+    idx_l, idx_m = np.tril_indices(lmax + 1)
+    idx_lm = np.arange(idx_l.size)
+    mats = []
+    for coeffs, deriv in coeff_sets:
+        mat = np.zeros((2, idx_l.size, lmax + 1))
+        mat[0, idx_lm, idx_m] = coeffs[0, idx_l, idx_m]
+        mat[1, idx_lm, idx_m] = coeffs[1, idx_l, idx_m]
+        mats.append(mat)
+
+
+    ## group points by latitude
+    lat_unique, inverse = np.unique(_clip_poles(lat) if use_d1 else lat, return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.searchsorted(inverse[order], np.arange(lat_unique.size + 1))
+
+    z = np.sin(np.radians(lat_unique))  ## cos(colatitude)
+    lats_per_batch = max(1, max_batch_bytes // (idx_l.size * 8 * (2 if use_d1 else 1)))
+
+    results = [np.empty(lon.size) for _ in coeff_sets]
+
+    for i0 in range(0, lat_unique.size, lats_per_batch):
+        i1 = min(lat_unique.size, i0 + lats_per_batch)
+
+        ## Legendre functions for each unique latitude in this batch
+        p  = np.empty((i1 - i0, idx_l.size))
+        dp = np.empty((i1 - i0, idx_l.size)) if use_d1 else None
+        for k in range(i1 - i0):
+            if use_d1:
+                p[k], dp[k] = legendre_d1(lmax, z[i0 + k], csphase=csphase)
+            else:
+                p[k] = legendre(lmax, z[i0 + k], csphase=csphase)
+
+        ## points in this batch
+        sel = order[bounds[i0]:bounds[i1]]
+        row = inverse[sel] - i0
+        mphi = np.outer(np.radians(lon[sel]), m)
+        cos_mphi = np.cos(mphi)
+        sin_mphi = np.sin(mphi)
+
+        for result, mat, (_, deriv) in zip(results, mats, coeff_sets):
+            table = dp if deriv else p
+            a = table @ mat[0]  ## shape (num_lats_in_batch, lmax+1)
+            b = table @ mat[1]
+            result[sel] = np.einsum('ij,ij->i', a[row], cos_mphi) + np.einsum('ij,ij->i', b[row], sin_mphi)
+
+    return [result.reshape(shape) for result in results]
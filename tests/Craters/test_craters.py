@@ -13,7 +13,7 @@ def test_getall():
 
 def test_getall_as_df():
     x = Craters.get(as_df=True)
-    assert x.shape == (2072, 22)
+    assert x.shape == (2072, 38)  ## each of the 8 age columns is split into three
 
 
 def test_getall_confirm_range():
@@ -50,3 +50,93 @@ def test_get_aged():
 def test_get_named():
     x = Craters.get(name=['Copernicus', 'Henry'])
     assert len(x) == 2
+
+
+def test_get_types():
+    df = Craters.get(as_df=True)
+    for col in ['lat', 'lon', 'plon', 'diam']:
+        assert df[col].dtype == np.float64
+
+    ## ages are lists of three floats (age, -err, +err) or None
+    ages = [crater['Hartmann Isochron Age'] for crater in Craters.get()]
+    ages = [age for age in ages if age is not None]
+    assert len(ages) >= 73  ## craters with both Hartmann and Neukum ages, see `test_get_aged`
+    assert all(len(age) == 3 and age[1] <= 0 <= age[2] for age in ages)
+
+    ## ... and the same values as float columns (NaN when unavailable) in DataFrames
+    cols = ['Hartmann Isochron Age', 'Hartmann Isochron Age_minus', 'Hartmann Isochron Age_plus']
+    assert all(df[col].dtype == np.float64 for col in cols)
+    assert np.array_equal(df[cols].dropna().to_numpy(), ages)
+    assert df[cols].isna().all(axis=1).sum() == len(df) - len(ages)
+
+    ## missing values are None in the list of dictionaries
+    x = Craters.get(has_age=True)
+    assert all(value is None or value == value for crater in x for value in crater.values() if not isinstance(value, list))
+
+
+def test_get_lon_wrap():
+    x = Craters.get(lon=[350, 10], as_df=True)
+    y = Craters.get(lon=[-10, 10], as_df=True)
+    z = Craters.get(lon=[170, -170], as_df=True)
+    assert x.index.equals(y.index)
+    assert len(z) > 0
+    assert np.all((z['lon'] >= 170) | (z['lon'] <= -170))
+
+
+def test_get_nearest():
+    df = Craters.get(as_df=True)
+    idx, dist = Craters.get_nearest(df['lon'].to_numpy()[:10], df['lat'].to_numpy()[:10], k=3)
+    assert idx.shape == dist.shape == (10, 3)
+    assert np.array_equal(idx[:, 0], np.arange(10))
+    assert np.allclose(dist[:, 0], 0)
+    assert np.all(np.diff(dist, axis=1) >= 0)
+
+    idx, dist = Craters.get_nearest(0, 0)
+    assert idx.shape == (1,)
+
+    with pytest.raises(ValueError, match='must be in range'):
+        Craters.get_nearest(0, 0, k=0)
+
+
+def test_get_within_radius():
+    df = Craters.get(as_df=True)
+    lon, lat = df['lon'].iloc[0], df['lat'].iloc[0]
+
+    idx, dist = Craters.get_within_radius(lon, lat, 1000, return_distance=True)
+    assert idx[0] == 0
+    assert np.all(dist <= 1000) and np.all(np.diff(dist) >= 0)
+
+    ## consistent with nearest neighbors
+    idx_k, dist_k = Craters.get_nearest(lon, lat, k=len(idx) + 1)
+    assert np.array_equal(np.sort(idx), np.sort(idx_k[:-1]))
+    assert dist_k[-1] > 1000
+
+    ## batch queries, and overlap includes at least the same craters
+    x = Craters.get_within_radius([lon, 0], [lat, 0], 1000)
+    y = Craters.get_within_radius([lon, 0], [lat, 0], 1000, overlap=True)
+    assert len(x) == len(y) == 2
+    assert np.array_equal(x[0], idx)
+    assert set(x[1]) <= set(y[1])
+
+    with pytest.raises(ValueError, match='non-negative'):
+        Craters.get_within_radius(0, 0, -1)
+
+
+def test_get_in_polygon():
+    ## same as a lon/lat box, except that the northern edge (a great-circle arc) bulges slightly poleward
+    idx = Craters.get_in_polygon([-30, 0, 0, -30], [0, 0, 30, 30])
+    df = Craters.get(lon=[-30, 0], lat=[0, 30], as_df=True)
+    assert set(df.index) <= set(idx)
+    assert np.all(Craters.get(as_df=True).iloc[idx]['lat'] < 31)
+
+    ## across the antimeridian
+    idx = Craters.get_in_polygon([170, 190, 190, 170], [-10, -10, 0, 0])
+    df = Craters.get(lon=[170, -170], lat=[-10, 0], as_df=True)
+    assert set(df.index) <= set(idx)
+    x = Craters.get(as_df=True).iloc[idx]
+    assert np.all((x['lon'] >= 170) | (x['lon'] <= -170))
+
+    assert set(idx) <= set(Craters.get_in_polygon([170, 190, 190, 170], [-10, -10, 0, 0], overlap=True))
+
+    with pytest.raises(ValueError, match='hemisphere'):
+        Craters.get_in_polygon([0, 120, 240], [0, 0, 0])
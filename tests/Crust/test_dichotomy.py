@@ -1,3 +1,4 @@
+import time
 import pytest
 import numpy as np
 
@@ -24,6 +25,36 @@ def test__Crust_dichotomy__valid():
     assert ~Crust.dichotomy.is_above(np.arange( 285, 360), 0).all()
 
 
+def test__Crust_dichotomy__pointwise():
+
+    ## boundary coordinates are parsed once and read-only
+    assert Crust.dichotomy.get_coords() is Crust.dichotomy.get_coords()
+    assert not Crust.dichotomy.get_coords().flags.writeable
+
+    ## paired points match the diagonal of the outer-product mode
+    rng = np.random.default_rng(0)
+    lons = rng.uniform(-180, 360, 200)
+    lats = rng.uniform(-90, 90, 200)
+    assert np.array_equal(
+        Crust.dichotomy.is_above(lons, lats, pointwise=True),
+        np.diagonal(Crust.dichotomy.is_above(lons, lats)),
+    )
+
+    ## output keeps the broadcast shape of the inputs, scalars only for scalar inputs
+    assert isinstance(Crust.dichotomy.is_above(0, 0, pointwise=True), bool)
+    assert Crust.dichotomy.is_above([0], [0], pointwise=True).shape == (1,)
+    assert Crust.dichotomy.is_above([0], 0, pointwise=True).shape == (1,)
+    assert Crust.dichotomy.is_above(lons[:5, None], lats[:5, None], pointwise=True).shape == (5, 1)
+    assert Crust.dichotomy.is_above(lons[:5, None], 0, pointwise=True).shape == (5, 1)
+    assert np.array_equal(
+        Crust.dichotomy.is_above(lons[:5, None], lats[:5, None], pointwise=True).ravel(),
+        Crust.dichotomy.is_above(lons[:5], lats[:5], pointwise=True),
+    )
+
+    with pytest.raises(ValueError, match='same shape'):
+        Crust.dichotomy.is_above([0, 1, 2], [0, 1], pointwise=True)
+
+
 def test__Crust_dichotomy__invalid():
 
     ## out-of-range coordinates
@@ -35,3 +66,77 @@ def test__Crust_dichotomy__invalid():
         Crust.dichotomy.is_above(0, -91)
     with pytest.raises(CoordinateError, match="Latitude"):
         Crust.dichotomy.is_above(0, 91)
+
+
+def _get_distance__brute(lons, lats):
+    ## unsigned distance (km) to every boundary arc
+    from redplanet.Crust.dichotomy import _get_distance_index, _get_angle_to_arcs
+    from redplanet.helper_functions.coordinates import _lonlat2xyz
+    from redplanet.helper_functions.geodesy import _mean_radius_m
+    num_arcs = _get_distance_index()['vertices'].shape[0]
+    return _get_angle_to_arcs(
+        _lonlat2xyz(lons, lats),
+        np.broadcast_to(np.arange(num_arcs), (lons.size, num_arcs)),
+        _get_distance_index(),
+    ).min(axis=1) * _mean_radius_m / 1e3
+
+
+def test__Crust_dichotomy__get_distance():
+
+    ## compare against brute force over every boundary arc: random points, points near the boundary, points on cell edges of the spatial index, and the poles
+    rng = np.random.default_rng(0)
+    coords = Crust.dichotomy.get_coords()[rng.choice(Crust.dichotomy.get_coords().shape[0], 300)]
+    cell_size = Crust.dichotomy._get_distance_index()['cell_size']
+    lons = np.concatenate([
+        rng.uniform(-180, 360, 300),
+        np.clip(coords[:, 0] + rng.normal(0, 0.5, 300), 0, 360),
+        np.round(rng.uniform(0, 360, 300) / cell_size) * cell_size,
+        rng.uniform(0, 360, 300),
+        [0, 0, 360, 360, 180],
+    ])
+    lats = np.concatenate([
+        rng.uniform(-90, 90, 300),
+        np.clip(coords[:, 1] + rng.normal(0, 0.5, 300), -90, 90),
+        np.round(rng.uniform(-90, 90, 300) / cell_size) * cell_size,
+        rng.choice([-90, 90], 300),
+        [-90, 90, -90, 90, 0],
+    ])
+    dist = Crust.dichotomy.get_distance(lons, lats, pointwise=True)
+    assert np.allclose(np.abs(dist), _get_distance__brute(lons, lats), rtol=0, atol=1e-6)
+
+    ## sign agrees with `is_above`, and boundary vertices are on the boundary
+    assert np.array_equal(dist > 0, Crust.dichotomy.is_above(lons, lats, pointwise=True))
+    coords = Crust.dichotomy.get_coords()[::100]
+    assert np.allclose(Crust.dichotomy.get_distance(coords[:, 0], coords[:, 1], pointwise=True), 0, atol=1e-6)
+
+    ## output shapes
+    assert Crust.dichotomy.get_distance(0, 90) > 0
+    assert Crust.dichotomy.get_distance(0, -90) < 0
+    assert Crust.dichotomy.get_distance(lons[:3], lats[:5]).shape == (5, 3)
+    assert Crust.dichotomy.get_distance(lons[:3], lats[:5], as_xarray=True).dims == ('lat', 'lon')
+    assert Crust.dichotomy.get_distance(lons[:3], lats[:3], pointwise=True, as_xarray=True).dims == ('point',)
+    assert isinstance(Crust.dichotomy.get_distance(0, 0, pointwise=True), float)
+    assert Crust.dichotomy.get_distance([0], [0], pointwise=True).shape == (1,)
+    assert Crust.dichotomy.get_distance(lons[:5, None], lats[:5, None], pointwise=True).shape == (5, 1)
+    assert Crust.dichotomy.get_distance(lons[:5, None], 0, pointwise=True).shape == (5, 1)
+    assert np.array_equal(
+        Crust.dichotomy.get_distance(lons[:5, None], lats[:5, None], pointwise=True).ravel(),
+        dist[:5],
+    )
+
+
+def test__Crust_dichotomy__get_distance__benchmark():
+    rng = np.random.default_rng(0)
+    num_points = 10**6
+    lons = rng.uniform(0, 360, num_points)
+    lats = np.degrees(np.arcsin(rng.uniform(-1, 1, num_points)))  ## uniform over the sphere, so mostly far from the boundary
+
+    Crust.dichotomy.get_distance(0, 0)  ## build the spatial index
+
+    t0 = time.perf_counter()
+    dist = Crust.dichotomy.get_distance(lons, lats, pointwise=True)
+    t_query = time.perf_counter() - t0
+
+    print(f'\n\t{num_points:.0e} points: {t_query:.3f} s ({t_query / num_points * 1e6:.2f} us per point)')
+    sample = rng.choice(num_points, 500, replace=False)
+    assert np.allclose(np.abs(dist[sample]), _get_distance__brute(lons[sample], lats[sample]), rtol=0, atol=1e-6)
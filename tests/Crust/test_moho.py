@@ -1,4 +1,5 @@
 import pytest
+import time
 import numpy as np
 
 from redplanet import Crust
@@ -74,3 +75,104 @@ def test_load_get_valid():
         Crust.moho.get(lons    , lats),
         Crust.moho.get(lons+360, lats)
     )
+
+
+
+def test_load_cached():
+    ## expanded grids are cached to disk, so reloading a model opens them as memory-mapped arrays with identical values
+    Crust.moho.load('Khan2022', 39, 2700, 2700)
+    dat = Crust.moho.get_dataset().data_dict
+    moho, crthick = np.array(dat['moho']), np.array(dat['crthick'])
+
+    Crust.moho.load('Khan2022', 39, 2700, 2700)
+    dat = Crust.moho.get_dataset().data_dict
+    assert isinstance(dat['moho'], np.memmap)
+    assert np.array_equal(dat['moho'], moho)
+    assert np.array_equal(dat['crthick'], crthick)
+
+
+
+def test_shape_memoized__benchmark(monkeypatch):
+    ## the expanded MOLA shape is identical for every model, so it should only be parsed/expanded once per process -- compare per-model expansion time across 100 registry entries with and without the in-memory cache (bypassing the on-disk cache of expanded grids)
+    from redplanet.Crust.moho import loader
+
+    model_names = [loader._get_model_name(*row) for row in Crust.moho.get_registry().head(100).values]
+
+    t0 = time.perf_counter()
+    for model_name in model_names:
+        Crust.moho.clear_cache()
+        grids_before = loader._expand_grids(model_name)
+    t_before = (time.perf_counter() - t0) / len(model_names)
+
+    ## with the cache, the shape file isn't read again and every model reuses the same grid
+    shape_grid = loader._get_shape_grid()
+    num_shape_reads = 0
+    get_fpath_dataset = loader._get_fpath_dataset
+    def counting_get_fpath_dataset(dataset_name):
+        nonlocal num_shape_reads
+        num_shape_reads += (dataset_name == 'MOLA_shape_719')
+        return get_fpath_dataset(dataset_name)
+    monkeypatch.setattr(loader, '_get_fpath_dataset', counting_get_fpath_dataset)
+
+    t0 = time.perf_counter()
+    for model_name in model_names:
+        grids_after = loader._expand_grids(model_name)
+    t_after = (time.perf_counter() - t0) / len(model_names)
+
+    assert num_shape_reads == 0
+    assert loader._get_shape_grid() is shape_grid
+    assert np.array_equal(grids_before['crthick'], grids_after['crthick'])
+
+    print(f'\n\tper-model expansion: {t_before*1e3:.1f} ms without shape cache, {t_after*1e3:.1f} ms with shape cache ({t_before/t_after:.1f}x speedup)')
+
+
+
+def test_ensemble():
+    ## ensemble values match loading/accessing each model individually, both in-process and with a process pool
+    registry = Crust.moho.get_registry()
+    registry = registry[registry['interior_model'] == 'Khan2022'].head(4)
+    lons = np.array([0, 90, 200, -45])
+    lats = np.array([0, 45, -30, 80])
+
+    ens = Crust.moho.get_ensemble(registry, lons, lats, crthick=True, max_workers=1)
+    assert ens.dims == ('model', 'point')
+    assert ens.shape == (4, 4)
+    for i, row in enumerate(registry.itertuples(index=False)):
+        Crust.moho.load(*row)
+        assert np.array_equal(ens.values[i], Crust.moho.get(lons, lats, crthick=True, pointwise=True))
+
+    assert np.array_equal(ens.values, Crust.moho.get_ensemble(registry, lons, lats, crthick=True, max_workers=2).values)
+
+    ## registry columns read as floats (e.g. after filtering with missing values) map to the same models
+    registry_float = registry.astype({'insight_thickness': float, 'rho_south': float, 'rho_north': float})
+    ens_float = Crust.moho.get_ensemble(registry_float, lons, lats, crthick=True, max_workers=1)
+    assert list(ens_float['model'].values) == list(ens['model'].values)
+    assert np.array_equal(ens_float.values, ens.values)
+
+    stats = Crust.moho.get_ensemble(registry, lons, lats, crthick=True, stats=['mean', 'median', 'p95'], max_workers=1)
+    assert np.allclose(stats.sel(stat='mean').values, ens.values.mean(axis=0))
+    assert np.allclose(stats.sel(stat='median').values, np.median(ens.values, axis=0))
+    assert np.allclose(stats.sel(stat='p95').values, np.percentile(ens.values, 95, axis=0))
+
+
+
+def test_ensemble_invalid():
+    registry = Crust.moho.get_registry().head(2)
+    with pytest.raises(ValueError, match='missing columns'):
+        Crust.moho.get_ensemble(registry.drop(columns='rho_north'), 0, 0)
+    with pytest.raises(ValueError, match='Unknown statistic'):
+        Crust.moho.get_ensemble(registry, 0, 0, stats=['meow'])
+
+
+
+def test_get_sh_exact():
+    ## exact evaluation agrees with the pre-expanded grid at grid nodes
+    Crust.moho.load('Khan2022', 39, 2700, 2700)
+    dat = Crust.moho.get_dataset()
+    lons = dat.lon[::10]
+    lats = dat.lat[::10]
+    for crthick in [False, True]:
+        assert np.allclose(
+            Crust.moho.get(lons, lats, crthick=crthick, interp='sh_exact'),
+            Crust.moho.get(lons, lats, crthick=crthick),
+        )
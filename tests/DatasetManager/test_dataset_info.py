@@ -1,7 +1,10 @@
 import pytest
+import pandas as pd
 
 from redplanet.DatasetManager.dataset_info import (
     _get_download_info,
+    _get_download_info_moho,
+    _get_moho_registry,
     DatasetNotFoundError,
     MohoDatasetNotFoundError,
 )
@@ -20,3 +23,37 @@ class Test__get_download_info:
     def test__get_download_info__invalid_dataset(self):
         with pytest.raises( DatasetNotFoundError ):
             _get_download_info(name='https://fauux.neocities.org/')
+
+
+
+## `_get_download_info_moho` (internal function) -- looks up a Moho model in the (cached) registry
+class Test__get_download_info_moho:
+
+    @staticmethod
+    def write_registry(fpath, model_names):
+        pd.DataFrame({
+            'model_name'       : model_names,
+            'box_download_code': [f'code{i}' for i in range(len(model_names))],
+            'sha1'             : [f'sha{i}' for i in range(len(model_names))],
+        }).to_csv(fpath, index=False)
+
+    ## Valid input, and the registry is only parsed once
+    def test__get_download_info_moho__cached(self, tmp_path):
+        fpath = tmp_path / 'moho_registry.csv'
+        self.write_registry(fpath, ['Khan2022-38-2900-2900', 'Khan2022-39-2700-2700'])
+
+        result = _get_download_info_moho('Khan2022-39-2700-2700', fpath)
+        assert result['url'].endswith('/code1')
+        assert result['hash'] == {'sha1': 'sha1'}
+        assert _get_moho_registry(fpath)[0] is _get_moho_registry(fpath)[0]
+
+        ## registry is re-parsed if the file changes
+        self.write_registry(fpath, ['Khan2022-39-2700-2700'])
+        assert _get_download_info_moho('Khan2022-39-2700-2700', fpath)['url'].endswith('/code0')
+
+    ## Invalid input: model not in registry
+    def test__get_download_info_moho__invalid_model(self, tmp_path):
+        fpath = tmp_path / 'moho_registry.csv'
+        self.write_registry(fpath, ['Khan2022-38-2900-2900'])
+        with pytest.raises( MohoDatasetNotFoundError ):
+            _get_download_info_moho('Khan2022-0-0-0', fpath)
@@ -0,0 +1,32 @@
+import numpy as np
+
+from redplanet.user_config import set_dirpath_datacache
+from redplanet.DatasetManager.derived import (
+    _get_dirpath_derived,
+    _load_derived,
+    _save_derived,
+)
+
+
+
+## `_save_derived` / `_load_derived` (internal functions) -- cache derived products as memory-mapped `.npy` files
+def test__save_load_derived(tmp_path):
+    set_dirpath_datacache(tmp_path)
+    dirpath = _get_dirpath_derived('Crust/moho/expanded/', 'meow-lmax90-abc')
+    assert dirpath == tmp_path / 'Crust' / 'moho' / 'expanded' / 'meow-lmax90-abc'
+
+    ## nothing saved yet
+    assert _load_derived(dirpath, ['a', 'b']) is None
+
+    arrays = {'a': np.arange(10.), 'b': np.ones((3, 4))}
+    _save_derived(dirpath, arrays)
+    loaded = _load_derived(dirpath, ['a', 'b'])
+    for name, array in arrays.items():
+        assert isinstance(loaded[name], np.memmap)
+        assert np.array_equal(loaded[name], array)
+        assert not loaded[name].flags.writeable
+
+    ## no temporary directories left behind, and saving again (e.g. a concurrent process) keeps the existing product
+    _save_derived(dirpath, {'a': np.zeros(10), 'b': np.zeros((3, 4))})
+    assert np.array_equal(_load_derived(dirpath, ['a'])['a'], arrays['a'])
+    assert [p.name for p in dirpath.parent.iterdir()] == [dirpath.name]
@@ -1,7 +1,11 @@
+import time
+
 import pytest
 import numpy as np
 
 from redplanet import Mag
+from redplanet.user_config import set_dirpath_datacache
+from redplanet.DatasetManager.hash import _calculate_hash_from_file
 
 
 
@@ -17,6 +21,33 @@ def test_load_get_valid():
     assert np.allclose(near['distance_km'], 283.51013951489193)
 
 
+def test_get_nearest_k():
+    ## matches sorting every dipole by distance
+    rng = np.random.default_rng(0)
+    lon = rng.uniform(-180, 360, 50)
+    lat = rng.uniform(-90, 90, 50)
+
+    idx, distance_km = Mag.depth.get_nearest_k(lon, lat, k=3)
+    assert idx.shape == distance_km.shape == (50, 3)
+
+    for i in range(50):
+        near = Mag.depth.get_nearest(lon[i], lat[i])
+        assert np.allclose(distance_km[i], near['distance_km'].to_numpy()[:3])
+
+    idx, distance_km = Mag.depth.get_nearest_k(10, 10)
+    assert idx.shape == (1,)
+    assert np.allclose(distance_km, 283.51013951489193)
+
+    df = Mag.depth.get_nearest_k([10, 20], 10, k=2, as_dataframe=True)
+    assert df.shape == (4, 9)
+    assert df['point'].tolist() == [0, 0, 1, 1]
+    assert df['rank'].tolist() == [0, 1, 0, 1]
+
+    with pytest.raises(ValueError, match='must be in range'):
+        Mag.depth.get_nearest_k(0, 0, k=0)
+
+
+
 def test_get_grid():
     ### global mean
     lons = np.linspace(-180, 360, 100)
@@ -31,3 +62,100 @@ def test_get_grid():
         Mag.depth.get_grid(lons+360, lats, 'depth_km'),
         equal_nan=True,
     )
+
+
+
+def test_get_grid__exact():
+    lons = np.linspace(-180, 360, 200)
+    lats = np.linspace(-90, 90, 100)
+
+    ## exact nearest dipoles match `get_nearest_k` at every point
+    lon_2d, lat_2d = np.meshgrid(lons, lats)
+    idx, _ = Mag.depth.get_nearest_k(lon_2d, lat_2d)
+    chi2 = Mag.depth.get_dataset()['chi2_reduced'].to_numpy()
+    assert np.array_equal(Mag.depth.get_grid(lons, lats, 'chi2_reduced', method='exact'), chi2[idx[..., 0]])
+
+    ## the raster only differs near boundaries between dipoles
+    exact  = Mag.depth.get_grid(lons, lats, 'depth_km', method='exact')
+    raster = Mag.depth.get_grid(lons, lats, 'depth_km')
+    assert exact.shape == raster.shape == (3, 100, 200)
+    assert np.mean(np.all((exact == raster) | np.isnan(exact), axis=0)) > 0.95
+
+    ## scalar inputs
+    assert Mag.depth.get_grid(10, 10, 'chi2_reduced', method='exact') == Mag.depth.get_nearest(10, 10)['chi2_reduced'].iloc[0]
+
+    with pytest.raises(ValueError, match='Unknown method'):
+        Mag.depth.get_grid(lons, lats, 'depth_km', method='meow')
+    with pytest.raises(ValueError, match='multiple'):
+        Mag.depth.get_grid(lons, lats, 'depth_km', resolution=0.7)
+
+
+
+def test_get_grid__resolution(tmp_path):
+    set_dirpath_datacache(tmp_path)
+
+    ## a finer raster (computed and cached) agrees with the exact method at its nodes
+    lons = np.arange(-180, 180, 2)
+    lats = np.arange(-90, 90.1, 2)
+    fine = Mag.depth.get_grid(lons, lats, 'chi2_reduced', resolution=0.25)
+    assert np.array_equal(fine, Mag.depth.get_grid(lons, lats, 'chi2_reduced', method='exact'))
+    assert len(list((tmp_path / 'Mag' / 'depth' / 'nearest_dipoles').iterdir())) == 1
+
+
+
+def test_get_grid__raster_loaded_lazily(monkeypatch):
+    ## the downloaded 0.5 degree raster is only needed for `method='raster', resolution=0.5`
+    from redplanet.Mag.depth import loader
+
+    def fail():
+        raise AssertionError('The default raster should not be loaded.')
+
+    Mag.depth.get_dataset()
+    monkeypatch.setattr(loader, '_dat_nearest_dipole', None)
+    monkeypatch.setattr(loader, '_load_nearest_dipole', fail)
+
+    Mag.depth.get_grid(np.arange(-180, 180, 10), np.arange(-90, 90.1, 10), 'depth_km', method='exact')
+    assert Mag.depth.build_nearest_raster(2, max_workers=1).shape == (91, 181)
+    with pytest.raises(AssertionError, match='should not be loaded'):
+        Mag.depth.get_grid(10, 10, 'depth_km')
+
+
+
+def test_build_nearest_raster(tmp_path):
+    ## regenerating the default raster reproduces the downloaded one
+    _, dat_nearest_dipole = Mag.depth.get_dataset(_extras=True)
+    raster = Mag.depth.build_nearest_raster(0.5, max_workers=1)
+    assert raster.dtype == np.int16
+    assert raster.shape == dat_nearest_dipole.data_dict['dat'].shape == (361, 721)
+    assert np.mean(raster == dat_nearest_dipole.data_dict['dat']) > 0.999
+
+    ## splitting rows across processes gives the same result, and the hash matches the saved file
+    fpath_out = tmp_path / 'raster.npy'
+    raster_parallel, calculated_hash = Mag.depth.build_nearest_raster(0.5, fpath_out=fpath_out, max_workers=2)
+    assert np.array_equal(raster_parallel, raster)
+    assert np.array_equal(np.load(fpath_out), raster)
+    assert calculated_hash == {'xxh3_64': _calculate_hash_from_file(fpath_out, 'xxh3_64')}
+
+    with pytest.raises(ValueError, match='multiple'):
+        Mag.depth.build_nearest_raster(0.7)
+
+
+
+@pytest.mark.parametrize('resolution', [0.1, 0.01])
+def test_get_grid__benchmark(resolution):
+    ## ~6.5 million points either way: global at 0.1 degrees, or a 36x18 degree window at 0.01 degrees (a global 0.01 degree grid of a three-level column alone would be ~15 GB)
+    extent = 1 if resolution == 0.1 else 0.1
+    lons = np.arange(-180 * extent, 180 * extent, resolution)
+    lats = np.arange(-90 * extent, 90 * extent, resolution)
+    Mag.depth.get_dataset()
+
+    t0 = time.perf_counter()
+    raster = Mag.depth.get_grid(lons, lats, 'chi2_reduced')
+    t_raster = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    exact = Mag.depth.get_grid(lons, lats, 'chi2_reduced', method='exact')
+    t_exact = time.perf_counter() - t0
+
+    print(f'\n\t{resolution} degree grid ({lons.size * lats.size:.1e} points): raster = {t_raster:.3f} s, exact = {t_exact:.3f} s, agreement = {np.mean(raster == exact):.2%}')
+    assert np.mean(raster == exact) > 0.95
@@ -29,3 +29,22 @@ def test_load_get_valid():
         Mag.sh.get(lons    , lats),
         Mag.sh.get(lons+360, lats)
     )
+
+
+def test_get_sh_exact():
+    ## exact evaluation agrees with the pre-expanded grid at grid nodes, and supports altitude
+    Mag.sh.load('Langlais2019')
+    dat = Mag.sh.get_dataset()
+    lons = dat.lon[::20]
+    lats = dat.lat[5:-5:20]
+    for quantity in ['radial', 'total']:
+        assert np.allclose(
+            Mag.sh.get(lons, lats, quantity, interp='sh_exact'),
+            Mag.sh.get(lons, lats, quantity),
+        )
+
+    lons = np.linspace(0, 360, 50)
+    assert np.abs(Mag.sh.get(lons, 0, interp='sh_exact', altitude=150)).max() < np.abs(Mag.sh.get(lons, 0, interp='sh_exact')).max()
+
+    with pytest.raises(ValueError, match='altitude'):
+        Mag.sh.get(0, 0, altitude=150)
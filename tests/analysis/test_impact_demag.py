@@ -0,0 +1,111 @@
+import pytest
+import numpy as np
+
+from redplanet.analysis.impact_demag import (
+    compute_pressure,
+    compute_pressure_batch,
+    compute_demag_radius,
+)
+
+
+
+def test_compute_pressure__blocks():
+    ## evaluating in (tiny) row blocks gives the same result as a single block
+    x = np.linspace(-200, 200, 101)
+    y = np.linspace(0, 150, 77)
+
+    expected = compute_pressure(100, x, y)
+    assert expected.shape == (77, 101)
+    assert np.isfinite(expected).all()
+
+    for max_block_bytes in [1, 10_000]:
+        assert np.array_equal(compute_pressure(100, x, y, max_block_bytes=max_block_bytes), expected)
+
+
+def test_compute_pressure__isobaric_core():
+    ## directly below the impact point at depth R_ic, the direct wave has the isobaric core pressure and the reflected wave arrives after the rise time
+    _, params = compute_pressure(100, 0, 0, return_params=True)
+    R_ic = params['isobaric_radius_km']
+    u_ic = params['u_ic_km_s'] * 1e3
+    expected = 2900 * u_ic * (3.5e3 + 1.5*u_ic) * 1e-9
+
+    P_eff = compute_pressure(100, 0, R_ic)
+    assert P_eff.shape == ()
+    assert np.isclose(P_eff, expected)
+
+    ## at the surface above the center, the direct and reflected waves cancel
+    assert np.isclose(compute_pressure(100, 0, 0), 0)
+
+
+def test_compute_pressure__out():
+    x = np.linspace(-200, 200, 101)
+    y = np.linspace(0, 150, 77)
+    expected = compute_pressure(100, x, y)
+
+    assert compute_pressure(100, x, y, dtype=np.float32).dtype == np.float32
+    assert np.allclose(compute_pressure(100, x, y, dtype=np.float32), expected, rtol=1e-6)
+
+    out = np.empty((77, 101))
+    P_eff, params = compute_pressure(100, x, y, out=out, return_params=True)
+    assert P_eff is out
+    assert np.array_equal(out, expected)
+
+    ## squeezed shape is also accepted
+    out = np.empty(101)
+    assert compute_pressure(100, x, 10, out=out) is out
+    assert np.array_equal(out, compute_pressure(100, x, 10))
+
+    with pytest.raises(ValueError, match='shape'):
+        compute_pressure(100, x, y, out=np.empty((101, 77)))
+
+
+def test_compute_pressure_batch():
+    ## broadcasting diameters against impact parameters matches one `compute_pressure` call per case
+    x = np.linspace(-300, 300, 61)
+    y = np.linspace(0, 100, 21)
+    diameter_km = np.array([[5], [50], [300]])
+    v_proj_km_s = np.array([8, 10, 15, 20])
+    pressure_decay_const = np.array([1.5, 1.87, 2.2, 2.5])
+
+    P_eff, params = compute_pressure_batch(
+        diameter_km, x, y,
+        v_proj_km_s          = v_proj_km_s,
+        pressure_decay_const = pressure_decay_const,
+        return_params        = True,
+        max_block_bytes      = 10_000,  ## tiny blocks, to exercise blocking
+    )
+    assert P_eff.shape == (3, 4, 21, 61)
+    assert params['isobaric_radius_km'].shape == (3, 4)
+
+    for i in range(3):
+        for j in range(4):
+            expected, expected_params = compute_pressure(
+                diameter_km[i, 0], x, y,
+                v_proj_km_s          = v_proj_km_s[j],
+                pressure_decay_const = pressure_decay_const[j],
+                return_params        = True,
+            )
+            assert np.allclose(P_eff[i, j], expected, rtol=1e-12, atol=0)
+            for key, value in expected_params.items():
+                assert np.isclose(params[key][i, j], value), key
+
+    with pytest.raises(ValueError, match='broadcastable'):
+        compute_pressure_batch([10, 20], x, y, v_proj_km_s=[10, 15, 20])
+
+
+def test_compute_demag_radius():
+    x = np.linspace(0, 200, 401)
+    y = np.array([0, 5, 10, 20])
+    diameter_km = np.array([5, 50, 300])
+    pressure_threshold_GPa = np.array([[1], [2], [1e9]])
+
+    radius_km = compute_demag_radius(diameter_km, x, y, pressure_threshold_GPa=pressure_threshold_GPa, max_block_bytes=10_000)
+    assert radius_km.shape == (3, 3)
+
+    for i in range(3):
+        for j in range(3):
+            reached = (compute_pressure(diameter_km[j], x, y) >= pressure_threshold_GPa[i, 0]).any(axis=0)
+            assert radius_km[i, j] == (x[reached].max() if reached.any() else 0)
+
+    assert (radius_km[2] == 0).all()
+    assert radius_km[0, 2] > 0
@@ -0,0 +1,318 @@
+import pytest
+import numpy as np
+
+from redplanet.analysis import radial_profile
+from redplanet.helper_functions.GriddedData import GriddedData
+
+
+
+def make_gridded_data() -> GriddedData:
+    ## synthetic 1-degree global grid with a smooth field
+    lon = np.arange(-180, 180, 1.)
+    lat = np.arange(-90, 90.1, 1.)
+    dat = np.sin(np.radians(lat))[:, None] * 100 + np.cos(np.radians(lon))[None, :] * 50
+    return GriddedData(
+        lon       = lon,
+        is_slon   = True,
+        lat       = lat,
+        data_dict = {'dat': dat},
+        metadata  = {},
+    )
+
+
+_gd = make_gridded_data()
+
+
+def accessor(lon, lat, pointwise=False):
+    ## RedPlanet-style getter (module-level so it can be pickled for process pools)
+    return _gd.get_values(lon, lat, 'dat', pointwise=pointwise)
+
+
+
+def test_get_concentric_ring_coords_flat():
+    ## reference: one `make_circle` call per ring (the original implementation of `get_concentric_ring_coords`)
+    radii = np.arange(0, 100, 5)
+    num_points = np.maximum(10, np.ceil(2 * np.pi * radii / 5).astype(int))
+    expected = [
+        radial_profile.geodesy.make_circle(10, 20, radius=r * 1e3, n_samples=n, endpoint=False)
+        for (r, n) in zip(radii, num_points)
+    ]
+
+    ring_radius_km__per_ring, ring_offsets, ring_coords = radial_profile.get_concentric_ring_coords_flat(10, 20, radius_km=100)
+    assert np.array_equal(ring_radius_km__per_ring, radii)
+    assert np.array_equal(np.diff(ring_offsets), [len(x) for x in expected])
+    assert ring_coords.shape == (ring_offsets[-1], 2)
+    assert np.allclose(ring_coords, np.concatenate(expected), rtol=0, atol=1e-9)
+
+    ## the per-ring version is a view of the same points
+    _, ring_coords__per_ring = radial_profile.get_concentric_ring_coords(10, 20, radius_km=100)
+    for (x, y) in zip(ring_coords__per_ring, expected):
+        assert np.allclose(x, y, rtol=0, atol=1e-9)
+
+    ## many centers at once, with the same layout for every center
+    lon, lat = np.array([10, -120, 300]), np.array([20, -60, 5])
+    _, offsets, coords = radial_profile.get_concentric_ring_coords_flat(lon, lat, radius_km=100)
+    assert np.array_equal(offsets, ring_offsets)
+    assert coords.shape == (3, ring_offsets[-1], 2)
+    for i in range(lon.size):
+        assert np.allclose(coords[i], radial_profile.get_concentric_ring_coords_flat(lon[i], lat[i], radius_km=100)[2], rtol=0, atol=1e-9)
+
+    with pytest.raises(ValueError, match='same shape'):
+        radial_profile.get_concentric_ring_coords_flat(lon, lat[:2], radius_km=100)
+    with pytest.raises(ValueError, match='Cannot provide both'):
+        radial_profile.get_concentric_ring_coords_flat(10, 20, radius_km=100, dist_btwn_rings_km=5, num_rings=10)
+
+
+def test_ring_spacing():
+    ## a non-default spacing between rings is used by every function that lays out rings
+    radii = np.arange(0, 100, 12.5)
+    ring_radius_km__per_ring, ring_offsets, _ = radial_profile.get_concentric_ring_coords_flat(10, 20, radius_km=100, dist_btwn_rings_km=12.5)
+    assert np.array_equal(ring_radius_km__per_ring, radii)
+    assert np.array_equal(np.diff(ring_offsets), np.maximum(10, np.ceil(2 * np.pi * radii / 5).astype(int)))
+    assert np.array_equal(radial_profile.get_concentric_ring_coords(10, 20, radius_km=100, dist_btwn_rings_km=12.5)[0], radii)
+
+    grid = radial_profile.get_polar_grid(10, 20, radius_km=100, accessor=accessor, num_azimuths=4, dist_btwn_rings_km=12.5)
+    assert np.array_equal(grid['radius_km'], radii)
+
+    ds = radial_profile.get_profiles({'a': accessor}, lon=[10], lat=[20], radius_km=100, dist_btwn_rings_km=12.5)
+    assert np.array_equal(ds['num_rings'], [radii.size])
+    assert np.array_equal(ds['radius_km'][0], radii)
+
+
+
+def test_get_profile__vectorized():
+    _, ring_coords__per_ring = radial_profile.get_concentric_ring_coords(10, 20, radius_km=100)
+
+    ## reference: scalar accessor called once per point
+    expected_vals = [np.array([accessor(lon, lat) for (lon, lat) in ring_coords]) for ring_coords in ring_coords__per_ring]
+    expected_avg = np.array([vals.mean() for vals in expected_vals])
+    expected_sigma = np.array([vals.std() for vals in expected_vals])
+
+    calls = []
+    def counting_accessor(lon, lat):
+        calls.append(np.size(lon))
+        return _gd.get_values(lon, lat, 'dat', pointwise=True)
+
+    for (acc, vectorized) in [(accessor, None), (counting_accessor, True), (lambda lon, lat: accessor(lon, lat), None)]:
+        avg_vals, sigmas, vals = radial_profile.get_profile(ring_coords__per_ring, acc, return_stats=True, vectorized=vectorized)
+        assert np.allclose(avg_vals, expected_avg)
+        assert np.allclose(sigmas, expected_sigma)
+        assert len(vals) == len(expected_vals)
+        for (x, y) in zip(vals, expected_vals):
+            assert np.allclose(x, y)
+
+    ## vectorized accessors are called once for all points
+    assert calls == [sum(len(ring_coords) for ring_coords in ring_coords__per_ring)]
+
+    assert np.allclose(radial_profile.get_profile(ring_coords__per_ring, accessor, vectorized=False), expected_avg)
+
+    with pytest.raises(ValueError, match='one value per'):
+        radial_profile.get_profile(ring_coords__per_ring, lambda lon, lat: np.zeros(3), vectorized=True)
+
+
+
+def test_get_profile_stats__single_point_chunk():
+    _, ring_offsets, _ = radial_profile.get_concentric_ring_coords_flat(10, 20, radius_km=50)
+    num_points = ring_offsets[-1]
+    _, expected = radial_profile.get_profile_stats(10, 20, 50, accessor)
+
+    ## the last chunk has a single point, and some accessors return a scalar for a single point
+    squeezing_accessor = lambda lon, lat: np.squeeze(_gd.get_values(lon, lat, 'dat', pointwise=True)).tolist()
+    for acc, vectorized in [(accessor, None), (squeezing_accessor, True)]:
+        _, stats = radial_profile.get_profile_stats(10, 20, 50, acc, vectorized=vectorized, max_chunk_points=num_points-1)
+        for stat in expected:
+            assert np.allclose(stats[stat], expected[stat])
+
+    ## coordinates are generated per chunk, so the accessor never sees more than `max_chunk_points` points
+    sizes = []
+    def recording_accessor(lon, lat):
+        sizes.append(lon.size)
+        return accessor(lon, lat, pointwise=True)
+    _, stats = radial_profile.get_profile_stats(10, 20, 50, recording_accessor, vectorized=True, max_chunk_points=7)
+    assert max(sizes) == 7 and sum(sizes) == num_points
+    for stat in expected:
+        assert np.allclose(stats[stat], expected[stat])
+
+    ## same for a profile where one ring has a single point
+    single = (np.array([[10., 20.]]),)
+    assert np.allclose(radial_profile.get_profile(single, squeezing_accessor, vectorized=True), accessor(10, 20))
+
+
+
+def test_get_polar_grid():
+    grid = radial_profile.get_polar_grid(10, 20, radius_km=180, accessor=accessor, num_azimuths=8, num_rings=10)
+    assert grid.dims == ('radius_km', 'azimuth')
+    assert grid.shape == (10, 8)
+    assert np.allclose(grid['radius_km'], np.linspace(0, 180, 10))
+    assert np.allclose(grid['azimuth'], 22.5 + 45 * np.arange(8))
+    assert np.all(grid['num_points'] >= 1)
+    assert (grid.attrs['lon'], grid.attrs['lat']) == (10, 20)
+
+    ## the center ring is a single point repeated in every sector
+    assert np.allclose(grid[0], accessor(10, 20))
+
+    ## sampling only sector centers matches a direct lookup
+    grid = radial_profile.get_polar_grid(10, 20, radius_km=180, accessor=accessor, num_azimuths=8, num_rings=10, dist_btwn_points_km=None)
+    radii, azimuths = np.meshgrid(grid['radius_km'], grid['azimuth'], indexing='ij')
+    coords = radial_profile.geodesy.move_forward(start=[10, 20], azimuth=azimuths.ravel(), distance=radii.ravel() * 1e3)
+    assert np.allclose(grid.values.ravel(), accessor(coords[:, 0], coords[:, 1], pointwise=True))
+
+    ## the azimuthal average is a full-ring average, close to `get_profile` up to sampling differences
+    _, ring_coords__per_ring = radial_profile.get_concentric_ring_coords(10, 20, radius_km=180, num_rings=10)
+    profile = radial_profile.get_profile(ring_coords__per_ring, accessor)
+    grid = radial_profile.get_polar_grid(10, 20, radius_km=180, accessor=accessor, num_azimuths=8, num_rings=10)
+    assert np.allclose(grid.mean('azimuth'), profile, atol=1)
+
+
+def test_get_polar_grid__single_sample():
+    squeezing_accessor = lambda lon, lat: np.squeeze(_gd.get_values(lon, lat, 'dat', pointwise=True)).tolist()
+    for acc, vectorized in [(accessor, None), (squeezing_accessor, True)]:
+        grid = radial_profile.get_polar_grid(10, 20, radius_km=50, accessor=acc, num_azimuths=1, num_rings=1, vectorized=vectorized)
+        assert grid.shape == (1, 1)
+        assert np.isclose(grid.item(), accessor(10, 20))
+
+    with pytest.raises(ValueError, match='at least 1'):
+        radial_profile.get_polar_grid(10, 20, radius_km=50, accessor=accessor, num_azimuths=0)
+
+
+
+def test_get_profiles():
+    lon = np.array([10, -120, 300, 45])
+    lat = np.array([20, -60, 5, 80])
+    radius_km = np.array([50, 20, 0, 35])  ## different numbers of rings, including none
+
+    results = {
+        executor: radial_profile.get_profiles({'a': accessor, 'b': accessor}, lon=lon, lat=lat, radius_km=radius_km, executor=executor, max_workers=2, progress=(executor == 'thread'))
+        for executor in ['serial', 'thread', 'process']
+    }
+    ds = results['serial']
+    assert ds['mean'].dims == ('crater', 'ring', 'quantity')
+    assert np.array_equal(ds['num_rings'], [10, 4, 0, 7])
+    assert ds['mean'].shape == (4, 10, 2)
+    assert np.array_equal(ds['lon'], lon)
+
+    ## matches single profiles, padded with NaN
+    for i in range(lon.size):
+        n = ds['num_rings'].values[i]
+        _, ring_coords__per_ring = radial_profile.get_concentric_ring_coords(lon[i], lat[i], radius_km[i])
+        avg_vals, sigmas, _ = radial_profile.get_profile(ring_coords__per_ring, accessor, return_stats=True)
+        for quantity in ['a', 'b']:
+            assert np.allclose(ds['mean'].sel(quantity=quantity)[i, :n], avg_vals)
+            assert np.allclose(ds['std'].sel(quantity=quantity)[i, :n], sigmas)
+        assert np.all(np.isnan(ds['mean'][i, n:]))
+        assert np.all(np.isnan(ds['radius_km'][i, n:]))
+
+    ## pools return centers in input order
+    for executor in ['thread', 'process']:
+        assert results[executor].identical(ds)
+
+    with pytest.raises(ValueError, match='Unknown executor'):
+        radial_profile.get_profiles({'a': accessor}, lon=lon, lat=lat, radius_km=radius_km, executor='gpu')
+
+
+
+def test_get_profile_stats():
+    ring_kwargs = dict(lon=10, lat=20, radius_km=1500, num_rings=6, dist_btwn_points_km=0.5)
+    ring_radius_km__per_ring, ring_coords__per_ring = radial_profile.get_concentric_ring_coords(**ring_kwargs)
+    vals__per_ring = [accessor(ring_coords[:, 0], ring_coords[:, 1], pointwise=True) for ring_coords in ring_coords__per_ring]
+    assert max(len(vals) for vals in vals__per_ring) > 10_000  ## large enough for approximate quantiles
+
+    stats = ['mean', 'std', 'var', 'min', 'max', 'count', 'count_nan', 'median', 'p5', 'p97.5']
+    for max_chunk_points in [2**18, 1000, 7]:
+        radii, result = radial_profile.get_profile_stats(accessor=accessor, stats=stats, max_chunk_points=max_chunk_points, **ring_kwargs)
+        assert np.array_equal(radii, ring_radius_km__per_ring)
+        assert list(result) == stats
+
+        ## exact statistics
+        assert np.allclose(result['mean'], [vals.mean() for vals in vals__per_ring])
+        assert np.allclose(result['std'], [vals.std() for vals in vals__per_ring])
+        assert np.allclose(result['var'], [vals.var() for vals in vals__per_ring])
+        assert np.array_equal(result['min'], [vals.min() for vals in vals__per_ring])
+        assert np.array_equal(result['max'], [vals.max() for vals in vals__per_ring])
+        assert np.array_equal(result['count'], [vals.size for vals in vals__per_ring])
+        assert np.array_equal(result['count_nan'], np.zeros(len(vals__per_ring)))
+
+        ## approximate quantiles, between the exact percentiles at q +/- 2 (values on a grid are stepped, so estimates can fall between steps)
+        for stat, q in [('median', 50), ('p5', 5), ('p97.5', 97.5)]:
+            for value, vals in zip(result[stat], vals__per_ring):
+                lower, upper = np.percentile(vals, [max(0, q - 2), min(100, q + 2)])
+                assert lower <= value <= upper
+
+    ## small rings are summarized exactly
+    _, result = radial_profile.get_profile_stats(accessor=accessor, stats=['median', 'p5'], **ring_kwargs)
+    assert np.isclose(result['median'][0], np.median(vals__per_ring[0]))
+    assert np.isclose(result['p5'][0], np.percentile(vals__per_ring[0], 5))
+
+    ## no rings
+    radii, result = radial_profile.get_profile_stats(10, 20, 0, accessor, stats=['mean', 'count'])
+    assert radii.size == 0 and result['mean'].size == 0 and result['count'].size == 0
+
+    with pytest.raises(ValueError, match='Unknown statistic'):
+        radial_profile.get_profile_stats(accessor=accessor, stats=['p101'], **ring_kwargs)
+    with pytest.raises(ValueError, match='Cannot provide both'):
+        radial_profile.get_profile_stats(10, 20, 50, accessor, dist_btwn_rings_km=5, num_rings=10)
+
+
+def test_get_profile_stats__empty_rings(monkeypatch):
+    ## the ring layout never has empty rings, but segmented reductions must not leak values from the next ring into an empty one
+    ring_radius_km__per_ring = np.array([0., 10., 20., 30., 40.])
+    num_points__per_ring = np.array([10, 0, 0, 63, 0])
+    monkeypatch.setattr(radial_profile, '_get_ring_layout', lambda *args: (ring_radius_km__per_ring, num_points__per_ring))
+
+    _, ring_offsets, ring_coords = radial_profile.get_concentric_ring_coords_flat(10, 20, radius_km=50)
+    vals = accessor(ring_coords[:, 0], ring_coords[:, 1], pointwise=True)
+    for max_chunk_points in [2**18, 10, 7]:
+        radii, result = radial_profile.get_profile_stats(10, 20, 50, accessor, stats=['mean', 'std', 'min', 'count', 'count_nan', 'median'], max_chunk_points=max_chunk_points)
+        assert np.array_equal(radii, ring_radius_km__per_ring)
+        assert np.array_equal(result['count'], num_points__per_ring)
+        assert np.array_equal(result['count_nan'], np.zeros(5))
+        empty = num_points__per_ring == 0
+        for stat in ['mean', 'std', 'min', 'median']:
+            assert np.all(np.isnan(result[stat][empty]))
+        assert np.allclose(result['mean'][~empty], [vals[:10].mean(), vals[10:].mean()])
+        assert np.allclose(result['std'][~empty], [vals[:10].std(), vals[10:].std()])
+
+
+def test_get_profile_stats__nodata():
+    _, ring_coords__per_ring = radial_profile.get_concentric_ring_coords(10, 20, radius_km=50)
+    ring_kwargs = dict(lon=10, lat=20, radius_km=50)
+
+    ## every third point is NaN, and every fifth point is a nodata sentinel
+    def accessor_nodata(lon, lat):
+        vals = accessor(lon, lat, pointwise=True).copy()
+        index = np.arange(vals.size)
+        vals[index % 3 == 0] = np.nan
+        vals[index % 5 == 0] = -9999
+        return vals
+
+    ring_offsets = np.concatenate([[0], np.cumsum([len(ring_coords) for ring_coords in ring_coords__per_ring])])
+    all_vals = accessor_nodata(*np.concatenate(ring_coords__per_ring).T)
+    vals__per_ring = [all_vals[i0:i1] for (i0, i1) in zip(ring_offsets[:-1], ring_offsets[1:])]
+
+    _, result = radial_profile.get_profile_stats(accessor=accessor_nodata, stats=['mean', 'count', 'count_nan'], vectorized=True, nodata=-9999, **ring_kwargs)
+    valid__per_ring = [vals[~np.isnan(vals) & (vals != -9999)] for vals in vals__per_ring]
+    assert np.array_equal(result['count'], [valid.size for valid in valid__per_ring])
+    assert np.array_equal(result['count_nan'], [vals.size - valid.size for (vals, valid) in zip(vals__per_ring, valid__per_ring)])
+    assert np.allclose(result['mean'], [valid.mean() for valid in valid__per_ring])
+
+    ## without `nodata`, the sentinel is treated as a value
+    _, result = radial_profile.get_profile_stats(accessor=accessor_nodata, stats=['count_nan'], vectorized=True, **ring_kwargs)
+    assert np.array_equal(result['count_nan'], [np.isnan(vals).sum() for vals in vals__per_ring])
+
+    ## rings without any valid values
+    _, result = radial_profile.get_profile_stats(accessor=lambda lon, lat: np.full(np.size(lon), np.nan), stats=['mean', 'median', 'count'], vectorized=True, **ring_kwargs)
+    assert np.all(np.isnan(result['mean'])) and np.all(np.isnan(result['median']))
+    assert np.array_equal(result['count'], np.zeros(len(ring_coords__per_ring)))
+
+
+def test_quantile_digest__small_batches():
+    ## many small updates with repeated values used to merge centroids far beyond the size allowed by the scale function
+    rng = np.random.default_rng(0)
+    vals = np.round(rng.normal(size=20_000) * 3)
+    digest = radial_profile._QuantileDigest(200)
+    for i in range(0, vals.size, 7):
+        digest.update(vals[i:i+7])
+    assert digest.weights.sum() == vals.size
+    for q in [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]:
+        value = digest.quantile(q)
+        assert np.mean(vals < value) - 0.005 <= q <= np.mean(vals <= value) + 0.005
@@ -0,0 +1,244 @@
+import pytest
+import numpy as np
+
+from redplanet.helper_functions.GriddedData import GriddedData
+
+
+
+def make_gridded_data() -> GriddedData:
+    ## synthetic 1-degree global grid where each value encodes its own (lat, lon) index
+    lon = np.arange(0, 360, 1.)
+    lat = np.arange(-90, 90.1, 1.)
+    dat = (np.arange(lat.size)[:, None] * 1000 + np.arange(lon.size)[None, :]).astype(np.float64)
+    return GriddedData(
+        lon       = lon,
+        is_slon   = False,
+        lat       = lat,
+        data_dict = {'dat': dat},
+        metadata  = {},
+    )
+
+
+def find_nearest(axis: np.ndarray, values: np.ndarray) -> np.ndarray:
+    ## brute-force nearest index, for reference
+    return np.abs(axis[None, :] - values[:, None]).argmin(axis=1)
+
+
+
+class Test__get_values__pointwise:
+
+    def test__matches_grid_diagonal(self):
+        gd = make_gridded_data()
+        rng = np.random.default_rng(0)
+        lons = rng.uniform(-180, 360, 50)
+        lats = rng.uniform(-90, 90, 50)
+
+        grid  = gd.get_values(lons, lats, 'dat')
+        pairs = gd.get_values(lons, lats, 'dat', pointwise=True)
+
+        assert pairs.shape == (50,)
+        assert np.array_equal(pairs, np.diagonal(grid))
+
+    def test__broadcast_scalar(self):
+        gd = make_gridded_data()
+        lons = np.array([10, 20, 30])
+        assert np.array_equal(
+            gd.get_values(lons, 45, 'dat', pointwise=True),
+            gd.get_values(lons, np.full(3, 45), 'dat', pointwise=True),
+        )
+        assert gd.get_values(10, 45, 'dat', pointwise=True) == gd.get_values(10, 45, 'dat')
+
+    def test__single_point_array(self):
+        gd = make_gridded_data()
+        vals = gd.get_values(np.array([10]), np.array([45]), 'dat', pointwise=True)
+        assert isinstance(vals, np.ndarray)
+        assert vals.shape == (1,)
+        assert vals[0] == gd.get_values(10, 45, 'dat', pointwise=True)
+
+        for interp in ['nearest', 'bilinear']:
+            assert gd.get_values([10], 45, 'dat', pointwise=True, interp=interp).shape == (1,)
+        assert isinstance(gd.get_values(10, 45, 'dat', pointwise=True, interp='bilinear'), float)
+
+    def test__2d_inputs(self):
+        gd = make_gridded_data()
+        lons = np.array([[10], [20], [30]])
+        lats = np.array([[0], [5], [10]])
+        vals = gd.get_values(lons, lats, 'dat', pointwise=True)
+        assert vals.shape == (3, 1)
+        assert np.array_equal(vals[:, 0], gd.get_values(lons.ravel(), lats.ravel(), 'dat', pointwise=True))
+
+        ## broadcast shape
+        assert gd.get_values(lons, np.array([[0, 5]]), 'dat', pointwise=True).shape == (3, 2)
+
+    def test__as_xarray(self):
+        gd = make_gridded_data()
+        da = gd.get_values([10, 20], [0, 5], 'dat', pointwise=True, as_xarray=True)
+        assert da.dims == ('point',)
+        assert np.array_equal(da.lon.values, [10, 20])
+
+    def test__shape_mismatch(self):
+        gd = make_gridded_data()
+        with pytest.raises(ValueError, match='same shape'):
+            gd.get_values([10, 20, 30], [0, 5], 'dat', pointwise=True)
+
+
+
+def test__get_values__irregular_axis_fallback():
+    ## an irregular axis must give the same results as its regular counterpart (binary search vs arithmetic indexing)
+    gd = make_gridded_data()
+    assert gd._lon_step == 1 and gd._lat_step == 1
+
+    lon_irregular = gd.lon.copy()
+    lon_irregular[1:] += 1e-3 * np.sin(np.arange(1, lon_irregular.size))  ## perturb a bit, not enough to change which cell is closest
+    gd_irregular = GriddedData(
+        lon       = lon_irregular,
+        is_slon   = False,
+        lat       = gd.lat,
+        data_dict = dict(gd.data_dict),
+        metadata  = {},
+    )
+    assert gd_irregular._lon_step is None
+
+    rng = np.random.default_rng(1)
+    lons = rng.integers(-179, 359, 1000) + rng.uniform(-0.4, 0.4, 1000)
+    lats = rng.uniform(-90, 90, 1000)
+    assert np.array_equal(
+        gd.get_values(lons, lats, 'dat', pointwise=True),
+        gd_irregular.get_values(lons, lats, 'dat', pointwise=True),
+    )
+
+
+
+class Test__get_values__interp:
+
+    @staticmethod
+    def make_smooth(lon: np.ndarray, lat: np.ndarray, **kwargs) -> GriddedData:
+        ## smooth field which is periodic in longitude
+        dat = np.cos(np.radians(lat))[:, None] * np.sin(np.radians(lon))[None, :] + 0.01 * lat[:, None]
+        return GriddedData(lon=lon, lat=lat, data_dict={'dat': dat}, metadata={}, **kwargs)
+
+    @staticmethod
+    def truth(lon, lat):
+        return np.cos(np.radians(lat)) * np.sin(np.radians(lon)) + 0.01 * lat
+
+    def test__accuracy(self):
+        gd = self.make_smooth(np.arange(0, 360, 2.), np.arange(-90, 90.1, 2.), is_slon=False)
+        rng = np.random.default_rng(2)
+        lons = rng.uniform(-180, 360, 5000)
+        lats = rng.uniform(-88, 88, 5000)
+        truth = self.truth(lons, lats)
+
+        err = {
+            interp: np.abs(gd.get_values(lons, lats, 'dat', pointwise=True, interp=interp) - truth).max()
+            for interp in ['nearest', 'bilinear', 'bicubic']
+        }
+        assert err['bicubic'] < err['bilinear'] < err['nearest']
+        assert err['bicubic'] < 1e-4
+
+        ## grid mode matches pointwise mode
+        grid = gd.get_values(lons[:50], lats[:40], 'dat', interp='bicubic')
+        lon_2d, lat_2d = np.meshgrid(lons[:50], lats[:40])
+        assert np.allclose(grid, gd.get_values(lon_2d, lat_2d, 'dat', pointwise=True, interp='bicubic'))
+
+    def test__exact_at_grid_points(self):
+        gd = make_gridded_data()
+        lons = np.array([0., 17., 359.])
+        lats = np.array([-90., 3., 90.])
+        for interp in ['bilinear', 'bicubic']:
+            assert np.allclose(
+                gd.get_values(lons, lats, 'dat', interp=interp),
+                gd.get_values(lons, lats, 'dat'),
+            )
+
+    def test__wraparound(self):
+        ## signed longitudes with a seam at ±180, and positive longitudes with a duplicated 0/360 column (like pyshtools grids)
+        for lon, is_slon in [
+            (np.arange(-179.5, 180, 1.), True),
+            (np.linspace(0, 360, 181) , False),
+        ]:
+            gd = self.make_smooth(lon, np.arange(-90, 90.1, 1.), is_slon=is_slon)
+            assert gd._lon_wrap is not None
+            lons = np.array([-179.9, 179.9, 0.05, 359.95])
+            vals = gd.get_values(lons, 10, 'dat', pointwise=True, interp='bicubic')
+            assert np.allclose(vals, self.truth(lons, 10), atol=1e-4)
+
+    def test__nodata(self):
+        dat = np.full((10, 10), 100, dtype=np.int16)
+        dat[5, 5] = -9999
+        gd = GriddedData(
+            lon       = np.arange(10.),
+            is_slon   = False,
+            lat       = np.arange(10.),
+            data_dict = {'dat': dat},
+            metadata  = {},
+            nan_value = -9999,
+        )
+        vals = gd.get_values([4.5, 5, 2.5], [4.5, 4, 2.5], 'dat', pointwise=True, interp='bilinear')
+        assert np.isnan(vals[0])
+        assert np.allclose(vals[1:], 100)
+
+    def test__invalid(self):
+        gd = make_gridded_data()
+        with pytest.raises(ValueError, match='interpolation'):
+            gd.get_values(0, 0, 'dat', interp='meow')
+
+
+
+class Test__window:
+
+    @staticmethod
+    def make_memmap(tmp_path, is_slon: bool) -> GriddedData:
+        lon = np.arange(-179.5, 180, 1.) if is_slon else np.arange(0.5, 360, 1.)
+        lat = np.arange(-89.5, 90, 1.)
+        dat = np.memmap(tmp_path / 'dat.memmap', mode='w+', dtype=np.int16, shape=(lat.size, lon.size))
+        dat[:] = np.arange(lat.size)[:, None] * 10 + (np.arange(lon.size)[None, :] % 10)
+        dat.flush()
+        dat = np.memmap(tmp_path / 'dat.memmap', mode='r', dtype=np.int16, shape=(lat.size, lon.size))
+        return GriddedData(lon=lon, is_slon=is_slon, lat=lat, data_dict={'dat': dat}, metadata={'title': 'meow'})
+
+    def test__view(self, tmp_path):
+        gd = self.make_memmap(tmp_path, is_slon=True)
+        win = gd.window((-140, -100), (-10, 30), stride=2)
+
+        assert np.shares_memory(win.data_dict['dat'], gd.data_dict['dat'])
+        assert win.lon[0] >= -140 and win.lon[-1] <= -100
+        assert win.lat[0] >= -10  and win.lat[-1] <= 30
+        assert win._lon_step == 2
+        assert win.metadata['title'] == 'meow'
+
+        lons = np.linspace(-140, -100, 17)
+        lats = np.linspace(-9, 29, 13)
+        assert np.array_equal(
+            win.get_values(lons, lats, 'dat'),
+            gd.get_values(win.lon[find_nearest(win.lon, lons)], win.lat[find_nearest(win.lat, lats)], 'dat'),
+        )
+
+    def test__crossing(self, tmp_path):
+        for is_slon, lon_range in [(True, (170, -170)), (False, (350, 10))]:
+            gd = self.make_memmap(tmp_path, is_slon=is_slon)
+            win = gd.window(lon_range, (0, 10))
+
+            assert win.is_slon != gd.is_slon
+            assert np.all(np.diff(win.lon) > 0)
+            assert win.lon.size == 20
+
+            lons = np.array([lon_range[0] + 0.5, lon_range[1] - 0.5])
+            assert np.array_equal(
+                win.get_values(lons, 5.5, 'dat'),
+                gd.get_values(lons, 5.5, 'dat'),
+            )
+
+    def test__full(self, tmp_path):
+        gd = self.make_memmap(tmp_path, is_slon=False)
+        win = gd.window((-180, 180), (-90, 90))
+        assert np.array_equal(win.lon, gd.lon)
+        assert np.shares_memory(win.data_dict['dat'], gd.data_dict['dat'])
+
+    def test__invalid(self, tmp_path):
+        gd = self.make_memmap(tmp_path, is_slon=True)
+        with pytest.raises(ValueError, match='No grid points'):
+            gd.window((10.1, 10.2), (0, 10))
+        with pytest.raises(ValueError, match='stride'):
+            gd.window((0, 10), (0, 10), stride=0)
+        with pytest.raises(ValueError, match='both'):
+            gd.window((-10, -20), (0, 10))
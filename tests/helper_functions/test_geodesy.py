@@ -0,0 +1,130 @@
+import time
+
+import pytest
+import numpy as np
+import cartopy.geodesic as cg
+
+from redplanet.helper_functions import geodesy
+
+
+
+_cartopy_geodesic = cg.Geodesic(
+    radius     = geodesy._semimajor_m,
+    flattening = geodesy._flattening,
+)
+
+def random_points(num_points: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(-180, 360, num_points), rng.uniform(-90, 90, num_points)])
+
+def angle_diff(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.abs((a - b + 180) % 360 - 180)
+
+
+
+def test__get_distance__matches_cartopy():
+    start = random_points(100_000, seed=0)
+    end   = random_points(100_000, seed=1)
+
+    ## include a few special cases: coincident, meridional, equatorial, polar, and nearly antipodal (where Vincenty doesn't converge and we fall back to cartopy)
+    special_start = np.array([[10, 20], [10, -30], [0, 0], [0,  90], [ 0, 0], [ 10,  5]])
+    special_end   = np.array([[10, 20], [10,  40], [90, 0], [45, 80], [180, 0], [-170.2, -5]])
+    start = np.concatenate([start, special_start])
+    end   = np.concatenate([end, special_end])
+
+    actual   = geodesy.get_distance(start, end)
+    expected = _cartopy_geodesic.inverse(start, end)
+
+    assert actual.shape == (start.shape[0], 3)
+    assert np.allclose(actual[:, 0], expected[:, 0], rtol=0, atol=1e-3)  ## < 1 mm
+
+    ## azimuths are undefined for coincident points
+    nonzero = expected[:, 0] > 0
+    assert angle_diff(actual[nonzero, 1], expected[nonzero, 1]).max() < 1e-6
+    assert angle_diff(actual[nonzero, 2], expected[nonzero, 2]).max() < 1e-6
+
+    ## a single start point is broadcast
+    assert np.allclose(
+        geodesy.get_distance(start[0], end[:10]),
+        geodesy.get_distance(np.repeat(start[:1], 10, axis=0), end[:10]),
+    )
+
+
+
+def test__move_forward__matches_cartopy():
+    start = random_points(100_000)
+    rng = np.random.default_rng(2)
+    azimuth = rng.uniform(0, 360, start.shape[0])
+    distance = rng.uniform(0, 1e7, start.shape[0])
+
+    actual   = geodesy.move_forward(start, azimuth, distance)
+    expected = _cartopy_geodesic.direct(start, azimuth, distance)[:, :2]
+    assert angle_diff(actual[:, 0], expected[:, 0]).max() < 1e-7
+    assert np.abs(actual[:, 1] - expected[:, 1]).max() < 1e-7
+
+    ## circles
+    assert np.allclose(
+        geodesy.make_circle(10, 20, 1e5, n_samples=36),
+        _cartopy_geodesic.circle(10, 20, 1e5, n_samples=36),
+        rtol=0, atol=1e-9,
+    )
+
+
+
+def test__haversine():
+    start = random_points(10_000, seed=0)
+    end   = random_points(10_000, seed=1)
+
+    ## spherical distances are within ~1% of ellipsoidal distances
+    ellipsoid = geodesy.get_distance(start, end)
+    sphere    = geodesy.get_distance(start, end, method='haversine')
+    far = ellipsoid[:, 0] > 1e3
+    assert np.all(np.abs(sphere[far, 0] - ellipsoid[far, 0]) / ellipsoid[far, 0] < 0.01)
+
+    ## direct and inverse are consistent
+    rng = np.random.default_rng(2)
+    azimuth = rng.uniform(0, 360, start.shape[0])
+    distance = rng.uniform(0, 1e7, start.shape[0])
+    dest = geodesy.move_forward(start, azimuth, distance, method='haversine')
+    inverse = geodesy.get_distance(start, dest, method='haversine')
+    assert np.allclose(inverse[:, 0], distance, rtol=0, atol=1e-3)
+    assert angle_diff(inverse[:, 1], azimuth)[distance > 1e3].max() < 1e-6
+
+
+
+def test__invalid():
+    with pytest.raises(ValueError, match='Unknown method'):
+        geodesy.get_distance([0, 0], [1, 1], method='cartopy')
+    with pytest.raises(ValueError, match='same number of points'):
+        geodesy.get_distance(random_points(3), random_points(4))
+    with pytest.raises(ValueError, match='shape'):
+        geodesy.get_distance([0, 0, 0], [1, 1])
+    with pytest.raises(ValueError, match='same number of points'):
+        geodesy.move_forward([0, 0], [0, 90, 180], [1, 2])
+
+
+
+@pytest.mark.parametrize('num_points', [10**3, 10**5, 10**7])
+def test__get_distance__benchmark(num_points):
+    start = random_points(num_points, seed=0)
+    end   = random_points(num_points, seed=1)
+
+    def best_time(func):
+        times = []
+        for _ in range(3 if num_points < 10**7 else 1):
+            t0 = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - t0)
+        return min(times), result
+
+    t_cartopy,   expected  = best_time(lambda: _cartopy_geodesic.inverse(start, end))
+    t_vincenty,  vincenty  = best_time(lambda: geodesy.get_distance(start, end))
+    t_haversine, haversine = best_time(lambda: geodesy.get_distance(start, end, method='haversine'))
+
+    ## captured output, shown with `pytest -rP`
+    print(f'\n\t{num_points:.0e} pairs: cartopy = {t_cartopy:.3f} s, vincenty = {t_vincenty:.3f} s ({t_cartopy/t_vincenty:.1f}x speedup), haversine = {t_haversine:.3f} s ({t_cartopy/t_haversine:.1f}x speedup)')
+
+    ## timings depend on the machine, so only check the results (see `test__get_distance__matches_cartopy` and `test__haversine` for tighter checks)
+    assert np.allclose(vincenty[:, 0], expected[:, 0], rtol=0, atol=1e-3)
+    far = expected[:, 0] > 1e3
+    assert np.all(np.abs(haversine[far, 0] - expected[far, 0]) / expected[far, 0] < 0.01)
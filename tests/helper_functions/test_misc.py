@@ -0,0 +1,68 @@
+import time
+
+import pytest
+import numpy as np
+
+from redplanet.helper_functions.misc import (
+    find_closest_indices,
+    find_closest_indices_regular,
+    get_regular_spacing,
+)
+
+
+
+## same axis as the 'DEM_200m' longitudes (the largest axis of any dataset)
+_start = -179.9983129395848
+_step  = 0.0033741208306410017
+_num   = 106694
+_axis  = _start + _step * np.arange(_num)
+
+
+
+def test__get_regular_spacing():
+    assert np.isclose( get_regular_spacing(_axis)                    , _step )
+    assert np.isclose( get_regular_spacing(np.linspace(0, 360, 4269)), 360/4268 )
+    assert get_regular_spacing(np.array([0., 1., 3.]))  is None  ## irregular
+    assert get_regular_spacing(np.array([3., 2., 1.]))  is None  ## descending
+    assert get_regular_spacing(np.array([1.]))          is None  ## too short
+
+
+
+def test__find_closest_indices_regular__matches_searchsorted():
+    rng = np.random.default_rng(0)
+    targets = rng.uniform(-200, 200, 100_000)
+    assert np.array_equal(
+        find_closest_indices_regular(_start, _step, _num, targets),
+        find_closest_indices(_axis, targets),
+    )
+
+    ## ties go to the left neighbor, out-of-range values are clipped
+    assert np.array_equal(
+        find_closest_indices_regular(10, 10, 5, np.array([25, 35, 5, 55, 15])),
+        find_closest_indices(np.array([10, 20, 30, 40, 50]), np.array([25, 35, 5, 55, 15])),
+    )
+
+
+
+@pytest.mark.parametrize('num_points', [10**6, 10**7])
+def test__find_closest_indices_regular__benchmark(num_points):
+    rng = np.random.default_rng(0)
+    targets = rng.uniform(-180, 180, num_points)
+
+    def best_time(func):
+        times = []
+        for _ in range(3):
+            t0 = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - t0)
+        return min(times)
+
+    t_search     = best_time(lambda: find_closest_indices(_axis, targets))
+    t_arithmetic = best_time(lambda: find_closest_indices_regular(_start, _step, _num, targets))
+
+    assert np.array_equal(
+        find_closest_indices_regular(_start, _step, _num, targets),
+        find_closest_indices(_axis, targets),
+    )
+
+    print(f'\n\t{num_points:.0e} points: searchsorted = {t_search:.3f} s, arithmetic = {t_arithmetic:.3f} s ({t_search/t_arithmetic:.1f}x speedup)')
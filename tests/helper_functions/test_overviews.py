@@ -0,0 +1,97 @@
+import numpy as np
+
+from redplanet.helper_functions.GriddedData import GriddedData
+from redplanet.helper_functions.overviews import get_overviews
+
+
+
+def make_dem(tmp_path) -> tuple[GriddedData, dict]:
+    ## synthetic int16 DEM with an odd number of rows/columns and a few nodata pixels
+    shape = (181, 721)
+    lon = -179.75 + 0.5 * np.arange(shape[1])
+    lat = -90 + 1. * np.arange(shape[0])
+    rng = np.random.default_rng(0)
+    fpath = tmp_path / 'dem.memmap'
+    dat = np.memmap(fpath, mode='w+', dtype=np.int16, shape=shape)
+    dat[:] = rng.integers(-5000, 5000, shape)
+    dat[0:2, 0:2] = -9999
+    dat[2, 2] = -9999
+    dat.flush()
+    dat = np.memmap(fpath, mode='r', dtype=np.int16, shape=shape)
+
+    kwargs = dict(
+        fpath_dataset = fpath,
+        key           = 'abc123',
+        shape         = shape,
+        dtype         = np.int16,
+        lon           = lon,
+        lat           = lat,
+        is_slon       = True,
+        var           = 'topo',
+        metadata      = {'meters_per_pixel': 100},
+        nan_value     = -9999,
+        min_num_cols  = 100,
+    )
+    return GriddedData(lon=lon, is_slon=True, lat=lat, data_dict={'topo': dat}, metadata={}, nan_value=-9999), kwargs
+
+
+
+def test__get_overviews(tmp_path):
+    gd, kwargs = make_dem(tmp_path)
+    overviews = get_overviews(**kwargs, max_block_bytes=10_000)  ## tiny blocks, to exercise the streaming
+
+    assert [ov.data_dict['topo'].shape for ov in overviews] == [(90, 360), (45, 180)]
+    assert overviews[1].metadata['meters_per_pixel'] == 400
+    assert overviews[0]._lon_step == 1 and overviews[1]._lat_step == 4
+
+    ## level 1 is the average of each 2x2 block, ignoring nodata
+    src = np.asarray(gd.data_dict['topo'][:180, :720], dtype=np.float64)
+    src[src == -9999] = np.nan
+    expected = np.nanmean(src[2:].reshape(89, 2, 360, 2), axis=(1, 3))  ## skip the first row of blocks, which has an all-nodata block
+    level_1 = overviews[0].data_dict['topo']
+    assert level_1[0, 0] == -9999
+    assert level_1[0, 1] == np.rint(np.mean(src[0:2, 2:4][~np.isnan(src[0:2, 2:4])]))
+    assert np.array_equal(level_1[1:], np.rint(expected))
+    assert np.isclose(overviews[0].lon[0], -179.5) and np.isclose(overviews[0].lat[0], -89.5)
+
+    ## cached files are reused, and a different key triggers a rebuild
+    mtime = (tmp_path / 'dem.abc123.ovr1.memmap').stat().st_mtime_ns
+    get_overviews(**kwargs)
+    assert (tmp_path / 'dem.abc123.ovr1.memmap').stat().st_mtime_ns == mtime
+    assert not list(tmp_path.glob('*.tmp'))
+    get_overviews(**{**kwargs, 'key': 'def456'})
+    assert (tmp_path / 'dem.def456.ovr2.memmap').is_file()
+
+
+
+def test__get_values__overview_selection(tmp_path):
+    gd, kwargs = make_dem(tmp_path)
+    overviews = get_overviews(**kwargs)
+    gd = GriddedData(lon=gd.lon, is_slon=True, lat=gd.lat, data_dict=dict(gd.data_dict), metadata={}, nan_value=-9999, overviews=overviews)
+
+    lons = np.linspace(-170, 170, 50)  ## ~7 degree spacing -> coarsest level
+    lats = np.linspace(-80, 80, 30)
+    assert gd._select_overview(lons, lats) is overviews[1]
+    assert np.array_equal(gd.get_values(lons, lats, 'topo'), overviews[1].get_values(lons, lats, 'topo'))
+
+    lons = np.linspace(-9, 9, 13)  ## 1.5 degree spacing -> only the 1st level is fine enough
+    assert gd._select_overview(lons, lats) is overviews[0]
+    assert gd._select_overview(lons, 0.) is overviews[0]
+    assert gd._select_overview(np.linspace(0, 1, 5), lats) is gd
+    assert gd._select_overview(0., 0.) is gd
+
+    ## full resolution is used when opted out or for pointwise lookups
+    lons = np.linspace(-170, 170, 50)
+    assert np.array_equal(
+        gd.get_values(lons, lats, 'topo', use_overviews=False),
+        gd.data_dict['topo'][np.ix_(gd._find_closest_indices(gd.lat, 1., lats), gd._find_closest_indices(gd.lon, .5, lons))],
+    )
+    assert np.array_equal(
+        gd.get_values(lons, lats[0], 'topo', pointwise=True),
+        gd.get_values(lons, lats[0], 'topo', use_overviews=False),
+    )
+
+    ## windows keep the overview levels which overlap them
+    win = gd.window((-20, 20), (-20, 20))
+    assert len(win.overviews) == 2
+    assert len(gd.window((0.1, 0.4), (0, 1)).overviews) == 0
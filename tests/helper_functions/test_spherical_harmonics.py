@@ -0,0 +1,48 @@
+import pytest
+import numpy as np
+import pyshtools as pysh
+
+from redplanet.helper_functions.spherical_harmonics import expand_points, expand_points_mag
+
+
+
+@pytest.mark.parametrize('normalization', ['4pi', 'ortho', 'schmidt', 'unnorm'])
+def test_expand_points__matches_grid(normalization):
+    ## exact evaluation at the nodes of a `pyshtools` grid matches the grid expansion
+    coeffs = pysh.SHCoeffs.from_random(np.ones(41), seed=0, normalization=normalization)
+    grid = coeffs.expand()
+    lon, lat = np.meshgrid(grid.lons(), grid.lats())
+
+    values = expand_points(coeffs.coeffs, lon, lat, normalization=normalization, max_batch_bytes=10_000)  ## tiny batches, to exercise batching
+    assert values.shape == grid.data.shape
+    assert np.allclose(values, grid.data, rtol=0, atol=1e-10 * np.abs(grid.data).max())
+
+
+def test_expand_points__scattered():
+    ## scattered points (including repeated latitudes and longitudes outside [0, 360]) match `pyshtools` point evaluation
+    coeffs = pysh.SHCoeffs.from_random(np.ones(91), seed=1)
+    rng = np.random.default_rng(0)
+    lon = rng.uniform(-180, 360, 500)
+    lat = np.repeat(rng.uniform(-90, 90, 50), 10)
+
+    assert np.allclose(expand_points(coeffs.coeffs, lon, lat), coeffs.expand(lon=lon, lat=lat))
+
+
+def test_expand_points_mag__matches_grid():
+    np.random.seed(2)
+    coeffs = pysh.SHMagCoeffs.from_random(np.ones(41), r0=3393.5e3)
+
+    for altitude in [0, 150e3]:
+        ds = coeffs.expand(a=coeffs.r0 + altitude).to_xarray()
+        ds = ds.isel(lat=slice(1, -1))  ## `pyshtools` uses its own convention for the horizontal components exactly at the poles
+        lon, lat = np.meshgrid(ds.lon.values, ds.lat.values)
+
+        values = expand_points_mag(coeffs.coeffs, coeffs.r0, lon, lat, altitude=altitude)
+        for quantity in ['radial', 'theta', 'phi', 'total', 'potential']:
+            expected = ds[quantity].values
+            assert np.allclose(values[quantity], expected, rtol=0, atol=1e-10 * np.abs(expected).max()), quantity
+
+
+def test_expand_points__invalid():
+    with pytest.raises(ValueError, match='normalization'):
+        expand_points(np.zeros((2, 3, 3)), 0, 0, normalization='meow')